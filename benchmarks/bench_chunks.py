@@ -0,0 +1,90 @@
+"""Transcript chunking: split throughput, bytes read per paper and cache reads.
+
+    python benchmarks/bench_chunks.py --papers 500 --pages 20
+
+Synthetic transcripts with page markers, numbered headings and a long
+reference list are chunked, then compared with the old layout: how many
+bytes synthesis reads per paper when it skips noise sections instead of
+pulling the whole ``content_body``, and how fast the local chunk cache
+serves a warm read.
+"""
+import argparse
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from scout.chunks import NOISE_SECTIONS, ChunkCache, chunk_transcript  # noqa: E402
+
+WORDS = ("health policy regional survey access cohort evidence model outcomes systems learning climate urban "
+         "labour education effect sample estimate significant across").split()
+SECTIONS = ["Introduction", "Related Work", "Methods", "Results", "Discussion", "Conclusion"]
+
+
+def transcript(pages, rng):
+    parts = ["Abstract", sentence_block(rng, 6)]
+    per_section = max(pages // len(SECTIONS), 1)
+    for p in range(1, pages + 1):
+        parts.append(f"<!-- page {p} -->")
+        if (p - 1) % per_section == 0 and (p - 1) // per_section < len(SECTIONS):
+            n = (p - 1) // per_section
+            parts.append(f"{n + 1}. {SECTIONS[n]}")
+        parts.extend(sentence_block(rng, rng.randint(3, 9)) for _ in range(5))
+    parts.append("References")
+    parts.append(" ".join(f"Author, A. ({rng.randint(1990, 2025)}). {sentence(rng)}" for _ in range(60)))
+    return "\n\n".join(parts)
+
+
+def sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + "."
+
+
+def sentence_block(rng, n):
+    return " ".join(sentence(rng) for _ in range(n))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--papers", type=int, default=500)
+    ap.add_argument("--pages", type=int, default=20)
+    args = ap.parse_args()
+
+    rng = random.Random(5)
+    docs = [transcript(args.pages, rng) for _ in range(args.papers)]
+    size = sum(len(d) for d in docs)
+
+    t0 = time.perf_counter()
+    chunked = [chunk_transcript(d) for d in docs]
+    split = time.perf_counter() - t0
+    n_chunks = sum(len(c) for c in chunked)
+    print(f"{args.papers} transcripts, {size / 1e6:.1f} MB -> {n_chunks} chunks "
+          f"({statistics.mean(c.tokens for cs in chunked for c in cs):.0f} tokens avg)")
+    print(f"chunking           {split:8.2f}s   {size / 1e6 / split:6.1f} MB/s")
+
+    kept = [[c for c in cs if (c.section or "").lower() not in NOISE_SECTIONS] for cs in chunked]
+    read = sum(len(c.text) for cs in kept for c in cs)
+    print(f"bytes per paper    {size / args.papers / 1e3:8.1f} KB whole body   {read / args.papers / 1e3:6.1f} KB indexed chunks")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ChunkCache(str(pathlib.Path(tmp) / "chunks.sqlite3"))
+        texts = {f"{i}:{c.ordinal}": c.text for i, cs in enumerate(kept) for c in cs}
+        t0 = time.perf_counter()
+        cache.put_many(texts)
+        put = time.perf_counter() - t0
+        ids = list(texts)
+        times = []
+        for i in range(0, len(ids), 50):
+            t0 = time.perf_counter()
+            cache.get_many(ids[i:i + 50])
+            times.append((time.perf_counter() - t0) * 1e3)
+        stats = cache.stats()
+        print(f"cache put          {put:8.2f}s   {stats['bytes'] / 1e6:6.1f} MB on disk ({read / max(stats['bytes'], 1):.1f}x compression)")
+        print(f"cache read x50     p50 {statistics.median(times):6.2f}ms   max {max(times):6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Verify migration_performance_pack.sql against a local Postgres.
+
+    DATABASE_URL=postgresql://postgres@localhost/scratch python benchmarks/bench_db_pack.py --papers 50000
+
+Point it at a throwaway database (Postgres 13+, needs ``psycopg``). It stubs
+the Supabase ``auth`` schema if missing, applies schema.sql and the
+migrations in README order, seeds synthetic projects, then prints the plan
+and timing of each hot query: the newest-first page, full-text search, the
+natural-key lookup and the two aggregate RPCs, next to the old approach of
+pulling a project's rows into Python to count them.
+"""
+import argparse
+import json
+import os
+import pathlib
+import time
+from collections import Counter
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+MIGRATIONS = [
+    "migration.sql", "migration_add_content_body.sql", "migration_phase3_columns.sql",
+    "migration_snowball_ids.sql", "migration_natural_key.sql", "migration_paper_edges.sql",
+    "migration_notion_sync.sql", "migration_performance_pack.sql", "migration_dedup.sql", "migration_paper_chunks.sql",
+    "migration_paper_revision.sql",
+]
+
+AUTH_STUB = """
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE TABLE IF NOT EXISTS auth.users (id UUID PRIMARY KEY);
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS UUID LANGUAGE sql STABLE AS $$ SELECT NULL::uuid $$;
+DO $$ BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN CREATE ROLE authenticated; END IF;
+END $$;
+"""
+
+SEED = """
+WITH words AS (SELECT ARRAY['health','policy','regional','survey','access','cohort','evidence','model',
+                            'outcomes','systems','learning','climate','urban','labour','education'] AS w)
+INSERT INTO papers (project_id, title, abstract, content_body, year, reading_status, citation_count, source_type, natural_key, created_at)
+SELECT %(project)s,
+       initcap(w[1 + (i * 7) %% 15] || ' ' || w[1 + (i * 11) %% 15] || ' ' || w[1 + (i * 13) %% 15] || ' study ' || i),
+       repeat(w[1 + (i * 3) %% 15] || ' ' || w[1 + (i * 5) %% 15] || ' findings ', 30),
+       CASE WHEN i %% 4 = 0 THEN repeat(w[1 + i %% 15] || ' transcript text ', 400) END,
+       1990 + i %% 35,
+       (ARRAY['Unread','Reading','Synthesized'])[1 + i %% 3],
+       (i * 7919) %% 5000,
+       (ARRAY['scout','pdf','web','snowball-mining'])[1 + i %% 4],
+       'title:bench ' || %(project)s || ' ' || i,
+       now() - (i || ' minutes')::interval
+FROM generate_series(1, %(n)s) AS i, words
+"""
+
+QUERIES = {
+    "newest page": ("SELECT id, title, reading_status, tags, year, citation_count, source_type FROM papers "
+                    "WHERE project_id = %(p)s ORDER BY created_at DESC LIMIT 50"),
+    "full-text search": ("SELECT id, title FROM papers WHERE project_id = %(p)s "
+                         "AND search_tsv @@ websearch_to_tsquery('english', 'climate urban') ORDER BY created_at DESC LIMIT 50"),
+    "natural key": "SELECT id FROM papers WHERE project_id = %(p)s AND natural_key = 'title:bench ' || %(p)s || ' 42'",
+    "status counts (rpc)": "SELECT * FROM paper_status_counts(%(p)s)",
+    "top cited (rpc)": "SELECT * FROM top_cited_papers(%(p)s, 10)",
+}
+
+
+def plan_summary(plan):
+    """Node types and index names, outermost first."""
+    out = []
+
+    def walk(node):
+        label = node["Node Type"]
+        if node.get("Index Name"):
+            label += f" [{node['Index Name']}]"
+        out.append(label)
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan)
+    return " > ".join(out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--dsn", default=os.environ.get("DATABASE_URL"))
+    ap.add_argument("--papers", type=int, default=50000, help="papers per project")
+    ap.add_argument("--projects", type=int, default=4)
+    args = ap.parse_args()
+    if not args.dsn:
+        ap.error("set DATABASE_URL or pass --dsn")
+
+    import psycopg
+
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        if not conn.execute("SELECT to_regclass('auth.users')").fetchone()[0]:
+            conn.execute(AUTH_STUB)
+        if not conn.execute("SELECT to_regclass('public.papers')").fetchone()[0]:
+            conn.execute((ROOT / "schema.sql").read_text())
+        t0 = time.perf_counter()
+        for name in MIGRATIONS:
+            conn.execute((ROOT / name).read_text())
+        print(f"migrations applied in {time.perf_counter() - t0:.2f}s")
+
+        projects = []
+        t0 = time.perf_counter()
+        for i in range(args.projects):
+            pid = conn.execute("INSERT INTO projects (name) VALUES (%s) RETURNING id", (f"bench {i}",)).fetchone()[0]
+            conn.execute(SEED, {"project": pid, "n": args.papers})
+            projects.append(pid)
+        conn.execute("ANALYZE papers")
+        print(f"seeded {args.projects} x {args.papers} papers in {time.perf_counter() - t0:.1f}s\n")
+
+        p = projects[0]
+        print(f"{'query':<22}{'ms':>9}  plan")
+        for label, sql in QUERIES.items():
+            plan = conn.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, {"p": p}).fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            print(f"{label:<22}{plan[0]['Execution Time']:>9.2f}  {plan_summary(plan[0]['Plan'])}")
+
+        # The client-side path the RPCs replace: ship every row, count in Python
+        t0 = time.perf_counter()
+        rows = conn.execute("SELECT reading_status FROM papers WHERE project_id = %s", (p,)).fetchall()
+        Counter(r[0] for r in rows)
+        print(f"{'counts in Python':<22}{(time.perf_counter() - t0) * 1000:>9.2f}  ({len(rows)} rows transferred)")
+        t0 = time.perf_counter()
+        conn.execute("SELECT * FROM paper_status_counts(%s)", (p,)).fetchall()
+        print(f"{'counts via rpc':<22}{(time.perf_counter() - t0) * 1000:>9.2f}  (round trip)")
+
+
+if __name__ == "__main__":
+    main()
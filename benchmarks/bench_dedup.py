@@ -0,0 +1,120 @@
+"""Near-duplicate index: build time, insert-time lookups and the bulk pass.
+
+    python benchmarks/bench_dedup.py --papers 50000 --dupes 0.1
+
+A synthetic library gets a share of planted duplicates, each a noisy copy of
+an original the way another source would write it (case, punctuation,
+dropped or doubled letters, a site suffix, an extra word). Reports index
+build time and memory, per-lookup latency percentiles, and precision/recall
+of ``find_duplicates`` against the planted pairs.
+"""
+import argparse
+import pathlib
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from scout.dedup import DuplicateIndex, find_duplicates  # noqa: E402
+
+COMMON = "of the and in for a on with from to among using".split()
+SYLLABLES = "ba co de fi gu ha ki lo mu ne po ra si tu ve zo an el in or ur ist ent ion al ic".split()
+
+
+def vocabulary(n, rng):
+    """Pseudo-words, so titles share common words but not whole phrases."""
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def noisy(title, rng):
+    t = title
+    for _ in range(rng.randint(1, 2)):
+        kind = rng.randrange(5)
+        if kind == 0:
+            t = t.lower() if rng.random() < 0.5 else t.upper()
+        elif kind == 1:
+            i = rng.randrange(len(t))
+            t = t[:i] + t[i + 1:]
+        elif kind == 2:
+            i = rng.randrange(len(t))
+            t = t[:i] + t[i] + t[i:]
+        elif kind == 3:
+            t = t + rng.choice([" | arXiv", ".", " (PDF)", ":"])
+        else:
+            t = t.replace(" ", "  ", 1) + rng.choice(["", " review"])
+    return t
+
+
+def library(n, dupe_share, seed=11):
+    rng = random.Random(seed)
+    words = vocabulary(5000, rng)
+    originals = []
+    for i in range(n):
+        originals.append({
+            "id": f"p{i}",
+            "title": " ".join(w for _ in range(rng.randint(5, 12)) for w in [rng.choice(words if rng.random() < 0.7 else COMMON)]).capitalize(),
+            "year": rng.randint(1990, 2026),
+            "doi": f"10.{rng.randint(1000, 9999)}/{i}" if rng.random() < 0.4 else None,
+        })
+    source = {}  # duplicate id -> original id
+    rows = list(originals)
+    for j in range(int(n * dupe_share)):
+        src = rng.choice(originals)
+        rows.append({"id": f"d{j}", "title": noisy(src["title"], rng), "year": src["year"], "doi": None})
+        source[f"d{j}"] = src["id"]
+    rng.shuffle(rows)
+    return rows, source
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--papers", type=int, default=50000)
+    ap.add_argument("--dupes", type=float, default=0.1, help="planted duplicates as a share of --papers")
+    ap.add_argument("--lookups", type=int, default=2000)
+    args = ap.parse_args()
+
+    rows, source = library(args.papers, args.dupes)
+    print(f"{len(rows)} papers, {len(source)} planted duplicates")
+
+    t0 = time.perf_counter()
+    index = DuplicateIndex()
+    index.add_many(rows)
+    build = time.perf_counter() - t0
+    # Measured on a second build: tracemalloc slows allocation-heavy code
+    tracemalloc.start()
+    measured = DuplicateIndex()
+    measured.add_many(rows)
+    mem = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+    del measured
+    print(f"index build        {build:8.2f}s   {mem:7.1f} MB")
+
+    rng = random.Random(3)
+    probes = [dict(r, title=noisy(r["title"], rng), doi=None) for r in rng.sample(rows, args.lookups)]
+    probes += [{"title": " ".join(rng.choice(rows)["title"].split()[:4]) + " revisited", "year": 2020} for _ in range(args.lookups)]
+    times = []
+    for p in probes:
+        t0 = time.perf_counter()
+        index.match(p)
+        times.append((time.perf_counter() - t0) * 1e6)
+    times.sort()
+    print(f"lookup             p50 {statistics.median(times):6.0f}us   p99 {times[int(len(times) * 0.99)]:6.0f}us   max {times[-1]:6.0f}us")
+
+    t0 = time.perf_counter()
+    clusters = find_duplicates(rows)
+    bulk = time.perf_counter() - t0
+    # A merge is right when every paper in the cluster comes from one original
+    origin = [{source.get(pid, pid) for pid in c} for c in clusters]
+    precision = sum(1 for o in origin if len(o) == 1) / len(clusters) if clusters else 1.0
+    caught = sum(1 for c in clusters for pid in c if pid in source and source[pid] in c)
+    print(f"bulk pass          {bulk:8.2f}s   {len(clusters)} clusters   precision {precision:.3f}   recall {caught / len(source):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Handover exports (matrix and bibliographies) over a synthetic library.
+
+    python benchmarks/bench_exports.py --rows 20000
+    python benchmarks/bench_exports.py --rows 20000 --formats xlsx legacy-xlsx
+    python benchmarks/bench_exports.py --rows 50000 --formats bibtex --stream
+
+Each format runs in a fresh interpreter so peak RSS is attributable to it.
+``legacy-xlsx`` is the previous in-memory Workbook export with its second
+pass over every cell for column widths, kept here as the baseline.
+``--stream`` writes bibliographies chunk by chunk to /dev/null instead of
+rendering bytes, the flat-memory path for exports written to disk.
+"""
+import argparse
+import json
+import os
+import pathlib
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from scout.bibliography import SERIALIZERS, write_bibliography  # noqa: E402
+from scout.export import EXPORTERS, MATRIX_HEADERS, matrix_rows  # noqa: E402
+
+WORDS = "policy outcomes regional health systems survey access evidence cohort analysis model".split()
+
+
+def synthetic_papers(n, seed=7):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "id": f"p{i}",
+            "title": " ".join(rng.choices(WORDS, k=rng.randint(6, 14))).title(),
+            "authors": [f"Author {rng.randint(1, 5000)}" for _ in range(rng.randint(1, 6))],
+            "year": rng.randint(1990, 2026),
+            "reading_status": rng.choice(["Unread", "Reading", "Read"]),
+            "impact_score": round(rng.random() * 3, 3),
+            "source_type": rng.choice(["scout", "pdf", "web", "snowball-mining"]),
+            "abstract": " ".join(rng.choices(WORDS, k=rng.randint(80, 220))),
+        }
+
+
+def legacy_excel(papers):
+    from io import BytesIO
+
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font, PatternFill
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(MATRIX_HEADERS)
+    for cell in ws[1]:
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="121212", end_color="121212", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+    for row in matrix_rows(papers):
+        ws.append(row)
+    for col in ws.columns:
+        width = max(len(str(c.value)) for c in col)
+        ws.column_dimensions[col[0].column_letter].width = min(width + 2, 50)
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+FORMATS = {**EXPORTERS, "legacy-xlsx": legacy_excel}
+
+
+def measure(fmt, rows, stream=False):
+    papers = list(synthetic_papers(rows))
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if stream and fmt in SERIALIZERS:
+        with open(os.devnull, "wb") as fp:
+            size = write_bibliography(papers, fmt, fp)
+    else:
+        size = len(FORMATS[fmt](papers))
+    elapsed = time.perf_counter() - t0
+    # ru_maxrss is KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"seconds": elapsed, "bytes": size, "peak_mb": peak / 1024, "delta_mb": (peak - base) / 1024}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--formats", nargs="+", default=list(FORMATS), choices=list(FORMATS))
+    ap.add_argument("--stream", action="store_true", help="stream bibliographies to /dev/null")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.rows, args.stream)))
+        return
+
+    print(f"{'format':<13}{'seconds':>9}{'rows/s':>10}{'size MB':>9}{'peak RSS MB':>13}{'export MB':>11}")
+    for fmt in args.formats:
+        out = subprocess.run(
+            [sys.executable, __file__, "--rows", str(args.rows), "--child", fmt] + (["--stream"] if args.stream else []),
+            capture_output=True, text=True, check=True,
+        ).stdout
+        r = json.loads(out)
+        rate = args.rows / r["seconds"] if r["seconds"] else 0
+        print(f"{fmt:<13}{r['seconds']:>9.2f}{rate:>10,.0f}{r['bytes'] / 1e6:>9.1f}{r['peak_mb']:>13.1f}{r['delta_mb']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
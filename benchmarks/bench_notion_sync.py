@@ -0,0 +1,68 @@
+"""Notion sync against a local mock of the Notion pages API.
+
+    python benchmarks/bench_notion_sync.py --papers 200 --changed 5
+
+The mock (``NotionStub`` in ``fakes.py``) enforces Notion's ~3 requests/second average with a small burst
+allowance and answers excess requests with 429 + Retry-After, so the run
+shows both the rate-limited full sync and the incremental resync where only
+changed papers are sent. No Notion account or Supabase project is needed.
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from fakes import NotionStub, serve  # noqa: E402
+from scout.notion import NotionClient, plan_sync  # noqa: E402
+
+
+def run_sync(client, papers, database_id):
+    plan = plan_sync(papers, database_id)
+    by_id = {p["id"]: p for p in papers}
+    failed = []
+
+    def on_result(paper, page_id, digest, error):
+        if error is not None:
+            failed.append(error)
+        else:
+            by_id[paper["id"]].update(notion_page_id=page_id, notion_hash=digest)
+
+    t0 = time.perf_counter()
+    client.sync(database_id, plan, on_result)
+    return plan, time.perf_counter() - t0, failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--papers", type=int, default=200)
+    ap.add_argument("--changed", type=int, default=5)
+    ap.add_argument("--rate", type=float, default=3.0, help="mock server limit (req/s)")
+    args = ap.parse_args()
+
+    mock = NotionStub(rate=args.rate)
+    server, url = serve(mock)
+    client = NotionClient("secret_mock", base_url=f"{url}/v1", rate=args.rate)
+
+    papers = [
+        {"id": f"p{i}", "title": f"Paper {i}", "authors": [f"Author {i}"], "year": 2000 + i % 25,
+         "url": f"https://example.org/{i}", "reading_status": "Unread"}
+        for i in range(args.papers)
+    ]
+    print(f"{'pass':<14}{'sent':>6}{'unchanged':>11}{'seconds':>10}{'req/s':>8}{'429s':>6}{'failed':>8}")
+    for label in ("full", "incremental"):
+        if label == "incremental":
+            for p in papers[:args.changed]:
+                p["reading_status"] = "Read"
+        before = dict(mock.counts)
+        plan, elapsed, failed = run_sync(client, papers, "db-mock")
+        sent = len(plan.work)
+        throttled = mock.counts["429"] - before["429"]
+        print(f"{label:<14}{sent:>6}{plan.unchanged:>11}{elapsed:>10.2f}{sent / elapsed if elapsed else 0:>8.2f}{throttled:>6}{len(failed):>8}")
+    print(f"mock totals: {mock.counts['POST']} creates, {mock.counts['PATCH']} updates, {len(mock.pages)} pages")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
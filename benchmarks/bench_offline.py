@@ -0,0 +1,396 @@
+"""Offline benchmark suite: scout's hot paths at library scale, with no keys or network.
+
+    python benchmarks/bench_offline.py
+    python benchmarks/bench_offline.py --sizes 1000 10000 --workloads matrix exports
+    python benchmarks/bench_offline.py --json baseline.json
+    python benchmarks/bench_offline.py --compare baseline.json --tolerance 0.25
+
+For each library size the parent process seeds a PostgREST stub (papers,
+citation edges and, for a slice of the library, transcript chunks) and starts
+the Semantic Scholar and Notion stubs from ``benchmarks/fakes.py``. Each
+workload then runs in a fresh interpreter wired through ``Services`` exactly
+like the app and the CLI, with the real supabase client, job queue and
+caches, and Gemini swapped for ``FakeModel``. The stubs live in the parent,
+so a child's peak RSS is the app side's alone. The seeded state is restored
+between workloads.
+
+Per operation it reports calls, throughput (items/s), p50/p95/p99 latency and
+the workload's peak RSS and PostgREST requests. ``--compare`` exits non-zero
+when an operation's p50 or a workload's peak memory grew by more than
+``--tolerance`` against a saved ``--json`` run, so CI can gate on it. The
+50k library takes several minutes; CI can run ``--sizes 100 1000 10000``.
+"""
+import argparse
+import base64
+import json
+import math
+import pathlib
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from fakes import FakeModel, NotionStub, PostgRESTStub, S2Stub, WORDS, serve  # noqa: E402
+
+SIZES = (100, 1_000, 10_000, 50_000)
+WORKLOADS = ("search", "save", "snowball", "graph", "matrix", "exports", "synthesis", "notion")
+STATUSES = ("Unread", "Reading", "Synthesized")
+SOURCES = ("scout", "snowball-mining", "pdf-ingest", "external")
+TAGS = ("core", "method", "background", "policy", "review", "data")
+CHUNKED = 0.05  # share of the library with an ingested transcript
+NOTION_CHANGED = 0.02  # share of synced papers edited since the last Notion sync
+DATABASE_ID = "db-bench"
+BENCH_USER = "00000000-0000-0000-0000-00000000b0b0"  # owns the seeded project; jobs run as this user
+NOISE_MS = 5.0  # --compare ignores p50 changes smaller than this
+
+
+# --- SEEDING (parent) ---
+def transcript(rng, paragraphs=14):
+    out = []
+    for i in range(paragraphs):
+        if i % 4 == 0:
+            out.append(f"## {rng.choice(['Introduction', 'Methods', 'Results', 'Discussion'])} {i // 4 + 1}")
+        out.append(" ".join(rng.choices(WORDS, k=rng.randint(60, 160))).capitalize() + ".")
+        if i % 5 == 4:
+            out.append(f"<!-- page {i // 5 + 2} -->")
+    return "\n\n".join(out)
+
+
+def seed_library(db, s2, notion, n, seed=7):
+    """A project of ``n`` papers taken from the S2 universe, so snowball finds overlaps."""
+    from scout.chunks import chunk_rows, chunk_transcript
+    from scout.notion import page_properties, properties_hash
+    from scout.snowball import to_row
+    from scout.store import natural_key
+
+    rng = random.Random(seed)
+    project = db.seed("projects", [{"name": f"bench-{n}", "client_name": "Bench", "owner_id": BENCH_USER}])[0]
+    rows = []
+    for i in range(n):
+        row = {
+            **to_row(s2.paper(i)), "project_id": project["id"],
+            "reading_status": rng.choice(STATUSES), "source_type": rng.choice(SOURCES),
+            "tags": rng.sample(TAGS, rng.randint(0, 2)), "impact_score": round(rng.random() * 3, 3),
+        }
+        row["natural_key"] = natural_key(row)
+        rows.append(row)
+    papers = db.seed("papers", rows)
+    # Most of the library is already in Notion and unchanged since; of the rest,
+    # half were edited after their last sync and half were never sent
+    for p in papers:
+        roll = rng.random()
+        if roll > NOTION_CHANGED / 2:
+            p["notion_page_id"] = f"page-{p['id']}"
+            notion.pages[p["notion_page_id"]] = {}
+            p["notion_hash"] = properties_hash(DATABASE_ID, page_properties(p)) if roll > NOTION_CHANGED else "stale"
+    by_s2 = {p["s2_paper_id"]: p["id"] for p in papers}
+    edges = [
+        {"project_id": project["id"], "source_id": p["id"], "target_id": by_s2[s2.paper(m)["paperId"]], "relation": "cites", "weight": 1}
+        for i, p in enumerate(papers) for m in set(s2.neighbours(i, "references")) if m < n and m != i
+    ]
+    db.seed("paper_edges", edges)
+    chunks = []
+    for p in rng.sample(papers, max(5, int(n * CHUNKED)) if n > 5 else n):
+        chunks += chunk_rows(project["id"], p["id"], chunk_transcript(transcript(rng)))
+    db.seed("paper_chunks", chunks)
+    return project["id"], {"papers": len(papers), "edges": len(edges), "chunks": len(chunks)}
+
+
+# --- WORKLOADS (child) ---
+def timed(samples, op, fn, items=1):
+    t0 = time.perf_counter()
+    out = fn()
+    samples.append((op, (time.perf_counter() - t0) * 1000, items(out) if callable(items) else items))
+    return out
+
+
+def w_search(env):
+    from scout.search import ScholarClient
+
+    def grey(term):
+        time.sleep(env.args.s2_latency)
+        return [{"title": f"{term} report {i}", "url": f"https://example.org/{i}.pdf", "source_type": "grey-lit"} for i in range(3)]
+
+    scholar = ScholarClient(base_url=env.s2_url, grey_source=grey)
+    terms = [" ".join(random.Random(i).choices(WORDS, k=3)) for i in range(60)]
+    samples = []
+    for label in ("search.cold", "search.warm"):
+        for t in terms:
+            timed(samples, label, lambda: scholar.search(t, grey_lit=True), len)
+    batch = [f"{t} review" for t in terms[:30]]
+    timed(samples, "search.many", lambda: scholar.search_many(batch), lambda out: sum(map(len, out)))
+    return samples
+
+
+def w_save(env, batches=5, per_batch=200):
+    from scout.graph import link_papers
+    from scout.snowball import to_row
+    from scout.store import PaperStore
+
+    repo = env.services.repository(env.project_id)
+    store = PaperStore(repo, env.services.dedup)
+    rng = random.Random(3)
+    existing = repo.view("identity")
+    samples = []
+    for b in range(batches):
+        rows = []
+        for i in range(per_batch):
+            if rng.random() < 0.2 and existing:
+                # Near-duplicate of a library paper: same work, reworded title, no ids
+                p = rng.choice(existing)
+                rows.append({"title": p["title"].replace(" (", ": a study (", 1), "year": p.get("year"), "source_type": "scout"})
+            else:
+                rows.append({**to_row(env.s2.paper(env.args.universe + b * per_batch + i)), "source_type": "scout"})
+        store.add_many(rows)
+        report = timed(samples, "save.flush", store.flush, lambda r: len(r.written))
+        timed(samples, "save.link", lambda: link_papers(repo, report.written), lambda n: len(report.written))
+    return samples
+
+
+def bench_token():
+    """An unsigned access token for BENCH_USER; the stub doesn't check signatures."""
+    claims = json.dumps({"sub": BENCH_USER, "role": "authenticated", "exp": int(time.time()) + 3600})
+    return ".".join(base64.urlsafe_b64encode(part.encode()).decode().rstrip("=") for part in ('{"alg":"none"}', claims, "bench"))
+
+
+def _run_jobs(env, kind, items):
+    queue = env.services.jobs
+    batch = queue.wait(queue.submit(kind, env.project_id, items, owner_id=BENCH_USER, access_token=bench_token()), poll=0.02)
+    failed = [j["message"] for j in batch if j["status"] != "done"]
+    if failed:
+        raise RuntimeError(f"{kind}: {failed[0]}")
+    return batch
+
+
+def w_snowball(env, seeds=6):
+    papers = env.services.repository(env.project_id).snapshot()
+    seeds = sorted(papers, key=lambda p: p.get("citation_count") or 0, reverse=True)[:seeds]
+    t0 = time.perf_counter()
+    batch = _run_jobs(env, "snowball", [
+        (p["title"], {"seed_id": p["id"], "seed_title": p["title"], "depth": 1, "directions": ["references", "citations"], "min_citations": 0})
+        for p in seeds
+    ])
+    samples = [("snowball.job", (j["finished"] - j["started"]) * 1000, j["result"]["inserted"]) for j in batch]
+    samples.append(("snowball.batch", (time.perf_counter() - t0) * 1000, sum(s[2] for s in samples)))
+    return samples
+
+
+def w_graph(env, runs=3):
+    from scout.graph import graph_metrics, project_graph
+
+    samples = []
+    for _ in range(runs):
+        repo = env.services.repository(env.project_id)
+        graph = timed(samples, "graph.build", lambda: project_graph(repo), lambda g: len(g.papers))
+        timed(samples, "graph.view", lambda: graph.view(min_shared=1, top_n=500), 1)
+        timed(samples, "graph.metrics", lambda: graph_metrics(graph), lambda out: len(out[0]))
+    return samples
+
+
+def w_matrix(env):
+    from scout.matrix import MatrixQuery, SORTS, fetch_page, status_counts, top_cited
+
+    repo = env.services.repository(env.project_id)
+    queries = [MatrixQuery(page=p) for p in range(5)]
+    queries += [MatrixQuery(sort=s) for s in SORTS]
+    queries += [MatrixQuery(statuses=(s,)) for s in STATUSES]
+    queries += [MatrixQuery(year_min=2010, year_max=2020, tags=("core",)), MatrixQuery(search="urban heat"), MatrixQuery(search="health", page=1)]
+    samples = []
+    timed(samples, "matrix.status_counts", lambda: status_counts(repo))
+    timed(samples, "matrix.top_cited", lambda: top_cited(repo))
+    for q in queries:
+        timed(samples, "matrix.page", lambda: fetch_page(repo, q), lambda out: len(out[0]))
+    # A rerun over the same pages is served from the per-version memo
+    for q in queries:
+        timed(samples, "matrix.page.memo", lambda: fetch_page(repo, q), lambda out: len(out[0]))
+    return samples
+
+
+def w_exports(env):
+    from scout.export import EXPORT_FILES, render_export
+
+    repo = env.services.repository(env.project_id)
+    samples = []
+    papers = timed(samples, "exports.view", lambda: repo.view("handover"), len)
+    for fmt in EXPORT_FILES:
+        timed(samples, f"exports.{fmt}", lambda: render_export(fmt, papers), len(papers))
+    return samples
+
+
+def w_synthesis(env, prompts=20, turns=3):
+    from scout.synthesis import SynthesisStream, grounded_prompt
+
+    repo = env.services.repository(env.project_id)
+    questions = [" ".join(random.Random(100 + i).choices(WORDS, k=6)) + "?" for i in range(prompts)]
+    samples = []
+    # The first call pulls every chunk manifest and text and builds the index
+    timed(samples, "context.index", lambda: grounded_prompt(repo, env.services.chunks, questions[0]), len)
+    for q in questions:
+        timed(samples, "context.query", lambda: grounded_prompt(repo, env.services.chunks, q), len)
+    for q in questions[:turns]:
+        stream = SynthesisStream(env.services.gemini, grounded_prompt(repo, env.services.chunks, q))
+        for _ in stream:
+            pass
+        samples.append(("synthesis.ttft", stream.metrics.ttft_s * 1000, 1))
+        samples.append(("synthesis.turn", stream.metrics.total_s * 1000, stream.metrics.output_tokens or 0))
+    return samples
+
+
+def w_notion(env):
+    batch = _run_jobs(env, "notion_sync", [("Notion sync", {})])
+    job = batch[0]
+    return [("notion.sync", (job["finished"] - job["started"]) * 1000, job["result"]["synced"])]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+
+
+def child(args):
+    from types import SimpleNamespace
+
+    from scout.notion import NotionClient
+    from scout.services import Services
+    from scout.snowball import SemanticScholarGraph
+    from scout.telemetry import TracedModel
+
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="scout-bench-"))
+    services = Services({
+        "supabase": {"url": args.db_url, "key": "bench-anon-key"},
+        "chunks": {"path": str(tmp / "chunks.sqlite3")},
+        "llm_cache": {"path": str(tmp / "llm_cache.sqlite3")},
+        "jobs": {"path": str(tmp / "jobs.sqlite3"), "workers": 3, "max_attempts": 1, "gemini_rpm": 6000},
+        "notion": {"api_token": "secret_bench", "database_id": DATABASE_ID},
+    })
+    # Remote services point at the parent's stubs; client limits are lifted so the stubs set the pace
+    services.gemini = TracedModel(FakeModel(latency=args.model_latency))
+    services.s2_graph = SemanticScholarGraph(base_url=f"{args.s2_url}/graph/v1", rate=1000)
+    services.notion = NotionClient("secret_bench", base_url=f"{args.notion_url}/v1", rate=1000)
+    env = SimpleNamespace(
+        args=args, services=services, project_id=args.project, s2_url=f"{args.s2_url}/graph/v1",
+        s2=S2Stub(universe=args.universe),
+    )
+    # Import and open the connection before the baseline reading
+    services.projects()
+    start_mb = rss_mb()
+    t0 = time.perf_counter()
+    samples = globals()[f"w_{args.child}"](env)
+    wall = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"samples": samples, "wall_s": wall, "start_mb": start_mb, "peak_mb": peak_mb}
+
+
+# --- REPORTING (parent) ---
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize(size, workload, result, db_requests):
+    by_op = {}
+    for op, ms, items in result["samples"]:
+        by_op.setdefault(op, []).append((ms, items))
+    rows = []
+    for op, samples in by_op.items():
+        ms = [s[0] for s in samples]
+        rows.append({
+            "size": size, "workload": workload, "op": op, "calls": len(ms),
+            "items_per_s": sum(s[1] for s in samples) / (sum(ms) / 1000) if sum(ms) else 0.0,
+            "p50_ms": percentile(ms, 0.5), "p95_ms": percentile(ms, 0.95), "p99_ms": percentile(ms, 0.99),
+            "peak_mb": result["peak_mb"], "grew_mb": result["peak_mb"] - result["start_mb"], "db_requests": db_requests,
+        })
+    return rows
+
+
+def print_header():
+    print(f"{'size':>7} {'operation':<22}{'calls':>6}{'items/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'peak MB':>9}{'+MB':>7}{'db req':>8}")
+
+
+def print_rows(rows):
+    for r in rows:
+        print(f"{r['size']:>7} {r['op']:<22}{r['calls']:>6}{r['items_per_s']:>11,.0f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{r['peak_mb']:>9.0f}{r['grew_mb']:>7.0f}{r['db_requests']:>8}")
+
+
+def compare(rows, baseline_path, tolerance):
+    baseline = {(r["size"], r["op"]): r for r in json.loads(pathlib.Path(baseline_path).read_text())}
+    failures = []
+    for r in rows:
+        old = baseline.get((r["size"], r["op"]))
+        if old is None:
+            continue
+        if r["p50_ms"] > old["p50_ms"] * (1 + tolerance) + NOISE_MS:
+            failures.append(f"{r['size']:>6} {r['op']}: p50 {old['p50_ms']:.1f} -> {r['p50_ms']:.1f} ms")
+        if r["grew_mb"] > max(8.0, old["grew_mb"]) * (1 + tolerance):
+            failures.append(f"{r['size']:>6} {r['op']}: memory +{old['grew_mb']:.0f} -> +{r['grew_mb']:.0f} MB")
+    return sorted(set(failures))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    ap.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    ap.add_argument("--db-latency", type=float, default=0.002, help="seconds added to every PostgREST request")
+    ap.add_argument("--s2-latency", type=float, default=0.02, help="seconds added to every Semantic Scholar request")
+    ap.add_argument("--notion-latency", type=float, default=0.005)
+    ap.add_argument("--model-latency", type=float, default=0.3, help="FakeModel seconds to first token")
+    ap.add_argument("--json", help="write every result row here")
+    ap.add_argument("--compare", metavar="JSON", help="fail on regressions against a saved --json run")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--child", choices=WORKLOADS, help=argparse.SUPPRESS)
+    for hidden in ("--db-url", "--s2-url", "--notion-url", "--project"):
+        ap.add_argument(hidden, help=argparse.SUPPRESS)
+    ap.add_argument("--universe", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        print(json.dumps(child(args)))
+        return 0
+
+    rows = []
+    print_header()
+    for size in args.sizes:
+        universe = max(10 * size, 5000)
+        db, s2 = PostgRESTStub(latency=args.db_latency), S2Stub(universe=universe, latency=args.s2_latency)
+        notion = NotionStub(rate=1000, burst=100, latency=args.notion_latency)
+        servers = [serve(stub) for stub in (db, s2, notion)]
+        t0 = time.perf_counter()
+        project_id, seeded = seed_library(db, s2, notion, size)
+        print(f"# {size:,} papers: seeded {seeded['edges']:,} edges and {seeded['chunks']:,} chunks in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        state = db.checkpoint()
+        for workload in args.workloads:
+            before = sum(db.requests.values())
+            cmd = [
+                sys.executable, __file__, "--child", workload, "--project", project_id, "--universe", str(universe),
+                "--db-url", servers[0][1], "--s2-url", servers[1][1], "--notion-url", servers[2][1],
+                "--s2-latency", str(args.s2_latency), "--model-latency", str(args.model_latency),
+            ]
+            out = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+            if out.returncode:
+                print(f"# {size:,} {workload} failed:\n{out.stderr.strip()[-2000:]}", file=sys.stderr)
+                continue
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            new = summarize(size, workload, result, sum(db.requests.values()) - before)
+            print_rows(new)
+            rows.extend(new)
+            db.restore(state)
+        for server, _ in servers:
+            server.shutdown()
+
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(rows, indent=1))
+    if args.compare:
+        failures = compare(rows, args.compare, args.tolerance)
+        for f in failures:
+            print(f"REGRESSION {f}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Local text-layer pass of the tiered PDF ingest over a corpus.
+
+    python benchmarks/bench_pdf_ingest.py --corpus ~/papers     # real PDFs
+    python benchmarks/bench_pdf_ingest.py --docs 20 --pages 30  # synthetic corpus
+
+Reports pages/sec for the pypdf pass, peak RSS, and the share of
+pages that would still be routed to the Gemini vision engine. Synthetic
+documents mix born-digital pages with image-only "scanned" pages.
+"""
+import argparse
+import pathlib
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from scout.ingest import MIN_LOCAL_SHARE, extract_text_layer  # noqa: E402
+
+WORDS = "the study examines policy outcomes across regional health systems using survey data and finds significant effects on access".split()
+
+
+def synthetic_pdf(pages, scanned_share, rng):
+    """A minimal PDF whose pages are either text or a filled box (no text layer)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        if rng.random() < scanned_share:
+            stream = "0.5 g 50 50 500 700 re f"
+        else:
+            lines = [" ".join(rng.choices(WORDS, k=12)) for _ in range(45)]
+            stream = "BT /F1 10 Tf 14 TL 50 760 Td " + " ".join(f"({l}) Tj T*" for l in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def corpus(args):
+    if args.corpus:
+        for path in sorted(pathlib.Path(args.corpus).expanduser().glob("**/*.pdf")):
+            yield path.name, path.read_bytes()
+        return
+    rng = random.Random(11)
+    for i in range(args.docs):
+        # Most documents are born-digital; a few are full scans
+        share = 0.95 if i % 5 == 4 else args.scanned_share
+        yield f"synthetic-{i}.pdf", synthetic_pdf(args.pages, share, rng)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--corpus", help="directory of sample PDFs (searched recursively)")
+    ap.add_argument("--docs", type=int, default=20)
+    ap.add_argument("--pages", type=int, default=30)
+    ap.add_argument("--scanned-share", type=float, default=0.1)
+    args = ap.parse_args()
+
+    docs = pages = vision_pages = full_vision = 0
+    elapsed = 0.0
+    for name, data in corpus(args):
+        t0 = time.perf_counter()
+        try:
+            _, texts, bad = extract_text_layer(data)
+        except Exception as e:
+            print(f"skip {name}: {e}")
+            continue
+        elapsed += time.perf_counter() - t0
+        docs += 1
+        pages += len(texts)
+        if not texts or (len(texts) - len(bad)) / len(texts) < MIN_LOCAL_SHARE:
+            full_vision += 1
+            vision_pages += len(texts)
+        else:
+            vision_pages += len(bad)
+    # ru_maxrss is KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    print(f"documents            {docs}")
+    print(f"pages                {pages}")
+    print(f"local pass           {elapsed:.2f}s ({pages / elapsed if elapsed else 0:,.0f} pages/s)")
+    print(f"peak RSS             {peak / 1e6:.1f} MB")
+    print(f"full-vision docs     {full_vision}")
+    print(f"pages sent to vision {vision_pages} ({vision_pages / pages if pages else 0:.0%}; was 100%)")
+
+
+if __name__ == "__main__":
+    main()
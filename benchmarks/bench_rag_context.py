@@ -0,0 +1,109 @@
+"""Prompt size and construction latency: full-library dump vs BM25 top-k vs the budgeted planner.
+
+    python benchmarks/bench_rag_context.py [--sizes 100 1000 10000] [--top-k 12] [--budget 6000]
+
+Uses synthetic papers so it runs offline; every tenth paper repeats an
+earlier abstract, as re-imported records do. Dump and top-k token counts are
+the usual 4-characters-per-token approximation; the planner columns use the
+tokenizer it packs with. Model latency scales with them.
+"""
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from scout.chunks import approx_tokens  # noqa: E402
+from scout.retrieval import BM25Index, format_context, plan_context  # noqa: E402
+
+VOCAB = [f"term{i}" for i in range(5000)] + "learning policy education health climate network model survey trial".split()
+QUERIES = ["climate policy survey", "network model learning", "health trial education outcomes"]
+
+
+def synthetic_papers(n, body_words=600, seed=7):
+    rng = random.Random(seed)
+    abstracts = []
+    for i in range(n):
+        fresh = not abstracts or i % 10
+        abstracts.append(" ".join(rng.choices(VOCAB, k=120)) if fresh else rng.choice(abstracts))
+        yield {
+            "id": f"p{i}",
+            "title": " ".join(rng.choices(VOCAB, k=8)),
+            "authors": [f"Author{i % 997}"],
+            "year": 1990 + i % 35,
+            "abstract": abstracts[-1],
+        }, " ".join(rng.choices(VOCAB, k=body_words)) if fresh else ""
+
+
+def full_dump(papers):
+    # Mirrors the previous kb_context construction
+    kb_context = ""
+    for p, body in papers:
+        content = body or p.get("abstract", "")
+        kb_context += f"""
+            ---
+            REF_CODE: [{p['authors'][0]}, {p['year']}]
+            TITLE: {p['title']}
+            CONTENT: {content[:3000]} 
+            ---
+            """
+    return kb_context
+
+
+def run(n, top_k, budget):
+    papers = list(synthetic_papers(n))
+
+    t0 = time.perf_counter()
+    dump = full_dump(papers)
+    dump_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    index = BM25Index()
+    for p, body in papers:
+        index.add_paper(p, body)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    for q in QUERIES:
+        ctx = format_context(index.search(q, k=top_k))
+    query_ms = (time.perf_counter() - t0) * 1000 / len(QUERIES)
+
+    t0 = time.perf_counter()
+    plans = [plan_context(index, q, budget=budget) for q in QUERIES]
+    plan_ms = (time.perf_counter() - t0) * 1000 / len(QUERIES)
+
+    return {
+        "papers": n,
+        "dump_chars": len(dump),
+        "dump_tokens": len(dump) // 4,
+        "dump_ms": dump_ms,
+        "rag_chars": len(ctx),
+        "rag_tokens": len(ctx) // 4,
+        "index_build_ms": build_ms,
+        "rag_turn_ms": query_ms,
+        "plan_tokens": approx_tokens(format_context(plans[-1].passages)),
+        "plan_passages": len(plans[-1].passages),
+        "plan_dups": sum(p.duplicates for p in plans),
+        "plan_turn_ms": plan_ms,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    ap.add_argument("--top-k", type=int, default=12)
+    ap.add_argument("--budget", type=int, default=6000)
+    args = ap.parse_args()
+
+    cols = ["papers", "dump_tokens", "dump_ms", "rag_tokens", "index_build_ms", "rag_turn_ms",
+            "plan_tokens", "plan_passages", "plan_dups", "plan_turn_ms"]
+    print(" | ".join(f"{c:>14}" for c in cols))
+    for n in args.sizes:
+        r = run(n, args.top_k, args.budget)
+        print(" | ".join(f"{r[c]:>14,.1f}" if isinstance(r[c], float) else f"{r[c]:>14,}" for c in cols))
+
+
+if __name__ == "__main__":
+    main()
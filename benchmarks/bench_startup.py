@@ -0,0 +1,97 @@
+"""Cold start: time to render the login screen, and what it had to import.
+
+    python benchmarks/bench_startup.py --runs 3 --budget-ms 2500
+
+Each run is a fresh interpreter that renders freelance_scout.py through
+Streamlit's ``AppTest`` with placeholder Supabase secrets (nothing connects
+before sign-in), so it measures exactly what a visitor pays after the
+container wakes up: interpreter, Streamlit, Supabase and the script itself.
+It also times importing the signed-in services on their own.
+
+Exits non-zero when the median login render is over ``--budget-ms`` or any
+deferred dependency (Gemini, Firecrawl, pandas, agraph, openpyxl, pypdf,
+DuckDuckGo, numpy) was imported before sign-in, so CI can run it as a check.
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+DEFERRED = [
+    "google.generativeai", "firecrawl", "pandas", "streamlit_agraph", "openpyxl", "pypdf",
+    "duckduckgo_search", "numpy",
+]
+SERVICES = [
+    "scout.ingest", "scout.jobs", "scout.scrape", "scout.export", "scout.matrix", "scout.notion",
+    "scout.retrieval", "scout.chunks", "scout.search", "scout.snowball", "scout.store", "scout.dedup",
+    "scout.graph", "scout.synthesis", "scout.llm_cache",
+]
+
+
+def login_child():
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "freelance_scout.py"), default_timeout=120)
+    at.secrets["supabase"] = {"url": "http://127.0.0.1:9", "key": "placeholder"}
+    at.run()
+    elapsed = time.perf_counter() - t0
+    errors = [e.value for e in at.exception] + [e.value for e in at.error]
+    return {"ms": elapsed * 1000, "loaded": [m for m in DEFERRED if m in sys.modules], "errors": errors}
+
+
+def services_child():
+    t0 = time.perf_counter()
+    for name in SERVICES:
+        __import__(name)
+    return {"ms": (time.perf_counter() - t0) * 1000, "loaded": [m for m in DEFERRED if m in sys.modules]}
+
+
+def spawn(mode):
+    # Wall time includes interpreter start-up, which a cold container pays too
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode], cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["wall_ms"] = (time.perf_counter() - t0) * 1000
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--budget-ms", type=float, default=2500, help="median login render, wall clock")
+    ap.add_argument("--child", choices=["login", "services"], help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        print(json.dumps(login_child() if args.child == "login" else services_child()))
+        return 0
+
+    logins = [spawn("login") for _ in range(args.runs)]
+    services = [spawn("services") for _ in range(args.runs)]
+    login_ms = statistics.median(r["wall_ms"] for r in logins)
+    print(f"login screen       {login_ms:8.0f}ms wall   {statistics.median(r['ms'] for r in logins):6.0f}ms render")
+    print(f"services import    {statistics.median(r['wall_ms'] for r in services):8.0f}ms wall   "
+          f"{statistics.median(r['ms'] for r in services):6.0f}ms import   loads {', '.join(services[0]['loaded']) or 'nothing deferred'}")
+
+    failures = []
+    if logins[0]["errors"]:
+        failures.append(f"login screen raised: {logins[0]['errors']}")
+    if logins[0]["loaded"]:
+        failures.append(f"imported before sign-in: {', '.join(logins[0]['loaded'])}")
+    if login_ms > args.budget_ms:
+        failures.append(f"login screen {login_ms:.0f}ms is over the {args.budget_ms:.0f}ms budget")
+    for f in failures:
+        print(f"FAIL  {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
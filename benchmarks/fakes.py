@@ -0,0 +1,606 @@
+"""Deterministic local stand-ins for Supabase, Semantic Scholar, Notion and Gemini.
+
+Each HTTP stub runs a ``ThreadingHTTPServer`` on a free localhost port and is
+started with :func:`serve`, so the real clients (supabase-py, the pooled
+``requests`` sessions in ``scout/http.py``) are exercised end to end with
+only the remote service swapped out. Generated ids, timestamps and synthetic
+papers depend only on the seed and the order of writes.
+
+``PostgRESTStub`` keeps tables in memory and answers the subset of the
+PostgREST dialect scout sends (``eq/neq/gt/gte/lt/lte/in/is/ov/wfts``
+filters, ``order``, ``offset/limit``, ``Prefer: count=exact``, upserts on
+``on_conflict``, and the project's RPCs). Like a default PostgREST it returns
+at most ``max_rows`` rows per select. Filters are plain scans, so it has no
+indexes to hide a regression behind.
+"""
+import csv
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlsplit
+
+WORDS = (
+    "policy outcomes regional health systems survey access evidence cohort analysis model urban heat "
+    "exposure climate adaptation housing equity transport emissions mortality resilience income labour "
+    "migration water energy governance network learning inference trial review"
+).split()
+STOPWORDS = frozenset("a an and as at by for from in into of on or the to via with".split())
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def serve(stub):
+    """Start ``stub`` on a free localhost port; returns ``(server, base_url)``."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), stub.handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as against the real APIs
+    # Headers and body go out as separate writes; without this, delayed ACKs add ~40ms per request
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n)) if n else None
+
+    def reply(self, status, body, headers=()):
+        data = json.dumps(body, default=str).encode() if body is not None else b""
+        self.send_response(status)
+        for k, v in headers:
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def terms(text):
+    return [w for w in re.findall(r"[a-z0-9]+", (text or "").lower()) if w not in STOPWORDS]
+
+
+# --- POSTGREST ---
+# Second unique constraint per table (the first is always ``id``)
+UNIQUE = {
+    "papers": ("project_id", "natural_key"),
+    "paper_edges": ("source_id", "target_id", "relation"),
+    "paper_chunks": ("paper_id", "ordinal"),
+    "llm_cache": ("owner_id", "key"),
+}
+DEFAULTS = {
+    "papers": {"citation_count": 0, "source_type": "external", "reading_status": "Unread", "tags": []},
+}
+# ON DELETE CASCADE children: table -> [(child table, foreign key)]
+CASCADE = {
+    "projects": [("papers", "project_id")],
+    "papers": [("paper_chunks", "paper_id"), ("paper_edges", "source_id"), ("paper_edges", "target_id")],
+}
+# BEFORE UPDATE OF triggers: table -> (column stamped with now(), columns that fire it)
+REVISION = {
+    "papers": ("revised_at", frozenset({"title", "authors", "year", "abstract", "content_body"})),
+}
+RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class PostgRESTError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status, self.code = status, code
+
+
+def _conflict(name, key):
+    return PostgRESTError(409, "23505", f'duplicate key value violates unique constraint on {name}({",".join(key)})')
+
+
+def _coerce(raw, like):
+    if isinstance(like, bool):
+        return raw == "true"
+    if isinstance(like, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _list(raw):
+    """``(a,"b,c",d)`` -> ``["a", "b,c", "d"]``."""
+    return next(csv.reader([raw.strip("(){}")], skipinitialspace=True)) if raw.strip("(){}") else []
+
+
+COMPARE = {
+    "eq": lambda a, b: a == b, "neq": lambda a, b: a != b, "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b, "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+}
+
+
+def _predicate(col, expr):
+    """Compile one ``col=op.value`` filter into a row test (parsed once per request)."""
+    op, _, raw = expr.partition(".")
+    negate = op == "not"
+    if negate:
+        op, _, raw = raw.partition(".")
+    if "fts" in op:
+        # search_tsv is generated from the title and abstract
+        wanted = set(terms(raw))
+        return lambda row: (bool(wanted) and wanted <= set(terms(f"{row.get('title')} {row.get('abstract')}"))) != negate
+    if op == "is":
+        want = None if raw == "null" else raw == "true"
+
+        def test(v):
+            return v is want
+    elif op in ("in", "ov"):
+        wanted = set(_list(raw))
+
+        def test(v):
+            if op == "ov":
+                return bool(wanted.intersection(v or ()))
+            return v is not None and str(v) in wanted
+    else:
+        compare = COMPARE[op]
+
+        def test(v):
+            if v is None:
+                return False
+            try:
+                return compare(v, _coerce(raw, v))
+            except TypeError:
+                return str(v) == raw if op == "eq" else False
+
+    return lambda row: test(row.get(col)) != negate
+
+
+def _where(filters):
+    tests = [_predicate(c, e) for c, e in filters]
+    return lambda row: all(t(row) for t in tests)
+
+
+def _candidates(table, filters):
+    """Rows an ``id=in.(...)`` filter can match, looked up by key like the primary-key index would."""
+    ids = next((_list(e[3:]) for c, e in filters if c == "id" and e.startswith("in.")), None)
+    if ids is None:
+        return list(table.values())
+    return [table[i] for i in dict.fromkeys(ids) if i in table]
+
+
+def _order(rows, spec):
+    # Stable sorts from the last key to the first; nulls go last by default
+    for part in reversed(spec.split(",")):
+        col, *mods = part.split(".")
+        desc = "desc" in mods
+        nulls_first = "nullsfirst" in mods or (desc and "nullslast" not in mods)
+        present = [r for r in rows if r.get(col) is not None]
+        missing = [r for r in rows if r.get(col) is None]
+        present.sort(key=lambda r: r[col], reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+class _PrimaryKey:
+    """``{(id,): row}`` view over a table keyed by id."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, key):
+        return self.table.get(key[0])
+
+    def __contains__(self, key):
+        return key[0] in self.table
+
+
+class PostgRESTStub:
+    """In-memory tables behind the PostgREST HTTP API, plus scout's RPCs."""
+
+    def __init__(self, latency=0.0, max_rows=1000):
+        self.latency = latency
+        self.max_rows = max_rows
+        self.tables = {}
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self._ids = itertools.count(1)
+        self._clock = itertools.count(1)
+
+    # --- DATA ---
+    def table(self, name):
+        return self.tables.setdefault(name, {})
+
+    def new_id(self):
+        return str(uuid.UUID(int=next(self._ids)))
+
+    def now(self):
+        return (EPOCH + timedelta(microseconds=next(self._clock))).isoformat()
+
+    def _defaults(self, name, row):
+        out = {**DEFAULTS.get(name, {}), **row}
+        out.setdefault("id", self.new_id())
+        out.setdefault("created_at", self.now())
+        if name in REVISION:
+            out.setdefault(REVISION[name][0], out["created_at"])
+        return out
+
+    def _revise(self, name, row, cols):
+        if name in REVISION and REVISION[name][1] & set(cols):
+            row[REVISION[name][0]] = self.now()
+
+    def seed(self, name, rows):
+        """Load rows directly, bypassing HTTP; returns them with ids filled in."""
+        table = self.table(name)
+        out = []
+        with self.lock:
+            for r in rows:
+                r = self._defaults(name, r)
+                table[r["id"]] = r
+                out.append(r)
+        return out
+
+    def checkpoint(self):
+        with self.lock:
+            return {name: {k: dict(v) for k, v in rows.items()} for name, rows in self.tables.items()}
+
+    def restore(self, state):
+        with self.lock:
+            self.tables = {name: {k: dict(v) for k, v in rows.items()} for name, rows in state.items()}
+
+    # --- VERBS ---
+    def select(self, name, params):
+        where = _where(params["filters"])
+        rows = [r for r in self.table(name).values() if where(r)]
+        total = len(rows)
+        if params.get("order"):
+            rows = _order(rows, params["order"])
+        offset = int(params.get("offset") or 0)
+        limit = min(int(params.get("limit") or self.max_rows), self.max_rows)
+        rows = rows[offset:offset + limit]
+        cols = [c.strip('"') for c in (params.get("select") or "*").split(",")]
+        if cols != ["*"]:
+            rows = [{c: r.get(c) for c in cols} for r in rows]
+        return rows, total, offset
+
+    def write(self, name, payload, on_conflict=None, merge=False):
+        table = self.table(name)
+        keys = [("id",)] + ([UNIQUE[name]] if name in UNIQUE else [])
+        conflict = tuple(on_conflict.split(",")) if on_conflict else ("id",)
+        # The primary key is the table itself; other unique keys are scanned per request
+        lookup = {("id",): _PrimaryKey(table)}
+        for k in set(keys[1:]) | ({conflict} - {("id",)}):
+            lookup[k] = {tuple(r.get(c) for c in k): r for r in table.values()}
+        out = []
+        for row in payload if isinstance(payload, list) else [payload]:
+            existing = lookup[conflict].get(tuple(row.get(c) for c in conflict)) if all(c in row for c in conflict) else None
+            if existing is not None and merge:
+                existing.update(row)
+                self._revise(name, existing, row)
+                out.append(dict(existing))
+                continue
+            row = self._defaults(name, row)
+            for k in keys:
+                value = tuple(row.get(c) for c in k)
+                if None not in value and value in lookup[k]:
+                    raise _conflict(name, k)
+            table[row["id"]] = row
+            for k in lookup:
+                if k != ("id",):
+                    lookup[k][tuple(row.get(c) for c in k)] = row
+            out.append(dict(row))
+        return out
+
+    def update(self, name, filters, diff):
+        table = self.table(name)
+        where = _where(filters)
+        hits = [r for r in _candidates(table, filters) if where(r)]
+        for k in [UNIQUE[name]] if name in UNIQUE and set(UNIQUE[name]) & set(diff) else []:
+            # Unique keys are checked against the rows as they will be after the update
+            changed = {r["id"] for r in hits}
+            taken = Counter(tuple(r.get(c) for c in k) for r in table.values() if r["id"] not in changed)
+            taken.update(tuple({**r, **diff}.get(c) for c in k) for r in hits)
+            if any(n > 1 and None not in value for value, n in taken.items()):
+                raise _conflict(name, k)
+        for r in hits:
+            r.update(diff)
+            self._revise(name, r, diff)
+        return [dict(r) for r in hits]
+
+    def delete(self, name, filters):
+        table = self.table(name)
+        where = _where(filters)
+        gone = [r for r in table.values() if where(r)]
+        for r in gone:
+            table.pop(r["id"], None)
+        ids = ",".join(r["id"] for r in gone)
+        for child, fk in CASCADE.get(name, ()):
+            if gone and child in self.tables:
+                self.delete(child, [(fk, f"in.({ids})")])
+        return gone
+
+    # --- RPC ---
+    def rpc(self, fn, params):
+        method = getattr(self, f"rpc_{fn}", None)
+        if method is None:
+            raise PostgRESTError(404, "PGRST202", f"Could not find the function public.{fn}")
+        return method(**params)
+
+    def rpc_paper_status_counts(self, p_project_id):
+        counts = Counter(r.get("reading_status") or "Unread" for r in self.table("papers").values() if r.get("project_id") == p_project_id)
+        return [{"reading_status": s, "papers": n} for s, n in counts.most_common()]
+
+    def rpc_top_cited_papers(self, p_project_id, p_limit=10):
+        rows = [r for r in self.table("papers").values() if r.get("project_id") == p_project_id]
+        rows = _order(rows, "citation_count.desc.nullslast,impact_score.desc.nullslast")[:p_limit]
+        return [
+            {"id": r["id"], "title": r["title"], "year": r.get("year"), "citation_count": r.get("citation_count") or 0,
+             "impact_score": r.get("impact_score") or 0.0}
+            for r in rows
+        ]
+
+    def rpc_match_chunks(self, p_project_id, p_query, p_limit=20):
+        wanted = terms(p_query)
+        hits = []
+        for c in self.table("paper_chunks").values():
+            if c.get("project_id") != p_project_id or not wanted:
+                continue
+            words = terms(f"{c.get('section') or ''} {c['content']}")
+            counts = Counter(words)
+            if all(counts[w] for w in wanted):
+                hits.append((sum(counts[w] for w in wanted) / (1 + len(words) / 100), c))
+        hits.sort(key=lambda h: h[0], reverse=True)
+        out = []
+        for rank, c in hits[:p_limit]:
+            words = c["content"].split()
+            first = next((i for i, w in enumerate(words) if terms(w) and terms(w)[0] in wanted), 0)
+            window = words[max(0, first - 10):first + 25]
+            snippet = " ".join(f"<b>{w}</b>" if terms(w) and terms(w)[0] in wanted else w for w in window)
+            out.append({k: c.get(k) for k in ("id", "paper_id", "ordinal", "page", "section", "tokens")} | {"rank": rank, "snippet": snippet})
+        return out
+
+    def rpc_replace_paper_chunks(self, p_paper_id, p_chunks):
+        paper = self.table("papers").get(p_paper_id)
+        if paper is None:
+            raise PostgRESTError(404, "P0002", f"paper {p_paper_id} not found")
+        self.delete("paper_chunks", [("paper_id", f"eq.{p_paper_id}")])
+        owner = {"project_id": paper.get("project_id"), "paper_id": p_paper_id, "owner_id": paper.get("owner_id")}
+        if p_chunks:
+            self.write("paper_chunks", [{**c, **owner} for c in p_chunks])
+        paper["content_body"] = None
+        self._revise("papers", paper, ["content_body"])
+        return len(p_chunks)
+
+    # --- HTTP ---
+    def handler(self):
+        stub = self
+
+        class Handler(JSONHandler):
+            def route(self):
+                url = urlsplit(self.path)
+                parts = url.path.strip("/").split("/")
+                if parts[:2] != ["rest", "v1"] or len(parts) < 3:
+                    return self.reply(404, {"message": "not found"})
+                stub.requests[self.command] += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                pairs = parse_qsl(url.query, keep_blank_values=True)
+                params = {k: v for k, v in pairs if k in RESERVED}
+                params["filters"] = [(k, v) for k, v in pairs if k not in RESERVED]
+                prefer = self.headers.get("Prefer") or ""
+                body = self.body()
+                try:
+                    with stub.lock:
+                        if parts[2] == "rpc":
+                            return self.reply(200, stub.rpc(parts[3], body or {}))
+                        name = parts[2]
+                        if self.command == "GET":
+                            rows, total, offset = stub.select(name, params)
+                            end = offset + len(rows) - 1
+                            span = f"{offset}-{end}" if rows else "*"
+                            return self.reply(200, rows, [("Content-Range", f"{span}/{total if 'count=exact' in prefer else '*'}")])
+                        if self.command == "POST":
+                            rows = stub.write(name, body, params.get("on_conflict"), merge="merge-duplicates" in prefer)
+                            return self.reply(201, rows)
+                        if self.command == "PATCH":
+                            return self.reply(200, stub.update(name, params["filters"], body))
+                        if self.command == "DELETE":
+                            return self.reply(200, stub.delete(name, params["filters"]))
+                except PostgRESTError as e:
+                    return self.reply(e.status, {"code": e.code, "message": str(e), "details": None, "hint": None})
+                except (KeyError, TypeError, ValueError) as e:
+                    return self.reply(400, {"code": "PGRST100", "message": f"unsupported request: {e!r}", "details": None, "hint": None})
+
+            do_GET = do_POST = do_PATCH = do_DELETE = route
+
+        return Handler
+
+
+# --- SEMANTIC SCHOLAR ---
+def s2_id(n):
+    return f"{n:040x}"
+
+
+class S2Stub:
+    """Semantic Scholar Graph API over a synthetic citation graph of ``universe`` papers.
+
+    Paper ``n`` and its references and citations are a pure function of
+    ``(seed, n)``; ``/paper/search`` hashes the query onto the universe.
+    """
+
+    def __init__(self, universe=500_000, degree=12, latency=0.0, seed=11):
+        self.universe, self.degree, self.latency, self.seed = universe, degree, latency, seed
+        self.requests = Counter()
+        self._titles = {}
+
+    def paper(self, n):
+        rng = random.Random(self.seed * 1_000_003 + n)
+        title = " ".join(rng.choices(WORDS, k=rng.randint(6, 12))).capitalize() + f" ({n})"
+        self._titles[" ".join(terms(title))] = n
+        return {
+            "paperId": s2_id(n),
+            "externalIds": {"DOI": f"10.5555/s2.{n}"} if rng.random() < 0.7 else {},
+            "title": title,
+            "authors": [{"name": f"Author {rng.randint(1, 20000)}"} for _ in range(rng.randint(1, 5))],
+            "year": rng.randint(1990, 2026),
+            "abstract": " ".join(rng.choices(WORDS, k=rng.randint(40, 90))),
+            "url": f"https://www.semanticscholar.org/paper/{s2_id(n)}",
+            "citationCount": int(rng.paretovariate(1.2)) - 1,
+        }
+
+    def neighbours(self, n, direction):
+        rng = random.Random(self.seed * 7_000_003 + n * 2 + (direction == "citations"))
+        return [rng.randrange(self.universe) for _ in range(rng.randint(self.degree // 2, self.degree * 2))]
+
+    def fields(self, n, fields):
+        meta = self.paper(n)
+        out = {"paperId": meta["paperId"]}
+        for f in fields.split(","):
+            head, _, sub = f.partition(".")
+            if head in ("references", "citations"):
+                out[head] = [{"paperId": s2_id(m)} for m in self.neighbours(n, head)]
+            elif head in meta:
+                out[head] = meta[head]
+        return out
+
+    def search(self, query, limit):
+        base = zlib.crc32(query.lower().encode())
+        return [self.paper((base + i * 7919) % self.universe) for i in range(limit)]
+
+    def match(self, query):
+        n = self._titles.get(" ".join(terms(query)))
+        if n is None:
+            n = zlib.crc32(query.lower().encode()) % self.universe
+        return {"paperId": s2_id(n), "title": self.paper(n)["title"], "matchScore": 100.0}
+
+    def handler(self):
+        stub = self
+
+        class Handler(JSONHandler):
+            def route(self):
+                url = urlsplit(self.path)
+                q = dict(parse_qsl(url.query))
+                path = url.path.rstrip("/")
+                stub.requests[path.rsplit("/", 1)[-1]] += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if path.endswith("/paper/search/match"):
+                    return self.reply(200, {"data": [stub.match(q.get("query", ""))]})
+                if path.endswith("/paper/search"):
+                    return self.reply(200, {"total": stub.universe, "offset": 0, "data": stub.search(q.get("query", ""), int(q.get("limit", 10)))})
+                if path.endswith("/paper/batch"):
+                    fields = q.get("fields", "title")
+                    out = []
+                    for pid in (self.body() or {}).get("ids", []):
+                        try:
+                            n = int(pid, 16)
+                        except ValueError:
+                            n = -1
+                        out.append(stub.fields(n, fields) if 0 <= n < stub.universe else None)
+                    return self.reply(200, out)
+                return self.reply(404, {"error": "not found"})
+
+            do_GET = do_POST = route
+
+        return Handler
+
+
+# --- NOTION ---
+class NotionStub:
+    """Notion pages API: token bucket at ``rate`` req/s (``burst`` deep) plus fixed latency."""
+
+    def __init__(self, rate=3.0, burst=3, latency=0.05):
+        self.rate, self.burst, self.latency = rate, burst, latency
+        self.tokens, self.stamp = float(burst), time.monotonic()
+        self.pages, self.counts = {}, {"POST": 0, "PATCH": 0, "429": 0}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def admit(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens < 1:
+                self.counts["429"] += 1
+                return False
+            self.tokens -= 1
+            return True
+
+    def handler(self):
+        stub = self
+
+        class Handler(JSONHandler):
+            def handle_write(self, method):
+                body = self.body()
+                if not stub.admit():
+                    return self.reply(429, {"code": "rate_limited"}, [("Retry-After", "1")])
+                time.sleep(stub.latency)
+                with stub.lock:
+                    stub.counts[method] += 1
+                    if method == "POST":
+                        page_id = str(uuid.UUID(int=next(stub._ids)))
+                    else:
+                        page_id = self.path.rsplit("/", 1)[-1]
+                        if page_id not in stub.pages:
+                            return self.reply(404, {"code": "object_not_found"})
+                    stub.pages[page_id] = body["properties"]
+                self.reply(200, {"object": "page", "id": page_id})
+
+            def do_POST(self):
+                self.handle_write("POST")
+
+            def do_PATCH(self):
+                self.handle_write("PATCH")
+
+        return Handler
+
+
+# --- GEMINI ---
+class FakeModel:
+    """Stands in for ``genai.GenerativeModel``.
+
+    Every call waits ``latency`` seconds before the first token, then emits
+    ``answer_tokens`` tokens at ``tokens_per_s``. Prompts asking for JSON get
+    a fixed JSON object; everything else gets deterministic prose.
+    """
+
+    def __init__(self, latency=0.4, tokens_per_s=200.0, answer_tokens=120, model_name="models/fake-gemini"):
+        self.latency, self.tokens_per_s, self.answer_tokens = latency, tokens_per_s, answer_tokens
+        self.model_name = model_name
+        self.calls = 0
+
+    def _answer(self, prompt, json_mode):
+        if json_mode:
+            return json.dumps({"queries": terms(prompt)[:3], "summary": "synthetic", "methodology": "synthetic"})
+        rng = random.Random(zlib.crc32(prompt.encode()))
+        return " ".join(rng.choices(WORDS, k=self.answer_tokens)) + "."
+
+    def _usage(self, prompt, out_tokens):
+        return SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=out_tokens, total_token_count=len(prompt) // 4 + out_tokens)
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        self.calls += 1
+        prompt = prompt if isinstance(prompt, str) else json.dumps(prompt, default=str)
+        json_mode = (generation_config or {}).get("response_mime_type") == "application/json"
+        text = self._answer(prompt, json_mode)
+        if not stream:
+            time.sleep(self.latency + len(text.split()) / self.tokens_per_s)
+            return SimpleNamespace(text=text, usage_metadata=self._usage(prompt, len(text.split())))
+        return self._stream(prompt, text)
+
+    def _stream(self, prompt, text, per_chunk=8):
+        time.sleep(self.latency)
+        words = text.split(" ")
+        for i in range(0, len(words), per_chunk):
+            piece = " ".join(words[i:i + per_chunk]) + (" " if i + per_chunk < len(words) else "")
+            time.sleep(len(words[i:i + per_chunk]) / self.tokens_per_s)
+            last = i + per_chunk >= len(words)
+            yield SimpleNamespace(text=piece, usage_metadata=self._usage(prompt, len(words)) if last else None)
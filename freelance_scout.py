@@ -1,24 +1,9 @@
 import streamlit as st
-import pandas as pd
-from supabase import create_client, Client
-import google.generativeai as genai
-import requests
-from io import BytesIO
-from pypdf import PdfReader
+from scout.services import Services
+from scout.telemetry import telemetry
 from datetime import datetime
+from dataclasses import replace
 import json
-import tempfile
-import pathlib
-from pydantic import BaseModel, Field
-from typing import List, Optional
-from streamlit_extras.add_vertical_space import add_vertical_space
-from duckduckgo_search import DDGS
-from firecrawl import FirecrawlApp
-import xml.etree.ElementTree as ET
-from streamlit_agraph import agraph, Node, Edge, Config
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
 
 # --- CONFIGURATION & MODELS ---
 st.set_page_config(
@@ -28,56 +13,9 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-def generate_excel_matrix(papers):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Research Matrix"
-    
-    # Headers
-    headers = ["Title", "Authors", "Year", "Status", "Impact Score", "Source", "Abstract/Summary"]
-    ws.append(headers)
-    
-    # Styling Headers
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="121212", end_color="121212", fill_type="solid")
-    
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-        
-    # Data Rows
-    for p in papers:
-        authors = ", ".join(p.get('authors', [])) if isinstance(p.get('authors'), list) else "Anon"
-        row = [
-            p.get('title', 'Untitled'),
-            authors,
-            p.get('year', 'n.d.'),
-            p.get('reading_status', 'Unread'),
-            p.get('impact_score', 0.0),
-            p.get('source_type', 'Unknown'),
-            p.get('abstract', '')[:1000] # Truncate massive abstracts for Excel readability
-        ]
-        ws.append(row)
-        
-    # Auto-adjust column widths
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter # Get the column name
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        # Cap width
-        if adjusted_width > 50: adjusted_width = 50
-        ws.column_dimensions[column].width = adjusted_width
-        
-    buf = BytesIO()
-    wb.save(buf)
-    return buf.getvalue()
+# Everything timed from here to the end of the script is this rerun (scout/telemetry.py)
+st.session_state.last_run = st.session_state.get("this_run")
+st.session_state.this_run = telemetry.begin_run()
 
 # Custom Premium CSS: THE FACTORY 2.0
 st.markdown("""
@@ -260,81 +198,36 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class PaperAnalysis(BaseModel):
-    relevant: bool = Field(description="Is this paper highly relevant to the research query?")
-    summary: str = Field(description="2-sentence academic summary focusing on findings.")
-    methodology: str = Field(description="Primary research methodology used (e.g. Qualitative, Meta-analysis, Empirical).")
-
-class Metadata(BaseModel):
-    title: str = Field(description="Full academic title of the paper.")
-    authors: List[str] = Field(description="List of all contributing authors.")
-    year: Optional[int] = Field(description="Year of publication.")
-    abstract: str = Field(description="Concise abstract or summary.")
-
-class ScrapedContent(BaseModel):
-    title: str = Field(description="The clear title of the article or paper.")
-    author: str = Field(description="Name of the primary author or organization.")
-    publication_date: str = Field(description="Date of publication (YYYY-MM-DD) or 'n.d.'")
-    key_findings: List[str] = Field(description="List of 3-5 main takeaways or results.")
-    methodology: str = Field(description="Brief description of how the information was gathered (e.g., 'Opinion', 'Case Study', 'Review').")
-    summary: str = Field(description="A coherent paragraph summarizing the full content.")
-
-class SynthesisResponse(BaseModel):
-    answer: str
-    citations: List[str]
-
-@st.cache_resource
-def init_supabase():
-    return create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
-
 @st.cache_resource
-def init_gemini():
-    genai.configure(api_key=st.secrets["google"]["api_key"])
-    return genai.GenerativeModel('gemini-2.0-flash')
-
-@st.cache_resource
-def init_firecrawl():
-    key = st.secrets["firecrawl"].get("api_key")
-    return FirecrawlApp(api_key=key) if key else None
+def init_services():
+    # One set of clients per process, each built on first use (scout/services.py)
+    services = Services(st.secrets)
+    services.start_telemetry()
+    return services
 
 try:
-    db = init_supabase()
-    ai = init_gemini()
-    firecrawl = init_firecrawl()
+    services = init_services()
+    db = services.db
 except Exception as e:
     st.error(f"Initialization Failed: {e}")
     st.stop()
 
-def generate_word_xml_bib(papers):
-    root = ET.Element("b:Sources", {
-        "SelectedStyle": "\\APA.XSL",
-        "xmlns:b": "http://schemas.openxmlformats.org/officeDocument/2006/bibliography",
-        "xmlns": "http://schemas.openxmlformats.org/officeDocument/2006/bibliography"
-    })
-    for p in papers:
-        source = ET.SubElement(root, "b:Source")
-        ET.SubElement(source, "b:Tag").text = p['title'][:10] + str(p['year'])
-        ET.SubElement(source, "b:SourceType").text = "JournalArticle"
-        author_list = ET.SubElement(ET.SubElement(source, "b:Author"), "b:Author")
-        names = ET.SubElement(author_list, "b:NameList")
-        for a in p['authors']:
-            person = ET.SubElement(names, "b:Person")
-            ET.SubElement(person, "b:Last").text = a
-        ET.SubElement(source, "b:Title").text = p['title']
-        ET.SubElement(source, "b:Year").text = str(p['year'])
-    return ET.tostring(root, encoding='utf-8')
-
 # --- AUTHENTICATION ---
 if "user" not in st.session_state:
     st.session_state.user = None
+if "session" not in st.session_state:
+    st.session_state.session = None
 if "auth_mode" not in st.session_state:
     st.session_state.auth_mode = "Login" # Keep this line for initial state, though the new auth_gate might override it.
 
 if st.session_state.user:
     try:
-        db.postgrest.auth(st.session_state.user.access_token)
-    except:
-        pass
+        # Refreshed here, by the session that owns the refresh token; jobs only ever get the access token
+        st.session_state.session = services.fresh_session(st.session_state.session)
+        db.postgrest.auth(st.session_state.session.access_token)
+    except Exception:
+        # No session to refresh, or it was revoked: sign in again
+        st.session_state.user = st.session_state.session = None
 
 # Main Cinematic Header
 st.markdown('<p class="sub-header" style="margin-top: 4rem;">EST. 2026</p>', unsafe_allow_html=True)
@@ -357,6 +250,7 @@ def auth_gate():
                 try:
                     res = db.auth.sign_in_with_password({"email": email, "password": password})
                     st.session_state.user = res.user
+                    st.session_state.session = res.session
                     st.rerun()
                 except Exception as e:
                     st.error(f"Access Denied: {str(e)}")
@@ -375,6 +269,40 @@ def auth_gate():
 if not auth_gate():
     st.stop()
 
+# --- SERVICES ---
+# Imported past the auth gate so the login screen loads only Streamlit and
+# Supabase; SDK clients (Gemini, Firecrawl) are built on first use, and
+# pandas, agraph and openpyxl load with the tab or export that needs them.
+from scout.ingest import stage_uploads
+from scout.jobs import batch_stats, batch_fraction
+from scout.export import lazy_export
+from scout.matrix import MatrixQuery, fetch_page, passage_hits, status_counts, top_cited, MATRIX_COLUMNS, STATUSES as MATRIX_STATUSES, SOURCES as MATRIX_SOURCES, SORTS as MATRIX_SORTS
+from scout.repository import PaperRepository
+from scout.retrieval import CONTEXT_TOKENS, location
+from scout.search import merge_results
+from scout.snowball import DIRECTIONS as SNOWBALL_DIRECTIONS, to_row
+from scout.store import PaperStore
+from scout.dedup import find_duplicates, merge_duplicates
+from scout.graph import project_graph, link_papers, graph_metrics
+from scout.synthesis import SynthesisStream, TurnMetrics, grounded_prompt
+
+JOB_LABELS = {"ingest_pdf": "PDF Ingest", "snowball": "Snowball Mining", "scrape_url": "Scrape URL", "notion_sync": "Notion Sync"}
+
+try:
+    ai = services.gemini
+    firecrawl = services.firecrawl
+    scholar = services.scholar
+    llm_cache = services.llm_cache
+    chunks = services.chunks
+    # Workers live with the process, so missions survive reruns and refreshes
+    jobs = services.jobs
+    if st.session_state.user:
+        # This user's unfinished missions run on their current token
+        jobs.reauth(st.session_state.user.id, st.session_state.session.access_token)
+except Exception as e:
+    st.error(f"Initialization Failed: {e}")
+    st.stop()
+
 # Sidebar: The Curator's Panel
 with st.sidebar:
     st.markdown('<p class="sector-badge" style="text-align:left; margin-bottom:1rem;">THE CURATOR\'S PANEL</p>', unsafe_allow_html=True)
@@ -384,7 +312,7 @@ with st.sidebar:
         st.info(f"Identity: {st.session_state.user.email}")
         if st.button("Exit Factory"):
             db.auth.sign_out() # Changed supabase to db
-            st.session_state.user = None
+            st.session_state.user = st.session_state.session = None
             st.rerun()
 
     st.markdown("---")
@@ -399,6 +327,11 @@ with st.sidebar:
         sel = st.selectbox("Select Workspace", p_names, key="sidebar_project_select")
         active_project = next(p for p in projects if p['name'] == sel)
         st.session_state.project_id = active_project['id']
+        # One shared paper snapshot per project, invalidated on every write
+        repo = PaperRepository(db, st.session_state.project_id, st.session_state)
+        # Write-behind: every paper write queues here and flushes as batched upserts,
+        # with near-duplicates merged or flagged on the way in (scout/dedup.py)
+        store = PaperStore(repo, services.dedup)
     else:
         st.session_state.project_id = None
         st.info("No workspaces allocated.")
@@ -420,7 +353,7 @@ with st.sidebar:
             st.warning("This will permanently incinerate all intelligence records within this workspace.")
             if st.button("CONFIRM DELETE"):
                 try:
-                    db.table("papers").delete().eq("project_id", st.session_state.project_id).execute()
+                    repo.delete_all()
                     db.table("projects").delete().eq("id", st.session_state.project_id).execute()
                     st.session_state.project_id = None
                     st.success("Workspace Deleted.")
@@ -428,8 +361,75 @@ with st.sidebar:
                 except Exception as e:
                     st.error(f"Deletion Failed: {e}")
 
+    if st.session_state.project_id:
+        batch_ids = jobs.recent_batches(st.session_state.project_id, limit=5)
+        if batch_ids:
+            active = any(batch_stats(jobs.batch(b))["active"] for b in batch_ids)
+
+            @st.fragment(run_every=3 if active else None)
+            def missions_panel(batch_ids):
+                st.markdown('<p class="nav-label">BACKGROUND MISSIONS</p>', unsafe_allow_html=True)
+                seen = st.session_state.setdefault("jobs_seen", {})
+                refresh = False
+                for batch_id in batch_ids:
+                    batch = jobs.batch(batch_id)
+                    stats = batch_stats(batch)
+                    label = JOB_LABELS.get(batch[0]["kind"], batch[0]["kind"])
+                    if len(batch) == 1:
+                        job = batch[0]
+                        note = (job["progress"] or {}).get("note") if job["status"] in ("running", "cancelling") else job["message"]
+                        text = f"{label} · {job['status']}" + (f" · {note}" if note else "")
+                    else:
+                        text = f"{label} · {stats['settled']}/{stats['total']} · {stats['failed']} failed"
+                    st.progress(batch_fraction(batch), text=text)
+                    if stats["active"]:
+                        if st.button("Cancel", key=f"cancel_{batch_id}"):
+                            jobs.cancel(batch_id)
+                    elif stats["failed"] or stats["cancelled"]:
+                        if st.button("Retry", key=f"retry_{batch_id}"):
+                            jobs.retry(batch_id)
+                    # Jobs write papers behind the session's back; refresh its snapshot as they land
+                    if batch_id in seen and seen[batch_id] != stats["done"]:
+                        repo.invalidate()
+                        refresh = refresh or not stats["active"]
+                    seen[batch_id] = stats["done"]
+                if refresh:
+                    st.rerun()
+
+            missions_panel(batch_ids)
+
     st.markdown('<p class="nav-label">TERMINAL STATUS</p>', unsafe_allow_html=True)
     st.success("COCKPIT ACTIVE")
+    st.caption(f"LLM cache: {llm_cache.hits} hits / {llm_cache.misses} misses ({llm_cache.hit_rate:.0%})")
+
+    admins = services.section("telemetry").get("admins") or []
+    if st.session_state.user.email in admins:
+        with st.expander("⏱ PERFORMANCE", expanded=False):
+            if st.session_state.last_run:
+                wall_ms, breakdown = telemetry.run_breakdown(st.session_state.last_run)
+                st.markdown(f"**Last rerun** · {wall_ms:,.0f} ms")
+                if breakdown:
+                    st.dataframe(breakdown, hide_index=True, use_container_width=True, column_config={
+                        "total_ms": st.column_config.NumberColumn("total ms", format="%.0f"),
+                        "max_ms": st.column_config.NumberColumn("max ms", format="%.0f"),
+                    })
+            ops = telemetry.summary()
+            if ops:
+                st.markdown("**Slowest operations** (p95, since start)")
+                st.dataframe(
+                    [{k: r[k] for k in ("operation", "calls", "p50_ms", "p95_ms", "p99_ms", "max_ms", "errors", "rows", "bytes", "tokens_in", "tokens_out")} for r in ops[:15]],
+                    hide_index=True, use_container_width=True,
+                    column_config={k: st.column_config.NumberColumn(k.replace("_ms", " ms"), format="%.0f") for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")},
+                )
+                for s in telemetry.slowest(5):
+                    st.caption(f"{s.ms:,.0f} ms · {s.name} · {s.thread}" + (f" · {s.error}" if s.error else ""))
+            caches = telemetry.cache_stats()
+            if caches:
+                st.markdown("**Caches**")
+                st.caption(" · ".join(f"{name} {c['hit_rate']:.0%} ({c['hits']}/{c['hits'] + c['misses']})" for name, c in sorted(caches.items())))
+            if st.button("Reset timings"):
+                telemetry.reset()
+                st.rerun()
     st.markdown("---")
     st.markdown("<p style='font-size: 0.6rem; color: #121212; text-align: center; opacity: 0.5;'>THE FACTORY<br>© 2026 ANTIGRAVITY AI</p>", unsafe_allow_html=True)
 
@@ -452,53 +452,39 @@ if st.session_state.project_id:
             mode = st.radio("Mission Mode", ["Search", "Ingest PDF", "Scrape URL"], horizontal=True)
 
             if mode == "Ingest PDF":
-                up = st.file_uploader("Source PDF", type="pdf", label_visibility="collapsed")
-                if st.button("EXECUTE INGEST", use_container_width=True) and up:
-                    with st.spinner("Uploading & Analyzing (Vision Engine)..."):
-                        # 1. Save to Temp File
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                            tmp.write(up.getvalue())
-                            tmp_path = tmp.name
-
-                        try:
-                            # 2. Upload to Gemini
-                            pdf_file = genai.upload_file(tmp_path, mime_type="application/pdf")
-                            
-                            # 3. Two-Pass Extraction (Vision)
-                            # Pass A: Strict Metadata
-                            meta_res = ai.generate_content(
-                                [pdf_file, "Extract strict academic metadata."], 
-                                generation_config={"response_mime_type": "application/json", "response_schema": ScrapedContent}
-                            ).text
-                            meta = ScrapedContent.model_validate_json(meta_res)
-                            
-                            # Pass B: Full Content Ingest
-                            content_res = ai.generate_content([pdf_file, "Transcribe this full document into clean Markdown. Describe all charts/images."]).text
-
-                            # 4. Archive
-                            rich_abstract = f"""{meta.summary}
-                            
-                            KEY FINDINGS:
-                            {chr(10).join(['- ' + k for k in meta.key_findings])}
-                            
-                            METHODOLOGY: {meta.methodology}
-                            """
-
-                            db.table("papers").insert({
-                                "project_id": st.session_state.project_id,
-                                "title": meta.title,
-                                "authors": [meta.author], # Schema expects list
-                                "year": int(meta.publication_date[:4]) if meta.publication_date[0].isdigit() else datetime.now().year,
-                                "abstract": rich_abstract,
-                                "content_body": content_res, # New Full Text Column
-                                "source_type": "pdf"
-                            }).execute()
-                            st.toast("PDF Digitized & Archived (Vision-Enhanced)!")
-                            
-                        except Exception as e:
-                            st.error(f"Ingest Error: {e}")
-                        finally:
-                            pathlib.Path(tmp_path).unlink(missing_ok=True)
+                ups = st.file_uploader("Source PDFs or ZIP", type=["pdf", "zip"], accept_multiple_files=True, label_visibility="collapsed")
+                if st.button("EXECUTE INGEST", use_container_width=True) and ups:
+                    # Staged to disk and queued; the worker pool does the rest off the script thread
+                    items = stage_uploads((u.name, u.getvalue()) for u in ups)
+                    if items:
+                        jobs.submit("ingest_pdf", st.session_state.project_id, items, owner_id=st.session_state.user.id, access_token=st.session_state.session.access_token)
+                        st.rerun()  # surface it in Background Missions
+                    else:
+                        st.warning("No PDFs found in the upload.")
+
+                batch_ids = jobs.recent_batches(st.session_state.project_id, limit=1, kind="ingest_pdf")
+                if batch_ids:
+                    active = batch_stats(jobs.batch(batch_ids[0]))["active"] > 0
+
+                    @st.fragment(run_every=3 if active else None)
+                    def ingest_panel(batch_id):
+                        batch = jobs.batch(batch_id)
+                        stats = batch_stats(batch)
+                        st.progress(
+                            stats["settled"] / stats["total"],
+                            text=f"{stats['settled']}/{stats['total']} PDFs · {stats['per_min']:.1f} PDFs/min · {stats['failed']} failed",
+                        )
+                        st.dataframe(
+                            [{
+                                "File": j["name"],
+                                "Status": j["status"],
+                                "Pages (vision)": f"{j['result']['pages']} ({j['result']['vision_pages']})" if j["result"] else "",
+                                "Detail": ((j["result"] or {}).get("title") or j["message"] or "") + (" (merged into existing)" if (j["result"] or {}).get("merged") else ""),
+                            } for j in batch],
+                            hide_index=True, use_container_width=True,
+                        )
+
+                    ingest_panel(batch_ids[0])
             else:
                 cmd = st.text_input("UNIFIED COMMAND", key="unified_cmd", placeholder="Enter keywords or URL...", label_visibility="collapsed")
                 c1, c2 = st.columns(2)
@@ -508,25 +494,13 @@ if st.session_state.project_id:
                 # Initialize Session State for Auto-Pilot
                 if "pilot_proposal" not in st.session_state: st.session_state.pilot_proposal = None
 
+                def perform_search(term):
+                    return scholar.search(term, grey_lit=grey_lit, on_warning=st.write)
+
                 if st.button("EXECUTE MISSION", use_container_width=True):
                     try:
                         if mode == "Search" and cmd:
                             with st.status("Executing Scout...") as status:
-                                def perform_search(term):
-                                    try:
-                                        ss = requests.get(f"https://api.semanticscholar.org/graph/v1/paper/search?query={term}&limit=10&fields=title,authors,year,abstract,url", timeout=10).json().get("data", [])
-                                    except Exception:
-                                        ss = []
-                                    
-                                    if grey_lit:
-                                        try:
-                                            with DDGS() as ddgs:
-                                                for dr in ddgs.text(f"{term} filetype:pdf", max_results=5):
-                                                    ss.append({"title": dr['title'], "url": dr['href'], "abstract": dr['body'], "authors": [{"name": "Web Source"}], "year": datetime.now().year, "source_type": "grey"})
-                                        except Exception as e:
-                                            st.write(f"Grey Lit Warning: {e}")
-                                    return ss
-                                
                                 results = perform_search(cmd)
                                 st.session_state.current_results = results
                                 
@@ -542,8 +516,10 @@ if st.session_state.project_id:
                                         Return JSON: {{ "analysis": "...", "queries": ["q1", "q2", "q3"] }}
                                         """
                                         try:
-                                            strategy = json.loads(ai.generate_content(strategy_prompt, generation_config={"response_mime_type": "application/json"}).text)
+                                            strategy = llm_cache.generate(ai, strategy_prompt, generation_config={"response_mime_type": "application/json"}, parse=json.loads)
                                             st.session_state.pilot_proposal = strategy
+                                            # Warm all trajectories concurrently so any pick is instant
+                                            scholar.prefetch(strategy.get('queries', []), grey_lit=grey_lit)
                                         except Exception as e:
                                             st.warning(f"Auto-Pilot Glitch: {e}")
                                 else:
@@ -551,42 +527,9 @@ if st.session_state.project_id:
                                 status.update(label="Scout Complete", state="complete")
 
                         elif mode == "Scrape URL" and cmd and firecrawl:
-                             with st.spinner("Scraping Sector..."):
-                                try:
-                                    sc = firecrawl.scrape_url(cmd, params={'formats': ['markdown']})
-                                    md = sc.get('markdown','')
-                                    
-                                    if not md: raise ValueError("No markdown content returned.")
-
-                                    # Validated Extraction
-                                    extract_prompt = f"Analyze this web content and extract strict metadata: {md[:8000]}"
-                                    ai_res_json = ai.generate_content(
-                                        extract_prompt, 
-                                        generation_config={"response_mime_type": "application/json", "response_schema": ScrapedContent}
-                                    ).text
-                                    validated_data = ScrapedContent.model_validate_json(ai_res_json)
-                                    
-                                    # formatted abstract with deep metadata
-                                    rich_abstract = f"""{validated_data.summary}
-                                    
-                                    KEY FINDINGS:
-                                    {chr(10).join(['- ' + k for k in validated_data.key_findings])}
-                                    
-                                    METHODOLOGY: {validated_data.methodology}
-                                    """
-                                    
-                                    db.table("papers").insert({
-                                        "project_id": st.session_state.project_id, 
-                                        "title": validated_data.title,
-                                        "authors": [validated_data.author],
-                                        "year": int(validated_data.publication_date[:4]) if validated_data.publication_date[0].isdigit() else datetime.now().year,
-                                        "abstract": rich_abstract, 
-                                        "url": cmd, 
-                                        "source_type": "web"
-                                    }).execute()
-                                    st.toast("Web Intelligence Captured & Validated!")
-                                except Exception as e:
-                                    st.error(f"Scrape Mission Failed: {e}")
+                            # Runs in the background; progress shows under Background Missions
+                            jobs.submit("scrape_url", st.session_state.project_id, [(cmd, {"url": cmd, "dedup_key": cmd})], owner_id=st.session_state.user.id, access_token=st.session_state.session.access_token)
+                            st.rerun()  # surface it in Background Missions
                     except Exception as critical_e:
                         st.error(f"Terminal Error: {critical_e}")
 
@@ -601,21 +544,39 @@ if st.session_state.project_id:
                         </div>
                         """, unsafe_allow_html=True)
                         
+                        queries = st.session_state.pilot_proposal['queries'][:3]
                         cols = st.columns(3)
-                        for i, q in enumerate(st.session_state.pilot_proposal['queries']):
+                        for i, q in enumerate(queries):
                             if cols[i].button(q, key=f"pilot_{i}", use_container_width=True):
                                 new_res = perform_search(q)
-                                st.session_state.current_results += new_res
+                                st.session_state.current_results = merge_results(st.session_state.get('current_results', []), new_res)
                                 st.session_state.pilot_proposal = None # Clear after execution
                                 st.rerun()
+                        if st.button("✈️ EXECUTE ALL TRAJECTORIES", key="pilot_all", use_container_width=True):
+                            batches = scholar.search_many(queries, grey_lit=grey_lit, on_warning=st.write)
+                            st.session_state.current_results = merge_results(st.session_state.get('current_results', []), *batches)
+                            st.session_state.pilot_proposal = None
+                            st.rerun()
 
             st.markdown('</div>', unsafe_allow_html=True)
 
         # Feed Stream
-        feed_tabs = st.tabs(["Review Queue", "Research Archive", "Network Graph", "Handover"])
+        # Only the open tab runs, so the archive and graph cost nothing until visited
+        feed_tabs = st.tabs(["Review Queue", "Research Archive", "Network Graph", "Handover"], key="feed_tab", on_change="rerun")
         
         with feed_tabs[0]: # Review Queue (Current Results)
             if "current_results" in st.session_state:
+                def result_row(p):
+                    return {**to_row(p), "source_type": p.get('source_type', 'scout')}
+
+                if st.session_state.current_results and st.button("💾 Save All to Library", use_container_width=True):
+                    store.add_many(result_row(p) for p in st.session_state.current_results)
+                    report = store.flush()
+                    link_papers(repo, report.written)
+                    st.toast(f"Archived {len(report.ids)} papers ({len(report.merged)} merged into existing entries) in {report.calls} call(s).")
+                    for row, err in report.failed:
+                        st.warning(f"Failed to archive '{row['title'][:40]}': {err}")
+
                 for p in st.session_state.current_results:
                     with st.container():
                         st.markdown(f"""
@@ -626,199 +587,241 @@ if st.session_state.project_id:
                         </div>
                         """, unsafe_allow_html=True)
                         if st.button("Save to Library", key=f"save_{p['title']}"):
-                            db.table("papers").insert({
-                                "project_id": st.session_state.project_id,
-                                "title": p['title'], "authors": [a.get('name','Anon') for a in p.get('authors',[])] if isinstance(p.get('authors'), list) else ['Anon'],
-                                "year": p.get('year'), "abstract": p.get('abstract'), "url": p.get('url'), "source_type": p.get('source_type', 'scout')
-                            }).execute()
-                            st.toast("Archived!")
+                            store.add(result_row(p))
+                            report = store.flush()
+                            link_papers(repo, report.written)
+                            if report.merged: st.toast("Already in library; merged into the existing entry.")
+                            elif report.ok: st.toast("Archived!")
+                            else: st.error(f"Archive Failed: {report.failed[0][1]}")
             else:
                 st.info("Feed is silent. Initiate a mission above.")
 
         with feed_tabs[1]: # Research Archive (Citation Matrix)
-            paps = db.table("papers").select("*").eq("project_id", st.session_state.project_id).order("created_at", desc=True).execute().data or []
-            if paps:
-                df = pd.DataFrame(paps)
-                
-                # Ensure columns exist for the editor
-                if 'reading_status' not in df.columns: df['reading_status'] = 'Unread'
-                if 'tags' not in df.columns: df['tags'] = [[] for _ in range(len(df))]
-                if 'citation_count' not in df.columns: df['citation_count'] = 0
-
+            if feed_tabs[1].open:
                 st.markdown("### 📚 Citation Matrix")
-                
-                edited_df = st.data_editor(
-                    df,
-                    column_config={
-                        "title": st.column_config.TextColumn("Title", disabled=True, width="medium"),
-                        "reading_status": st.column_config.SelectboxColumn(
-                            "Status",
-                            options=["Unread", "Reading", "Synthesized"],
-                            required=True
-                        ),
-                        "tags": st.column_config.ListColumn("Tags"),
-                        "citation_count": st.column_config.NumberColumn("Citations", disabled=True),
-                        "year": st.column_config.NumberColumn("Year", disabled=True),
-                        "source_type": st.column_config.TextColumn("Source", disabled=True)
-                    },
-                    column_order=["title", "reading_status", "tags", "year", "citation_count", "source_type"],
-                    hide_index=True,
-                    use_container_width=True,
-                    key="citation_matrix"
+                # Aggregates are computed in Postgres (migration_performance_pack.sql)
+                counts = status_counts(repo)
+                if counts:
+                    s_cols = st.columns(len(MATRIX_STATUSES) + 1)
+                    s_cols[0].metric("Papers", sum(counts.values()))
+                    for col, status in zip(s_cols[1:], MATRIX_STATUSES):
+                        col.metric(status, counts.get(status, 0))
+                    with st.expander("Most cited"):
+                        st.dataframe(
+                            [{"Title": p['title'], "Year": p['year'], "Citations": p['citation_count'], "Impact": round(p['impact_score'], 2)} for p in top_cited(repo)],
+                            hide_index=True, use_container_width=True,
+                        )
+                    with st.expander("Duplicates"):
+                        identity = repo.view("identity")
+                        flagged = sum(1 for p in identity if p.get("duplicate_of"))
+                        if flagged:
+                            st.caption(f"{flagged} papers were flagged as duplicates on insert.")
+                        if st.button("Scan workspace", key="dedup_scan_btn"):
+                            with st.spinner("Clustering near-duplicates..."):
+                                # Oldest first, so each paper is matched against what came before it
+                                st.session_state.dedup_scan = (repo.version, find_duplicates(identity[::-1], services.dedup.threshold))
+                        scan = st.session_state.get("dedup_scan")
+                        if scan and scan[0] == repo.version:
+                            clusters = scan[1]
+                            if clusters:
+                                titles = {p["id"]: p["title"] for p in identity}
+                                st.dataframe(
+                                    [{"Papers": len(c), "Titles": " | ".join(titles[pid] or "Untitled" for pid in c)} for c in clusters[:500]],
+                                    hide_index=True, use_container_width=True,
+                                )
+                                if st.button(f"Merge {len(clusters)} clusters", key="dedup_merge_btn"):
+                                    with st.spinner("Merging duplicates..."):
+                                        removed, report = merge_duplicates(repo, clusters)
+                                    for row, err in report.failed:
+                                        st.warning(f"Failed to merge into '{row.get('title', row['id'])}': {err}")
+                                    st.toast(f"Removed {removed} duplicates.")
+                                    st.rerun()
+                            else:
+                                st.caption("No duplicates found.")
+                m1, m2, m3 = st.columns([2, 1, 1])
+                mx_search = m1.text_input("Search library", key="mx_search", placeholder='e.g. "health policy" -survey', label_visibility="collapsed")
+                mx_sort = m2.selectbox("Sort", list(MATRIX_SORTS), key="mx_sort", label_visibility="collapsed")
+                mx_size = m3.selectbox("Rows", [25, 50, 100, 200], index=1, key="mx_size", label_visibility="collapsed")
+                with st.expander("Filters"):
+                    f1, f2 = st.columns(2)
+                    mx_status = f1.multiselect("Status", MATRIX_STATUSES, key="mx_status")
+                    mx_source = f2.multiselect("Source", MATRIX_SOURCES, key="mx_source")
+                    mx_tags = f1.text_input("Tags (any of, comma-separated)", key="mx_tags")
+                    y1, y2 = f2.columns(2)
+                    mx_from = y1.number_input("From year", value=None, step=1, key="mx_from")
+                    mx_to = y2.number_input("To year", value=None, step=1, key="mx_to")
+
+                # Filters, search and paging all run server-side; only this page's visible columns come back
+                mx_query = MatrixQuery(
+                    page_size=mx_size, sort=mx_sort, statuses=tuple(mx_status), sources=tuple(mx_source),
+                    tags=tuple(t.strip() for t in mx_tags.split(",") if t.strip()),
+                    year_min=int(mx_from) if mx_from is not None else None,
+                    year_max=int(mx_to) if mx_to is not None else None, search=mx_search,
                 )
-
-                # Commit Changes
-                if st.session_state.citation_matrix.get("edited_rows"):
-                    changes = st.session_state.citation_matrix["edited_rows"]
-                    with st.spinner("Syncing Matrix..."):
-                        for idx, diff in changes.items():
-                            paper_id = df.iloc[idx]["id"]
-                            db.table("papers").update(diff).eq("id", paper_id).execute()
-                    st.toast("Matrix Synced.")
+                if st.session_state.get("mx_filters") != mx_query:
+                    st.session_state.mx_filters, st.session_state.mx_page = mx_query, 0
+                mx_query = replace(mx_query, page=st.session_state.mx_page)
+                rows, total = fetch_page(repo, mx_query)
+                if not rows and mx_query.page:
+                    # The library shrank under the current page
+                    st.session_state.mx_page = 0
                     st.rerun()
 
-                st.markdown("---")
+                if mx_search:
+                    hits = passage_hits(repo, chunks, mx_search)
+                    with st.expander(f"Full-text matches ({len(hits)})"):
+                        titles = {p["id"]: p["title"] for p in repo.snapshot()}
+                        for hit in hits:
+                            st.markdown(f"**{titles.get(hit['paper_id'], 'Untitled')}** · {location(hit) or 'Transcript'}")
+                            st.caption(hit["snippet"].replace("<b>", "**").replace("</b>", "**"))
+                        if not hits:
+                            st.caption("No transcript passages match.")
+
+                if rows:
+                    import pandas as pd
+                    df = pd.DataFrame(rows, columns=MATRIX_COLUMNS)
+                    df['reading_status'] = df['reading_status'].fillna('Unread')
+                    df['tags'] = [t or [] for t in df['tags']]
+                    df['citation_count'] = df['citation_count'].fillna(0)
+                    matrix_key = f"citation_matrix_{mx_query.page}_{abs(hash(st.session_state.mx_filters))}"
+
+                    edited_df = st.data_editor(
+                        df,
+                        column_config={
+                            "title": st.column_config.TextColumn("Title", disabled=True, width="medium"),
+                            "reading_status": st.column_config.SelectboxColumn(
+                                "Status",
+                                options=MATRIX_STATUSES,
+                                required=True
+                            ),
+                            "tags": st.column_config.ListColumn("Tags"),
+                            "citation_count": st.column_config.NumberColumn("Citations", disabled=True),
+                            "year": st.column_config.NumberColumn("Year", disabled=True),
+                            "source_type": st.column_config.TextColumn("Source", disabled=True)
+                        },
+                        column_order=["title", "reading_status", "tags", "year", "citation_count", "source_type"],
+                        hide_index=True,
+                        use_container_width=True,
+                        key=matrix_key
+                    )
+
+                    pages = -(-total // mx_query.page_size)
+                    p1, p2, p3 = st.columns([1, 2, 1])
+                    if p1.button("◀ Prev", disabled=mx_query.page == 0, use_container_width=True):
+                        st.session_state.mx_page -= 1
+                        st.rerun()
+                    p2.caption(f"Page {mx_query.page + 1} of {pages} · {total} papers")
+                    if p3.button("Next ▶", disabled=mx_query.page + 1 >= pages, use_container_width=True):
+                        st.session_state.mx_page += 1
+                        st.rerun()
+
+                    # Commit Changes
+                    if st.session_state[matrix_key].get("edited_rows"):
+                        changes = st.session_state[matrix_key]["edited_rows"]
+                        with st.spinner("Syncing Matrix..."):
+                            for idx, diff in changes.items():
+                                store.update(df.iloc[idx]["id"], diff)
+                            report = store.flush()
+                        for row, err in report.failed:
+                            st.warning(f"Failed to sync '{row.get('title', row['id'])}': {err}")
+                        st.toast("Matrix Synced.")
+                        st.rerun()
+
+                    st.markdown("---")
                 
-                # Contextual Actions for Selected Paper (Mock selection via selectbox for now as data_editor selection is beta)
-                sel_paper = st.selectbox("Select Paper for Deep Actions", df['title'].tolist())
-                sel_p_data = df[df['title'] == sel_paper].iloc[0]
-
-                c1, c2 = st.columns(2)
-                with c1:
-                    if st.button("⛏️ Snowball Mine", key="mine_btn"):
-                         with st.spinner("Mining Research Graph..."):
-                            ss_search = requests.get(f"https://api.semanticscholar.org/graph/v1/paper/search?query={sel_p_data['title']}&limit=1&fields=paperId").json()
-                            if ss_search.get("data"):
-                                pid = ss_search["data"][0]["paperId"]
-                                ref_url = f"https://api.semanticscholar.org/graph/v1/paper/{pid}/references?limit=10&fields=title,authors,year,abstract,url,citationCount"
-                                refs = requests.get(ref_url).json().get("data", [])
-                                count = 0
-                                for r_item in refs:
-                                    r = r_item.get("citedPaper")
-                                    if r and r.get("title"):
-                                        # Check duplicate
-                                        exists = db.table("papers").select("id").eq("title", r['title']).eq("project_id", st.session_state.project_id).execute().data
-                                        if not exists:
-                                            db.table("papers").insert({
-                                                "project_id": st.session_state.project_id,
-                                                "title": r['title'], "authors": [a.get('name', 'Unknown') for a in r.get('authors', [])],
-                                                "year": r.get('year'), "abstract": r.get('abstract'), "url": r.get('url'),
-                                                "citation_count": r.get('citationCount', 0),
-                                                "source_type": "snowball-mining"
-                                            }).execute()
-                                            count += 1
-                                st.success(f"Mined {count} new references!")
-                                st.rerun()
-                            else: st.error("Paper not found in Graph.")
-                with c2:
-                    st.write(f"**Abstract:** {sel_p_data.get('abstract', '')[:300]}...")
-
-            else:
-                st.info("Archive empty.")
+                    # Contextual Actions for Selected Paper (Mock selection via selectbox for now as data_editor selection is beta)
+                    sel_paper = st.selectbox("Select Paper for Deep Actions", df['title'].tolist())
+                    sel_p_data = df[df['title'] == sel_paper].iloc[0]
+                    sel_abstract = next((p.get('abstract') or '' for p in repo.snapshot() if p['id'] == sel_p_data['id']), '')
+
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        depth = st.slider("Hops", 1, 3, 1, key="mine_depth")
+                        directions = st.multiselect("Follow", list(SNOWBALL_DIRECTIONS), default=["references"], key="mine_dirs")
+                        min_cites = st.number_input("Min. citations", 0, value=0, step=5, key="mine_min_cites")
+                        if st.button("⛏️ Snowball Mine", key="mine_btn") and directions:
+                            jobs.submit("snowball", st.session_state.project_id, [(f"Mine: {sel_p_data['title'][:60]}", {
+                                "seed_id": sel_p_data['id'], "seed_title": sel_p_data['title'],
+                                "depth": depth, "directions": directions, "min_citations": int(min_cites),
+                            })], owner_id=st.session_state.user.id, access_token=st.session_state.session.access_token)
+                            st.rerun()  # surface it in Background Missions
+                    with c2:
+                        st.write(f"**Abstract:** {sel_abstract[:300]}...")
+
+                elif mx_query == MatrixQuery(page_size=mx_query.page_size, sort=mx_query.sort):
+                    st.info("Archive empty.")
+                else:
+                    st.info("No papers match these filters.")
 
         with feed_tabs[2]: # Network Graph
-            paps = db.table("papers").select("*").eq("project_id", st.session_state.project_id).execute().data or []
-            if paps:
-                nodes = []
-                edges = []
-                # Create Nodes
-                for p in paps:
-                    # Size based on citation count (logarithmic scale approx)
-                    size = 15 + (p.get('citation_count', 0) / 10) 
-                    nodes.append(Node(id=p['id'], label=p['title'][:20]+"...", size=min(size, 40), shape="dot", color="#C5A021"))
-                
-                # Create Edges (Shared Authors)
-                for i, p1 in enumerate(paps):
-                    for p2 in paps[i+1:]:
-                        # Find intersection of authors
-                        authors1 = set(p1.get('authors', []))
-                        authors2 = set(p2.get('authors', []))
-                        shared = authors1.intersection(authors2)
-                        if shared:
-                            edges.append(Edge(source=p1['id'], target=p2['id'], label=list(shared)[0], color="#121212"))
-
-                config = Config(width="100%", height=500, directed=False, physics=True, hierarchical=False)
-                return_value = agraph(nodes=nodes, edges=edges, config=config)
-            else:
-                st.info("Add papers to visualize the network.")
+            if feed_tabs[2].open:
+                paps = repo.view("graph")
+                if paps:
+                    g1, g2 = st.columns(2)
+                    # agraph physics stalls on huge graphs, so prune to the best-connected papers
+                    top_n = g1.number_input("Max nodes", 10, 2000, 150, step=10, key="graph_top_n")
+                    min_shared = g2.slider("Min. shared authors", 1, 5, 1, key="graph_min_shared")
+                    graph = project_graph(repo)
+                    node_data, edge_data = graph.view(min_shared=min_shared, top_n=top_n)
+
+                    from streamlit_agraph import agraph, Node, Edge, Config
+                    nodes = [Node(id=n['id'], label=n['label'], size=n['size'], shape="dot", color="#C5A021") for n in node_data]
+                    # Citations in gold, shared authors in ink
+                    edges = [Edge(source=e['source'], target=e['target'], label=e['label'], width=e['weight'], color="#C5A021" if e['relation'] == "cites" else "#121212") for e in edge_data]
+
+                    config = Config(width="100%", height=500, directed=False, physics=True, hierarchical=False)
+                    return_value = agraph(nodes=nodes, edges=edges, config=config)
+
+                    if st.button("📈 Recompute Impact Scores", use_container_width=True):
+                        with st.spinner("Ranking Citation Graph..."):
+                            metrics, summary = graph_metrics(graph)
+                            current = {p['id']: p.get('impact_score') or 0.0 for p in repo.snapshot()}
+                            for pid, m in metrics.items():
+                                if abs(current.get(pid, 0.0) - m['impact']) > 1e-3:
+                                    store.update(pid, {"impact_score": m['impact']})
+                            report = store.flush()
+                        m1, m2, m3 = st.columns(3)
+                        m1.metric("Citations", summary['citations'])
+                        m2.metric("Components", summary['components'])
+                        m3.metric("Largest Cluster", summary['largest'])
+                        st.toast(f"Impact scores updated for {len(report.written)} papers.")
+                else:
+                    st.info("Add papers to visualize the network.")
 
         with feed_tabs[3]: # Handover Dossier
-            p_exp = db.table("papers").select("*").eq("project_id", st.session_state.project_id).execute().data or []
-            if p_exp:
-                st.download_button("Word Bib (XML)", generate_word_xml_bib(p_exp), "bib.xml", use_container_width=True)
-                
-                # Excel Export using new function
-                excel_data = generate_excel_matrix(p_exp)
-                st.download_button("Excel Research Matrix (Pro)", excel_data, "matrix.xlsx", use_container_width=True)
+            if feed_tabs[3].open:
+                p_exp = repo.view("handover")
+                if p_exp:
+                    # Rendered only when clicked (off the script thread) and memoized until the library changes
+                    st.download_button("Word Bib (XML)", lazy_export(repo, "bib-xml", p_exp), "bib.xml", mime="application/xml", on_click="ignore", use_container_width=True)
+                    b1, b2, b3 = st.columns(3)
+                    b1.download_button("BibTeX", lazy_export(repo, "bibtex", p_exp), "library.bib", mime="application/x-bibtex", on_click="ignore", use_container_width=True)
+                    b2.download_button("RIS", lazy_export(repo, "ris", p_exp), "library.ris", mime="application/x-research-info-systems", on_click="ignore", use_container_width=True)
+                    b3.download_button("CSL-JSON", lazy_export(repo, "csl-json", p_exp), "library.json", mime="application/json", on_click="ignore", use_container_width=True)
+                    st.download_button("Excel Research Matrix (Pro)", lazy_export(repo, "xlsx", p_exp), "matrix.xlsx", on_click="ignore", use_container_width=True)
+                    x1, x2 = st.columns(2)
+                    x1.download_button("Matrix (CSV)", lazy_export(repo, "csv", p_exp), "matrix.csv", mime="text/csv", on_click="ignore", use_container_width=True)
+                    x2.download_button("Matrix (Parquet)", lazy_export(repo, "parquet", p_exp), "matrix.parquet", mime="application/vnd.apache.parquet", on_click="ignore", use_container_width=True)
                 
-                if st.button("🚀 Sync to Notion", use_container_width=True):
-                    token = st.secrets["notion"].get("api_token")
-                    db_id = st.secrets["notion"].get("database_id")
-                    if token and db_id:
-                        with st.status("Syncing to Notion Workspace...") as status:
-                            headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Notion-Version": "2022-06-28"}
-                            progress_bar = st.progress(0)
-                            success_count = 0
-                            error_count = 0
-                            
-                            for i, p in enumerate(p_exp):
-                                try:
-                                    data = {
-                                        "parent": {"database_id": db_id}, 
-                                        "properties": {
-                                            "Title": {"title": [{"text": {"content": p['title'][:2000]}}]}, # Limit title length
-                                            "Year": {"number": p['year']} if p['year'] else None,
-                                            "Authors": {"rich_text": [{"text": {"content": ", ".join(p.get('authors', []))[:2000]}}]},
-                                            "URL": {"url": p['url']} if p['url'] else None,
-                                            "Status": {"select": {"name": p.get('reading_status', 'Unread')}} # Sync Status
-                                        }
-                                    }
-                                    # Clean None values
-                                    data["properties"] = {k: v for k, v in data["properties"].items() if v is not None}
-                                    
-                                    res = requests.post("https://api.notion.com/v1/pages", headers=headers, json=data)
-                                    res.raise_for_status()
-                                    success_count += 1
-                                except Exception as e:
-                                    error_count += 1
-                                    st.write(f"⚠️ Failed to sync '{p['title'][:20]}...': {e}")
-                                
-                                progress_bar.progress((i + 1) / len(p_exp))
-                            
-                            status.update(label=f"Notion Sync Complete: {success_count} Synced, {error_count} Failed", state="complete")
-                            st.toast(f"Sync Complete: {success_count} Success, {error_count} Failures")
-                    else: st.warning("Notion credentials missing in secrets.")
+                    if st.button("🚀 Sync to Notion", use_container_width=True):
+                        notion = st.secrets.get("notion", {})
+                        if notion.get("api_token") and notion.get("database_id"):
+                            jobs.submit("notion_sync", st.session_state.project_id, [("Notion Sync", {})], owner_id=st.session_state.user.id, access_token=st.session_state.session.access_token)
+                            st.rerun()  # surface it in Background Missions
+                        else: st.warning("Notion credentials missing in secrets.")
 
     # --- RIGHT PANE: SYNTHESIS WORKSPACE ---
     with synth_col:
         st.markdown("### ✍️ Synthesis Workspace")
         
-        # Pull context from library
-        papers_rag = db.table("papers").select("*").eq("project_id", st.session_state.project_id).execute().data or []
-        
-        # Construct High-Fidelity Context
-        kb_context = ""
-        for p in papers_rag:
-            auth_str = p['authors'][0] if p.get('authors') and len(p['authors']) > 0 else 'Anon'
-            year_str = str(p.get('year', 'n.d.'))
-            # Fallback to abstract if content_body is empty
-            content = p.get('content_body', '') 
-            if not content: content = p.get('abstract', '')
-            
-            kb_context += f"""
-            ---
-            REF_CODE: [{auth_str}, {year_str}]
-            TITLE: {p['title']}
-            CONTENT: {content[:3000]} 
-            ---
-            """
-        
         if "messages" not in st.session_state:
             st.session_state.messages = []
             
         for msg in st.session_state.messages:
             with st.chat_message(msg["role"]):
                 st.markdown(msg["content"])
+                if msg.get("metrics"):
+                    st.caption(f"⏱ {TurnMetrics(**msg['metrics']).caption()}")
                 
         if prompt := st.chat_input("Synthesize intelligence or draft report..."):
             st.session_state.messages.append({"role": "user", "content": prompt})
@@ -826,22 +829,22 @@ if st.session_state.project_id:
                 st.markdown(prompt)
                 
             with st.chat_message("assistant"):
-                with st.spinner("Synthesizing (Strict Grounding)..."):
-                    system_prompt = """
-                    You are an Elite Research Assistant. Your goal is to synthesize answers using ONLY the provided Context Library.
-                    
-                    RULES:
-                    1. CITATIONS MANDATORY: Every single claim or fact must be immediately followed by its source in [Author, Year] format.
-                    2. NO HALLUCINATION: If the answer is not in the Context Library, state clearly: "This information is not present in the current archives."
-                    3. ACADEMIC TONE: Maintain a professional, objective, and analytical tone.
-                    4. SYNTHESIS: Do not just list summaries. Connect the dots between papers. Compare and contrast findings.
-                    """
-                    
-                    full_prompt = f"{system_prompt}\n\nCONTEXT LIBRARY:\n{kb_context}\n\nUSER PROMPT: {prompt}"
-                    
-                    response = ai.generate_content(full_prompt).text
-                    st.markdown(response)
-                    st.session_state.messages.append({"role": "assistant", "content": response})
+                with st.spinner("Retrieving Context..."):
+                    # Retrieve only the passages relevant to this turn, packed into the context budget
+                    budget = int(services.section("synthesis").get("context_tokens", CONTEXT_TOKENS))
+                    full_prompt = grounded_prompt(repo, chunks, prompt, budget=budget)
+
+                def record_turn(text, metrics):
+                    # Runs on completion and when a rerun (e.g. Stop) abandons the stream
+                    st.session_state.messages.append({"role": "assistant", "content": text, "metrics": metrics.as_dict()})
+
+                # Any click reruns the script, which abandons the stream; the partial draft is kept
+                st.button("⏹ Stop", key="stop_synthesis")
+                stream = SynthesisStream(ai, full_prompt, on_finish=record_turn)
+                st.write_stream(stream)
+                st.caption(f"⏱ {stream.metrics.caption()}")
 
 else:
     st.info("Unlock a Workspace via Sidebar to Activate Terminal.")
+
+telemetry.end_run(st.session_state.this_run)
@@ -0,0 +1,9 @@
+-- Near-duplicate flags: papers inserted under the "flag" dedup policy point at the paper they duplicate
+DO $$ 
+BEGIN 
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='papers' AND column_name='duplicate_of') THEN
+        ALTER TABLE papers ADD COLUMN duplicate_of UUID REFERENCES papers(id) ON DELETE SET NULL;
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_papers_duplicate_of ON papers(duplicate_of) WHERE duplicate_of IS NOT NULL;
@@ -0,0 +1,16 @@
+-- Optional shared backend for the LLM call cache (scout/llm_cache.py)
+CREATE TABLE IF NOT EXISTS llm_cache (
+    owner_id UUID REFERENCES auth.users(id) ON DELETE CASCADE DEFAULT auth.uid(),
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    accessed_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (owner_id, key)
+);
+
+ALTER TABLE llm_cache ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Users can only manage their own cache" ON llm_cache;
+CREATE POLICY "Users can only manage their own cache" ON llm_cache FOR ALL USING (auth.uid() = owner_id);
+
+CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(owner_id, accessed_at);
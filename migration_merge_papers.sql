@@ -0,0 +1,67 @@
+-- Fold near-duplicate clusters into their survivors (scout/dedup.py merge_duplicates)
+-- Run after migration_paper_edges.sql and migration_paper_chunks.sql.
+-- p_merges: [{"keep_id", "patch", "drop_ids", "adopt_chunks_from"}, ...]
+-- Each cluster runs in its own subtransaction: it lands whole or not at all, and its
+-- error comes back against its survivor instead of aborting the clusters after it.
+CREATE OR REPLACE FUNCTION merge_papers(p_project_id UUID, p_merges JSONB)
+RETURNS TABLE (keep_id UUID, removed INTEGER, error TEXT)
+LANGUAGE plpgsql SECURITY INVOKER AS $$
+DECLARE
+    m JSONB;
+    survivor UUID;
+    drops UUID[];
+    cols TEXT;
+BEGIN
+    FOR m IN SELECT value FROM jsonb_array_elements(p_merges) LOOP
+        survivor := (m->>'keep_id')::UUID;
+        keep_id := survivor;
+        BEGIN
+            PERFORM 1 FROM papers WHERE id = survivor AND project_id = p_project_id FOR UPDATE;
+            IF NOT FOUND THEN
+                RAISE EXCEPTION 'paper % not found', survivor USING ERRCODE = 'P0002';
+            END IF;
+            drops := ARRAY(SELECT jsonb_array_elements_text(m->'drop_ids')::UUID);
+            PERFORM 1 FROM papers WHERE id = ANY(drops) FOR UPDATE;
+            drops := ARRAY(SELECT id FROM papers WHERE id = ANY(drops) AND project_id = p_project_id AND id <> survivor);
+
+            -- A survivor taking a duplicate's DOI also takes its natural key, so free those first
+            UPDATE papers SET natural_key = NULL WHERE id = ANY(drops);
+            IF m->'patch' <> '{}'::JSONB THEN
+                SELECT string_agg(quote_ident(k), ', ') INTO cols FROM jsonb_object_keys(m->'patch') AS k;
+                EXECUTE format(
+                    'UPDATE papers SET (%1$s) = (SELECT %1$s FROM jsonb_populate_record(NULL::papers, $1)) WHERE id = $2',
+                    cols
+                ) USING m->'patch', survivor;
+            END IF;
+
+            IF (m->>'adopt_chunks_from')::UUID = ANY(drops) THEN
+                UPDATE paper_chunks SET paper_id = survivor WHERE paper_id = (m->>'adopt_chunks_from')::UUID;
+            END IF;
+
+            -- Copy edges touching the duplicates onto the survivor; deleting them cascades the originals away
+            INSERT INTO paper_edges (owner_id, project_id, source_id, target_id, relation, weight)
+            SELECT DISTINCT ON (o.src, o.dst, e.relation) e.owner_id, e.project_id, o.src, o.dst, e.relation, e.weight
+            FROM paper_edges e,
+                 LATERAL (SELECT CASE WHEN e.source_id = ANY(drops) THEN survivor ELSE e.source_id END AS s,
+                                 CASE WHEN e.target_id = ANY(drops) THEN survivor ELSE e.target_id END AS t) r,
+                 LATERAL (SELECT CASE WHEN e.relation = 'shared-author' THEN LEAST(r.s, r.t) ELSE r.s END AS src,
+                                 CASE WHEN e.relation = 'shared-author' THEN GREATEST(r.s, r.t) ELSE r.t END AS dst) o
+            WHERE e.project_id = p_project_id
+              AND (e.source_id = ANY(drops) OR e.target_id = ANY(drops))
+              AND o.src <> o.dst
+            ORDER BY o.src, o.dst, e.relation, e.weight DESC
+            ON CONFLICT (source_id, target_id, relation) DO UPDATE SET weight = EXCLUDED.weight;
+
+            DELETE FROM papers WHERE id = ANY(drops);
+            removed := cardinality(drops);
+            error := NULL;
+        EXCEPTION WHEN OTHERS THEN
+            removed := 0;
+            error := SQLERRM;
+        END;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION merge_papers(UUID, JSONB) TO authenticated;
@@ -0,0 +1,28 @@
+-- Natural key for batched upserts: DOI, then Semantic Scholar id, then normalized title
+-- Run after migration_snowball_ids.sql
+DO $$ 
+BEGIN 
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='papers' AND column_name='natural_key') THEN
+        ALTER TABLE papers ADD COLUMN natural_key TEXT;
+    END IF;
+END $$;
+
+-- Backfill DOI and Semantic Scholar keys. Title keys need the app's Unicode
+-- normalization (scout/store.py: natural_key), which SQL can't reproduce
+-- exactly, so they stay NULL (never matched, never in conflict) until
+-- `python -m scout rekey --all` fills them in.
+UPDATE papers SET natural_key = CASE
+    WHEN doi IS NOT NULL AND doi <> '' THEN 'doi:' || lower(doi)
+    WHEN s2_paper_id IS NOT NULL AND s2_paper_id <> '' THEN 's2:' || s2_paper_id
+END
+WHERE natural_key IS NULL;
+
+-- Legacy duplicates keep their rows but get a distinct key so the index can build
+UPDATE papers p SET natural_key = p.natural_key || ':' || p.id
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY project_id, natural_key ORDER BY created_at) AS rn
+    FROM papers
+) d
+WHERE d.id = p.id AND d.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_papers_project_natural_key ON papers(project_id, natural_key);
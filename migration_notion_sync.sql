@@ -0,0 +1,11 @@
+-- Notion sync: remember each paper's page and what was last pushed to it
+DO $$ 
+BEGIN 
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='papers' AND column_name='notion_page_id') THEN
+        ALTER TABLE papers ADD COLUMN notion_page_id TEXT;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='papers' AND column_name='notion_hash') THEN
+        ALTER TABLE papers ADD COLUMN notion_hash TEXT; -- sha256 of the last synced properties
+    END IF;
+END $$;
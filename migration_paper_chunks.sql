@@ -0,0 +1,77 @@
+-- Transcripts stored as page/section-aware chunks instead of one content_body per paper
+-- Run after migration_performance_pack.sql
+CREATE TABLE IF NOT EXISTS paper_chunks (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    owner_id UUID REFERENCES auth.users(id) ON DELETE CASCADE DEFAULT auth.uid(),
+    project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
+    paper_id UUID REFERENCES papers(id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    page INTEGER,
+    section TEXT,
+    char_start INTEGER NOT NULL, -- offsets into the original transcript
+    char_end INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    content_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(section, '')), 'A') ||
+        setweight(to_tsvector('english', content), 'B')
+    ) STORED,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (paper_id, ordinal)
+);
+
+ALTER TABLE paper_chunks ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Users can only manage their own chunks" ON paper_chunks;
+CREATE POLICY "Users can only manage their own chunks" ON paper_chunks FOR ALL USING (auth.uid() = owner_id);
+
+CREATE INDEX IF NOT EXISTS idx_paper_chunks_project ON paper_chunks(project_id);
+CREATE INDEX IF NOT EXISTS idx_paper_chunks_search ON paper_chunks USING GIN (content_tsv);
+
+-- Best chunks for a query; snippets are only built for the rows returned
+CREATE OR REPLACE FUNCTION match_chunks(p_project_id UUID, p_query TEXT, p_limit INTEGER DEFAULT 20)
+RETURNS TABLE (id UUID, paper_id UUID, ordinal INTEGER, page INTEGER, section TEXT, tokens INTEGER, rank REAL, snippet TEXT)
+LANGUAGE sql STABLE SECURITY INVOKER AS $$
+    WITH q AS (SELECT websearch_to_tsquery('english', p_query) AS query),
+    top AS (
+        SELECT c.id, c.paper_id, c.ordinal, c.page, c.section, c.tokens, c.content,
+               ts_rank_cd(c.content_tsv, q.query) AS rank
+        FROM paper_chunks c, q
+        WHERE c.project_id = p_project_id AND c.content_tsv @@ q.query
+        ORDER BY rank DESC
+        LIMIT p_limit
+    )
+    SELECT top.id, top.paper_id, top.ordinal, top.page, top.section, top.tokens, top.rank,
+           ts_headline('english', top.content, q.query, 'MaxWords=35, MinWords=12, MaxFragments=1')
+    FROM top, q
+    ORDER BY top.rank DESC;
+$$;
+
+GRANT EXECUTE ON FUNCTION match_chunks(UUID, TEXT, INTEGER) TO authenticated;
+
+-- Swap a paper's chunks and clear its legacy content_body in one transaction.
+-- Chunks take the paper's owner and project, so service-role job writes are stamped correctly too.
+CREATE OR REPLACE FUNCTION replace_paper_chunks(p_paper_id UUID, p_chunks JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql SECURITY INVOKER AS $$
+DECLARE
+    written INTEGER;
+BEGIN
+    -- Locks the paper, so concurrent replacements of one paper run one after the other
+    PERFORM 1 FROM papers WHERE id = p_paper_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'paper % not found', p_paper_id USING ERRCODE = 'P0002';
+    END IF;
+    DELETE FROM paper_chunks WHERE paper_id = p_paper_id;
+    INSERT INTO paper_chunks (owner_id, project_id, paper_id, ordinal, page, section, char_start, char_end, tokens, content)
+    SELECT p.owner_id, p.project_id, p.id, c.ordinal, c.page, c.section, c.char_start, c.char_end, c.tokens, c.content
+    FROM papers p,
+         jsonb_to_recordset(p_chunks) AS c(ordinal INTEGER, page INTEGER, section TEXT, char_start INTEGER, char_end INTEGER, tokens INTEGER, content TEXT)
+    WHERE p.id = p_paper_id;
+    GET DIAGNOSTICS written = ROW_COUNT;
+    -- Unconditional, so the revision trigger (migration_paper_revision.sql) sees new chunks
+    UPDATE papers SET content_body = NULL WHERE id = p_paper_id;
+    RETURN written;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION replace_paper_chunks(UUID, JSONB) TO authenticated;
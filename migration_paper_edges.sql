@@ -0,0 +1,20 @@
+-- Paper relationship edges for the Network Graph
+-- 'cites' is stored once (source cites target); cited-by is the same edge read in reverse.
+CREATE TABLE IF NOT EXISTS paper_edges (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    owner_id UUID REFERENCES auth.users(id) ON DELETE CASCADE DEFAULT auth.uid(),
+    project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
+    source_id UUID REFERENCES papers(id) ON DELETE CASCADE,
+    target_id UUID REFERENCES papers(id) ON DELETE CASCADE,
+    relation TEXT NOT NULL CHECK (relation IN ('cites', 'shared-author')),
+    weight REAL DEFAULT 1,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (source_id, target_id, relation)
+);
+
+ALTER TABLE paper_edges ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Users can only manage their own edges" ON paper_edges;
+CREATE POLICY "Users can only manage their own edges" ON paper_edges FOR ALL USING (auth.uid() = owner_id);
+
+CREATE INDEX IF NOT EXISTS idx_paper_edges_project ON paper_edges(project_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_paper_edges_target ON paper_edges(target_id);
@@ -0,0 +1,22 @@
+-- Per-paper revision for the synthesis index: bumped whenever a column it reads changes
+-- Run after migration_paper_chunks.sql (replace_paper_chunks bumps it by rewriting content_body)
+DO $$ 
+BEGIN 
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='papers' AND column_name='revised_at') THEN
+        ALTER TABLE papers ADD COLUMN revised_at TIMESTAMPTZ DEFAULT NOW();
+    END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION touch_revised_at()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.revised_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS papers_revised_at ON papers;
+CREATE TRIGGER papers_revised_at
+    BEFORE UPDATE OF title, authors, year, abstract, content_body ON papers
+    FOR EACH ROW EXECUTE FUNCTION touch_revised_at();
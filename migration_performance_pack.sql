@@ -0,0 +1,49 @@
+-- Performance pack: indexes for the hot paths, a stored full-text vector and aggregate RPCs
+-- Run after migration_add_content_body.sql, migration_phase3_columns.sql and migration_natural_key.sql
+-- (the unique natural key used for dedup and upserts lives in migration_natural_key.sql)
+
+-- 1. Every project view filters on project_id and lists newest first
+CREATE INDEX IF NOT EXISTS idx_papers_project_created ON papers(project_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_papers_project_status ON papers(project_id, reading_status);
+
+-- 2. Full-text vector over title, abstract and transcript, weighted in that order
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='papers' AND column_name='search_tsv') THEN
+        ALTER TABLE papers ADD COLUMN search_tsv tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(abstract, '')), 'B') ||
+            -- tsvector values are capped at 1MB; long transcripts contribute their opening
+            setweight(to_tsvector('english', left(coalesce(content_body, ''), 200000)), 'C')
+        ) STORED;
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_papers_search ON papers USING GIN (search_tsv);
+
+-- 3. Aggregates computed in Postgres instead of over rows pulled into the app.
+-- SECURITY INVOKER keeps the owner-only RLS policies in force.
+CREATE OR REPLACE FUNCTION paper_status_counts(p_project_id UUID)
+RETURNS TABLE (reading_status TEXT, papers BIGINT)
+LANGUAGE sql STABLE SECURITY INVOKER AS $$
+    SELECT coalesce(p.reading_status, 'Unread'), count(*)
+    FROM papers p
+    WHERE p.project_id = p_project_id
+    GROUP BY 1
+    ORDER BY 2 DESC;
+$$;
+
+CREATE OR REPLACE FUNCTION top_cited_papers(p_project_id UUID, p_limit INTEGER DEFAULT 10)
+RETURNS TABLE (id UUID, title TEXT, year INTEGER, citation_count INTEGER, impact_score FLOAT)
+LANGUAGE sql STABLE SECURITY INVOKER AS $$
+    SELECT p.id, p.title, p.year, coalesce(p.citation_count, 0), coalesce(p.impact_score, 0.0)
+    FROM papers p
+    WHERE p.project_id = p_project_id
+    ORDER BY p.citation_count DESC NULLS LAST, p.impact_score DESC NULLS LAST
+    LIMIT p_limit;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_papers_project_cited ON papers(project_id, citation_count DESC NULLS LAST);
+
+GRANT EXECUTE ON FUNCTION paper_status_counts(UUID) TO authenticated;
+GRANT EXECUTE ON FUNCTION top_cited_papers(UUID, INTEGER) TO authenticated;
@@ -0,0 +1,11 @@
+-- Snowball Mining: external identifiers used for deduplication
+DO $$ 
+BEGIN 
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='papers' AND column_name='s2_paper_id') THEN
+        ALTER TABLE papers ADD COLUMN s2_paper_id TEXT; -- Semantic Scholar paperId
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='papers' AND column_name='doi') THEN
+        ALTER TABLE papers ADD COLUMN doi TEXT;
+    END IF;
+END $$;
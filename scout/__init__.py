@@ -0,0 +1,7 @@
+"""Core services for THE FACTORY research terminal.
+
+Everything in this package is free of Streamlit so it can be imported from
+the app, from batch jobs, or from a plain Python shell. ``scout.services``
+builds the clients from the app's secrets, and ``python -m scout`` runs the
+bulk operations (see ``scout/cli.py``).
+"""
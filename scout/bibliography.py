@@ -0,0 +1,251 @@
+"""Bibliography export: Word XML, BibTeX, RIS and CSL-JSON.
+
+Papers are turned into entries one at a time and each serializer is a
+generator of text chunks, so nothing holds a document tree and memory stays
+flat however large the library is; :func:`write_bibliography` streams the
+chunks straight to a file. Author strings are parsed once (memoized) into
+family/given parts, and citation keys (``smith2020deep``) are made unique
+with an index of the keys already issued.
+"""
+import io
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple
+from xml.sax.saxutils import escape
+
+WORD_NS = "http://schemas.openxmlformats.org/officeDocument/2006/bibliography"
+
+SUFFIXES = {"jr", "jr.", "sr", "sr.", "ii", "iii", "iv"}
+PARTICLES = {"van", "von", "de", "der", "den", "del", "della", "di", "da", "du", "la", "le", "dos", "das", "ten", "ter", "bin", "al", "el"}
+ORG_WORDS = {
+    "university", "institute", "organization", "organisation", "association", "committee", "consortium",
+    "agency", "department", "ministry", "council", "centre", "center", "foundation", "bank", "society", "group",
+}
+STOP_WORDS = {"a", "an", "the", "on", "of", "in", "for", "and", "to", "with", "towards", "toward"}
+
+
+class Author(NamedTuple):
+    family: str
+    given: str = ""
+    suffix: str = ""
+    literal: bool = False  # organisations and single names are kept whole
+
+    def inverted(self):
+        """``Family, Given`` (with suffix) as BibTeX and RIS expect."""
+        if self.literal or not self.given:
+            return self.family
+        return f"{self.family}, {self.suffix + ', ' if self.suffix else ''}{self.given}"
+
+
+@lru_cache(maxsize=65536)
+def parse_author(name):
+    name = " ".join((name or "").split()).strip(" ,;")
+    if not name:
+        return Author("Anon", literal=True)
+    if ORG_WORDS & {t.lower().strip(".,") for t in name.split()}:
+        return Author(name, literal=True)
+    if "," in name:
+        # "Family, Given" or "Family, Jr., Given"
+        family, *rest = [p.strip() for p in name.split(",")]
+        suffix = next((r for r in rest if r.lower() in SUFFIXES), "")
+        given = " ".join(r for r in rest if r and r != suffix)
+        return Author(family, given, suffix)
+    tokens = name.split()
+    suffix = ""
+    if len(tokens) > 1 and tokens[-1].lower().strip(",") in SUFFIXES:
+        suffix = tokens.pop().strip(",")
+    if len(tokens) == 1:
+        return Author(tokens[0], suffix=suffix, literal=not suffix)
+    # Family name starts at the first lowercase particle ("Ludwig van Beethoven"), else the last token
+    start = next((i for i, t in enumerate(tokens[1:-1], 1) if t.lower() in PARTICLES and t[0].islower()), len(tokens) - 1)
+    return Author(" ".join(tokens[start:]), " ".join(tokens[:start]), suffix)
+
+
+def _author_names(paper):
+    authors = paper.get("authors")
+    if not isinstance(authors, list):
+        return []
+    return [a.get("name", "") if isinstance(a, dict) else str(a) for a in authors]
+
+
+def _ascii(text):
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+
+
+class CitationKeys:
+    """Issues ``familyYEARword`` keys, suffixing ``a``, ``b``, ... on collisions."""
+
+    def __init__(self):
+        self.used = set()
+        self.counts = {}
+
+    def key(self, authors, year, title):
+        family = re.sub(r"[^a-z]", "", _ascii(authors[0].family).lower()) if authors else ""
+        word = next((w for w in re.findall(r"[a-z]+", _ascii(title or "").lower()) if w not in STOP_WORDS), "")
+        base = f"{family or 'anon'}{year or 'nd'}{word}"
+        n = self.counts.get(base, 0)
+        key = base
+        while key in self.used:
+            n += 1
+            key = base + _letters(n)
+        self.counts[base] = n
+        self.used.add(key)
+        return key
+
+
+def _letters(n):
+    """1 -> a, 26 -> z, 27 -> aa."""
+    out = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        out = chr(97 + r) + out
+    return out
+
+
+def entries(papers):
+    """Yield normalized entries, one paper at a time."""
+    keys = CitationKeys()
+    for p in papers:
+        authors = [parse_author(a) for a in _author_names(p)]
+        year = p.get("year") if isinstance(p.get("year"), int) else None
+        title = p.get("title") or "Untitled"
+        yield {
+            "key": keys.key(authors, year, title),
+            "type": "web" if p.get("source_type") == "web" else "article",
+            "title": title,
+            "authors": authors,
+            "year": year,
+            "url": p.get("url") or "",
+            "doi": p.get("doi") or "",
+            "abstract": p.get("abstract") or "",
+        }
+
+
+# --- SERIALIZERS ---
+def iter_word_xml(papers):
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<b:Sources SelectedStyle="\\APA.XSL" xmlns:b="{WORD_NS}" xmlns="{WORD_NS}">'
+    for e in entries(papers):
+        parts = [
+            f"<b:Source><b:Tag>{escape(e['key'])}</b:Tag>",
+            f"<b:SourceType>{'InternetSite' if e['type'] == 'web' else 'JournalArticle'}</b:SourceType>",
+        ]
+        people = [a for a in e["authors"] if not a.literal]
+        corporate = next((a for a in e["authors"] if a.literal), None)
+        if people:
+            parts.append("<b:Author><b:Author><b:NameList>")
+            for a in people:
+                first = f"<b:First>{escape(a.given)}</b:First>" if a.given else ""
+                parts.append(f"<b:Person><b:Last>{escape(a.family)}</b:Last>{first}</b:Person>")
+            parts.append("</b:NameList></b:Author></b:Author>")
+        elif corporate:
+            parts.append(f"<b:Author><b:Author><b:Corporate>{escape(corporate.family)}</b:Corporate></b:Author></b:Author>")
+        parts.append(f"<b:Title>{escape(e['title'])}</b:Title>")
+        if e["year"]:
+            parts.append(f"<b:Year>{e['year']}</b:Year>")
+        if e["url"]:
+            parts.append(f"<b:URL>{escape(e['url'])}</b:URL>")
+        if e["doi"]:
+            parts.append(f"<b:DOI>{escape(e['doi'])}</b:DOI>")
+        parts.append("</b:Source>")
+        yield "".join(parts)
+    yield "</b:Sources>\n"
+
+
+def _escaper(table):
+    special = re.compile("[" + re.escape("".join(table)) + "]")
+    # One pass, so the backslashes an escape adds are never escaped again
+    return lambda text: special.sub(lambda m: table[m[0]], text)
+
+
+_bibtex_text = _escaper({
+    "\\": r"\textbackslash{}", "~": r"\textasciitilde{}", "^": r"\textasciicircum{}",
+    # BibTeX counts braces even after a backslash, so a stray one must not survive as "\{"
+    "{": r"\textbraceleft{}", "}": r"\textbraceright{}",
+    **{c: "\\" + c for c in "&%$#_"},
+})
+# doi and url are read verbatim, so braces are percent-encoded rather than spelled out in TeX
+_bibtex_verbatim = _escaper({"{": "%7B", "}": "%7D", "%": r"\%", "#": r"\#"})
+
+
+def _bibtex_escape(text):
+    return _bibtex_text(" ".join(text.split()))
+
+
+def iter_bibtex(papers):
+    for e in entries(papers):
+        names = " and ".join(
+            f"{{{_bibtex_escape(a.family)}}}" if a.literal else _bibtex_escape(a.inverted()) for a in e["authors"]
+        )
+        fields = [("title", f"{{{_bibtex_escape(e['title'])}}}"), ("author", names)]
+        if e["year"]:
+            fields.append(("year", str(e["year"])))
+        if e["doi"]:
+            fields.append(("doi", _bibtex_verbatim(e["doi"])))
+        if e["url"]:
+            fields.append(("url", _bibtex_verbatim(e["url"])))
+        if e["abstract"]:
+            fields.append(("abstract", _bibtex_escape(e["abstract"])))
+        body = ",\n".join(f"  {k} = {{{v}}}" for k, v in fields if v)
+        yield f"@{'misc' if e['type'] == 'web' else 'article'}{{{e['key']},\n{body}\n}}\n\n"
+
+
+def iter_ris(papers):
+    for e in entries(papers):
+        lines = [f"TY  - {'ELEC' if e['type'] == 'web' else 'JOUR'}", f"ID  - {e['key']}", f"TI  - {' '.join(e['title'].split())}"]
+        lines += [f"AU  - {a.inverted()}" for a in e["authors"]]
+        if e["year"]:
+            lines.append(f"PY  - {e['year']}")
+        if e["doi"]:
+            lines.append(f"DO  - {e['doi']}")
+        if e["url"]:
+            lines.append(f"UR  - {e['url']}")
+        if e["abstract"]:
+            lines.append(f"AB  - {' '.join(e['abstract'].split())}")
+        lines.append("ER  - ")
+        yield "\r\n".join(lines) + "\r\n\r\n"
+
+
+def iter_csl_json(papers):
+    yield "["
+    for i, e in enumerate(entries(papers)):
+        item = {
+            "id": e["key"],
+            "type": "webpage" if e["type"] == "web" else "article-journal",
+            "title": e["title"],
+            "author": [
+                {"literal": a.family} if a.literal
+                else {k: v for k, v in (("family", a.family), ("given", a.given), ("suffix", a.suffix)) if v}
+                for a in e["authors"]
+            ],
+        }
+        if e["year"]:
+            item["issued"] = {"date-parts": [[e["year"]]]}
+        for field, value in (("DOI", e["doi"]), ("URL", e["url"]), ("abstract", e["abstract"])):
+            if value:
+                item[field] = value
+        yield ("," if i else "") + "\n  " + json.dumps(item, ensure_ascii=False)
+    yield "\n]\n"
+
+
+SERIALIZERS = {
+    "bib-xml": iter_word_xml,
+    "bibtex": iter_bibtex,
+    "ris": iter_ris,
+    "csl-json": iter_csl_json,
+}
+
+
+def write_bibliography(papers, fmt, fp):
+    """Stream ``fmt`` into a binary file object; returns bytes written."""
+    n = 0
+    for chunk in SERIALIZERS[fmt](papers):
+        n += fp.write(chunk.encode("utf-8"))
+    return n
+
+
+def render_bibliography(papers, fmt):
+    buf = io.BytesIO()
+    write_bibliography(papers, fmt, buf)
+    return buf.getvalue()
@@ -0,0 +1,295 @@
+"""Page- and section-aware transcript chunks.
+
+Ingest splits a transcript at its ``<!-- page N -->`` markers and headings,
+packs paragraphs into chunks of about ``CHUNK_TOKENS`` within a section, and
+writes them to ``paper_chunks`` (migration_paper_chunks.sql) with character
+offsets and token counts instead of storing the whole document on the paper
+row. Readers ask for a manifest (no text) first and then fetch only the chunk
+text they need, through a compressed local SQLite cache. Full-text search
+runs server-side over the chunks with the ``match_chunks`` RPC. A paper's
+chunks are replaced, and its ``content_body`` cleared, by one
+``replace_paper_chunks`` call, so readers never see a half-written set.
+Papers ingested before chunking are converted by ``python -m scout
+backfill-chunks``; until then retrieval chunks their ``content_body`` in
+memory.
+"""
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import NamedTuple
+
+from scout.repository import ID_BATCH
+from scout.telemetry import cache_event
+
+CHUNK_TOKENS = 300
+# Legacy transcripts converted per request; each can be a whole paper
+BACKFILL_BATCH = 20
+MANIFEST_COLUMNS = "id,paper_id,ordinal,page,section,tokens"
+# Sections retrieval skips: they match every query and answer none
+NOISE_SECTIONS = frozenset({"references", "bibliography", "acknowledgements", "acknowledgments"})
+
+SECTION_WORDS = frozenset({
+    "abstract", "introduction", "background", "related work", "literature review", "methods", "method",
+    "methodology", "materials and methods", "data", "data and methods", "results", "findings", "discussion",
+    "conclusion", "conclusions", "limitations", "references", "bibliography", "acknowledgements",
+    "acknowledgments", "appendix",
+})
+
+_PAGE = re.compile(r"<!-- page (\d+) -->")
+_PARAGRAPH = re.compile(r"\S.*?(?=\n[ \t]*\n|\Z)", re.S)
+_MD_HEADING = re.compile(r"#{1,6}\s+(.+?)[\s#]*$")
+_NUM_HEADING = re.compile(r"(\d{1,2}(?:\.\d{1,2})*)\.?\s+([A-Z][^.]{2,80})$")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_TOKEN = re.compile(r"\w{1,6}|[^\w\s]")
+
+
+def approx_tokens(text):
+    """Rough LLM token count: words split every six characters, plus punctuation."""
+    return len(_TOKEN.findall(text or ""))
+
+
+class Chunk(NamedTuple):
+    ordinal: int
+    page: int
+    section: str
+    char_start: int
+    char_end: int
+    tokens: int
+    text: str
+
+
+def _heading(line):
+    line = line.strip()
+    m = _MD_HEADING.match(line)
+    if m:
+        return m.group(1).strip("*_ ")
+    m = _NUM_HEADING.match(line)
+    if m and len(line.split()) <= 12:
+        return m.group(2).strip()
+    bare = line.strip("*_:# ").lower()
+    if bare in SECTION_WORDS:
+        return line.strip("*_:# ").title()
+    return None
+
+
+def _spans(text, start, end, target):
+    """Split an oversized paragraph at sentence ends, then at words, into spans of about ``target`` tokens."""
+    cuts = [start] + [start + m.end() for m in _SENTENCE_END.finditer(text[start:end])] + [end]
+    pieces = []
+    for s, e in zip(cuts, cuts[1:]):
+        if approx_tokens(text[s:e]) <= target:
+            pieces.append((s, e))
+            continue
+        # A run-on "sentence" (tables, reference lists): fixed word windows
+        words = [(s + w.start(), s + w.end()) for w in re.finditer(r"\S+", text[s:e])]
+        step = max(target // 2, 1)
+        pieces.extend((words[i][0], words[min(i + step, len(words)) - 1][1]) for i in range(0, len(words), step))
+    spans, cur, cur_tokens = [], None, 0
+    for s, e in pieces:
+        n = approx_tokens(text[s:e])
+        if cur and cur_tokens + n > target:
+            spans.append(cur)
+            cur, cur_tokens = None, 0
+        cur = (cur[0], e) if cur else (s, e)
+        cur_tokens += n
+    if cur:
+        spans.append(cur)
+    return spans
+
+
+def chunk_transcript(text, target=CHUNK_TOKENS):
+    """Chunks that never cross a page marker or heading; offsets index ``text``."""
+    chunks = []
+    page, section = 1, ""
+    cur = None  # [start, end, tokens, page, section]
+
+    def flush():
+        nonlocal cur
+        if cur:
+            s, e, _, p, sec = cur
+            body = text[s:e]
+            chunks.append(Chunk(len(chunks), p, sec, s, e, approx_tokens(body), body))
+        cur = None
+
+    for m in _PARAGRAPH.finditer(text or ""):
+        start, end = m.start(), m.end()
+        para = m.group()
+        marker = _PAGE.fullmatch(para.strip())
+        if marker:
+            flush()
+            page = int(marker.group(1))
+            continue
+        heading = _heading(para.split("\n", 1)[0])
+        if heading:
+            flush()
+            section = heading
+        n = approx_tokens(para)
+        if n > 2 * target:
+            # A short pending run (often just the heading) leads the first span
+            lead = cur[0] if cur and cur[2] < target // 4 else None
+            if lead is None:
+                flush()
+            for s, e in _spans(text, start, end, target):
+                cur = [lead if lead is not None else s, e, 0, page, section]
+                lead = None
+                flush()
+            continue
+        if cur and cur[2] + n > target:
+            flush()
+        if cur:
+            cur[1], cur[2] = end, cur[2] + n
+        else:
+            cur = [start, end, n, page, section]
+    flush()
+    return chunks
+
+
+def _fields(c):
+    return {
+        "ordinal": c.ordinal, "page": c.page, "section": c.section or None,
+        "char_start": c.char_start, "char_end": c.char_end, "tokens": c.tokens, "content": c.text,
+    }
+
+
+def chunk_rows(project_id, paper_id, chunks):
+    return [{"project_id": project_id, "paper_id": paper_id, **_fields(c)} for c in chunks]
+
+
+def write_chunks(db, paper_id, chunks):
+    """Replace a paper's chunks and clear its ``content_body`` in one transaction; returns how many were written.
+
+    The chunks take the paper's project and owner server-side
+    (migration_paper_chunks.sql).
+    """
+    rows = [_fields(c) for c in chunks]
+    db.rpc("replace_paper_chunks", {"p_paper_id": paper_id, "p_chunks": rows}).execute()
+    return len(rows)
+
+
+def backfill_chunks(db, project_id, batch=BACKFILL_BATCH):
+    """Chunk a project's legacy ``content_body`` transcripts; returns how many papers were converted.
+
+    Papers that already have chunks are left alone. Each paper converts
+    atomically, so an interrupted run can simply be started again.
+    """
+    converted, after = 0, None
+    while True:
+        q = db.table("papers").select("id,content_body").eq("project_id", project_id).not_.is_("content_body", "null")
+        if after:
+            q = q.gt("id", after)
+        page = q.order("id").limit(batch).execute().data or []
+        done = chunk_counts(db, [r["id"] for r in page])
+        for row in page:
+            if row["id"] not in done:
+                write_chunks(db, row["id"], chunk_transcript(row["content_body"] or ""))
+                converted += 1
+        if len(page) < batch:
+            return converted
+        after = page[-1]["id"]
+
+
+class ChunkCache:
+    """Local zlib-compressed chunk text keyed by chunk id, LRU-bounded.
+
+    Chunks are immutable once written (a re-ingest replaces them with new
+    ids), so entries never go stale.
+    """
+
+    def __init__(self, path=".cache/chunks.sqlite3", max_bytes=128 * 1024 * 1024):
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, body BLOB, size INTEGER, accessed REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_accessed ON chunks(accessed)")
+        self._conn.commit()
+
+    def get_many(self, ids):
+        out = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                for cid, body in self._conn.execute(f"SELECT id, body FROM chunks WHERE id IN ({marks})", batch):
+                    out[cid] = zlib.decompress(body).decode("utf-8")
+                self._conn.execute(f"UPDATE chunks SET accessed = ? WHERE id IN ({marks})", [time.time(), *batch])
+            self._conn.commit()
+        return out
+
+    def put_many(self, texts):
+        now = time.time()
+        rows = []
+        for cid, text in texts.items():
+            body = zlib.compress(text.encode("utf-8"), 6)
+            rows.append((cid, body, len(body), now))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM chunks").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess, freed = total - self.max_bytes, 0
+        for cid, size in self._conn.execute("SELECT id, size FROM chunks ORDER BY accessed").fetchall():
+            if freed >= excess:
+                break
+            self._conn.execute("DELETE FROM chunks WHERE id = ?", (cid,))
+            freed += size
+
+    def stats(self):
+        with self._lock:
+            n, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM chunks").fetchone()
+        return {"entries": n, "bytes": size}
+
+
+class ChunkReader:
+    def __init__(self, db, cache=None):
+        self.db = db
+        self.cache = cache
+
+    def manifest(self, paper_ids):
+        """``{paper_id: [chunk metadata, by ordinal]}`` without any text."""
+        out = {pid: [] for pid in paper_ids}
+        for i in range(0, len(paper_ids), ID_BATCH):
+            res = (
+                self.db.table("paper_chunks").select(MANIFEST_COLUMNS)
+                .in_("paper_id", paper_ids[i:i + ID_BATCH]).execute().data or []
+            )
+            for row in res:
+                out[row["paper_id"]].append(row)
+        for rows in out.values():
+            rows.sort(key=lambda r: r["ordinal"])
+        return out
+
+    def texts(self, chunk_ids):
+        """``{chunk_id: text}``, from the local cache where possible."""
+        found = self.cache.get_many(list(chunk_ids)) if self.cache else {}
+        missing = [cid for cid in chunk_ids if cid not in found]
+        cache_event("chunks", hits=len(found), misses=len(missing))
+        fetched = {}
+        for i in range(0, len(missing), ID_BATCH):
+            res = self.db.table("paper_chunks").select("id,content").in_("id", missing[i:i + ID_BATCH]).execute().data or []
+            fetched.update({r["id"]: r["content"] for r in res})
+        if fetched and self.cache:
+            self.cache.put_many(fetched)
+        return {**found, **fetched}
+
+    def search(self, project_id, query, limit=20):
+        """Best-matching chunks (with a highlighted snippet) via the ``match_chunks`` RPC."""
+        params = {"p_project_id": project_id, "p_query": query, "p_limit": limit}
+        return self.db.rpc("match_chunks", params).execute().data or []
+
+
+def chunk_counts(db, paper_ids):
+    """``{paper_id: number of chunks}`` for papers that have any."""
+    counts = {}
+    for i in range(0, len(paper_ids), ID_BATCH):
+        res = db.table("paper_chunks").select("paper_id").in_("paper_id", paper_ids[i:i + ID_BATCH]).execute().data or []
+        for row in res:
+            counts[row["paper_id"]] = counts.get(row["paper_id"], 0) + 1
+    return counts
@@ -0,0 +1,340 @@
+"""Command line for bulk work outside the Streamlit process.
+
+    python -m scout projects
+    python -m scout search "urban heat" --grey-lit --save "Heat study"
+    python -m scout ingest "Heat study" papers/*.pdf
+    python -m scout snowball --all --seeds 10 --depth 1
+    python -m scout export --all --out exports/
+    python -m scout backfill-chunks --all
+    python -m scout rekey --all
+    python -m scout ask "Heat study" "What drives heat exposure?"
+
+Settings come from ``.streamlit/secrets.toml`` (or ``--settings``). Commands
+that touch a library sign in as an operator, using ``[cli]`` email and
+password or ``$SCOUT_EMAIL`` / ``$SCOUT_PASSWORD``, so row-level security and
+ownership work exactly as in the app.
+
+Ingest and snowball go through the same job handlers as the app, acting as
+the signed-in operator, and use their own queue file, so retries,
+checkpoints and resubmission work the same way. Re-running a snowball skips
+seeds that have already been mined, which makes it safe to schedule nightly.
+Exports render in parallel worker processes.
+"""
+import argparse
+import json
+import os
+import pathlib
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from scout.services import Services, load_settings
+
+CLI_QUEUE = ".cache/cli_jobs.sqlite3"
+
+
+def _services(args):
+    settings = dict(load_settings(args.settings))
+    if getattr(args, "workers", None):
+        settings["jobs"] = {**settings.get("jobs", {}), "workers": args.workers}
+    services = Services(settings, jobs_path=args.queue)
+    services.start_telemetry()
+    return services
+
+
+def _sign_in(services):
+    conf = services.section("cli")
+    email = os.environ.get("SCOUT_EMAIL") or conf.get("email")
+    password = os.environ.get("SCOUT_PASSWORD") or conf.get("password")
+    if not (email and password):
+        raise SystemExit("Set [cli] email/password in the settings file or $SCOUT_EMAIL/$SCOUT_PASSWORD.")
+    return services.sign_in(email, password)
+
+
+def _projects(services, user, names=(), everything=False):
+    projects = services.projects(user.id)
+    if everything:
+        return projects
+    out = []
+    for name in names:
+        match = next((p for p in projects if name in (p["id"], p["name"])), None)
+        if match is None:
+            raise SystemExit(f"No workspace named {name!r}. Run `python -m scout projects` to list them.")
+        out.append(match)
+    return out
+
+
+def _log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+def _token(services):
+    # The client refreshes its own session; jobs only ever get the access token
+    return services.db.auth.get_session().access_token
+
+
+def _wait(queue, batch_id, label, reauth=None):
+    seen = [-1]
+
+    def report(batch):
+        if reauth is not None:
+            # Queued jobs keep a current token for as long as the command waits on them
+            reauth()
+        settled = sum(1 for j in batch if j["status"] not in ("queued", "running", "cancelling"))
+        if settled != seen[0]:
+            seen[0] = settled
+            _log(f"{label}: {settled}/{len(batch)} settled")
+
+    batch = queue.wait(batch_id, on_update=report)
+    for job in batch:
+        if job["status"] == "failed":
+            _log(f"  failed  {job['name']}: {job['message']}")
+    return batch
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "workspace"
+
+
+# --- COMMANDS ---
+def cmd_projects(args):
+    from scout.matrix import status_counts
+
+    services = _services(args)
+    user = _sign_in(services)
+    for p in services.projects(user.id):
+        papers = sum(status_counts(services.repository(p["id"])).values())
+        print(f"{p['id']}  {papers:>7}  {p['name']}")
+    return 0
+
+
+def cmd_search(args):
+    from scout.snowball import to_row
+
+    services = _services(args)
+    results = services.scholar.search(args.term, grey_lit=args.grey_lit, on_warning=_log)
+    for r in results:
+        print(json.dumps(r, default=str))
+    if args.save:
+        from scout.graph import link_papers
+        from scout.store import PaperStore
+
+        project = _projects(services, _sign_in(services), [args.save])[0]
+        repo = services.repository(project["id"])
+        store = PaperStore(repo, services.dedup)
+        store.add_many({**to_row(r), "source_type": r.get("source_type", "scout")} for r in results)
+        report = store.flush()
+        link_papers(repo, report.written)
+        _log(f"Archived {len(report.ids)} papers ({len(report.merged)} merged) into {project['name']}; {len(report.failed)} failed.")
+        return 1 if report.failed else 0
+    return 0
+
+
+def cmd_ingest(args):
+    from scout.ingest import stage_uploads
+
+    services = _services(args)
+    user = _sign_in(services)
+    project = _projects(services, user, [args.project])[0]
+    items = stage_uploads((p.name, p.read_bytes()) for p in map(pathlib.Path, args.paths))
+    if not items:
+        raise SystemExit("No PDFs found.")
+    queue = services.jobs
+    batch_id = queue.submit("ingest_pdf", project["id"], items, owner_id=user.id, access_token=_token(services))
+    batch = _wait(queue, batch_id, f"ingest {project['name']}", lambda: queue.reauth(user.id, _token(services)))
+    return 1 if any(j["status"] == "failed" for j in batch) else 0
+
+
+def cmd_snowball(args):
+    services = _services(args)
+    user = _sign_in(services)
+    projects = _projects(services, user, args.projects, args.all)
+    queue = services.jobs
+    directions = sorted(args.directions)
+    batches = []
+    # Every project's seeds go in first, so the worker pool mines them side by side
+    for project in projects:
+        papers = services.repository(project["id"]).snapshot()
+        papers = sorted(papers, key=lambda p: (p.get("citation_count") or 0, p.get("created_at") or ""), reverse=True)
+        items = []
+        for p in papers:
+            if len(items) == args.seeds:
+                break
+            key = f"{p['id']}:{args.depth}:{'+'.join(directions)}"
+            if queue.find("snowball", project["id"], key, ("done", "queued", "running", "cancelling")):
+                continue
+            items.append((f"Mine: {p['title'][:60]}", {
+                "seed_id": p["id"], "seed_title": p["title"], "depth": args.depth, "directions": directions,
+                "min_citations": args.min_citations, "dedup_key": key,
+            }))
+        if items:
+            batches.append((project, queue.submit("snowball", project["id"], items, owner_id=user.id, access_token=_token(services))))
+        else:
+            _log(f"snowball {project['name']}: every seed already mined")
+    failed = inserted = 0
+    for project, batch_id in batches:
+        batch = _wait(queue, batch_id, f"snowball {project['name']}", lambda: queue.reauth(user.id, _token(services)))
+        failed += sum(1 for j in batch if j["status"] == "failed")
+        inserted += sum((j["result"] or {}).get("inserted", 0) for j in batch)
+    _log(f"{inserted} papers added across {len(batches)} workspaces; {failed} seeds failed.")
+    return 1 if failed else 0
+
+
+def cmd_backfill_chunks(args):
+    from scout.chunks import backfill_chunks
+
+    services = _services(args)
+    projects = _projects(services, _sign_in(services), args.projects, args.all)
+    total = 0
+    for project in projects:
+        n = backfill_chunks(services.db, project["id"])
+        total += n
+        _log(f"backfill-chunks {project['name']}: {n} transcripts chunked")
+    _log(f"{total} legacy transcripts moved to paper_chunks across {len(projects)} workspaces.")
+    return 0
+
+
+def cmd_rekey(args):
+    from scout.store import rekey_papers
+
+    services = _services(args)
+    projects = _projects(services, _sign_in(services), args.projects, args.all)
+    failed = 0
+    for project in projects:
+        changed, errors = rekey_papers(services.repository(project["id"]))
+        failed += len(errors)
+        _log(f"rekey {project['name']}: {changed} natural keys updated, {len(errors)} failed")
+        for row, error in errors[:5]:
+            _log(f"  failed  {row['id']}: {error}")
+    return 1 if failed else 0
+
+
+def _render(fmt, papers, path):
+    from scout.export import render_export
+
+    data = render_export(fmt, papers)
+    path.write_bytes(data)
+    return len(data)
+
+
+def cmd_export(args):
+    from scout.export import EXPORT_FILES
+
+    services = _services(args)
+    projects = _projects(services, _sign_in(services), args.projects, args.all)
+    out = pathlib.Path(args.out)
+    # Snapshots are network-bound; rendering is CPU-bound and goes to processes
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        views = list(pool.map(lambda p: services.repository(p["id"]).view("handover"), projects))
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = []
+        for project, papers in zip(projects, views):
+            folder = out / f"{_slug(project['name'])}-{project['id'][:8]}"
+            folder.mkdir(parents=True, exist_ok=True)
+            for fmt in args.formats:
+                path = folder / EXPORT_FILES[fmt]
+                futures.append((path, len(papers), pool.submit(_render, fmt, papers, path)))
+        for path, n, future in futures:
+            _log(f"{path}  {n} papers  {future.result() / 1024:.0f} KB")
+    return 0
+
+
+def cmd_ask(args):
+    from scout.retrieval import CONTEXT_TOKENS
+    from scout.synthesis import SynthesisStream, grounded_prompt
+
+    services = _services(args)
+    project = _projects(services, _sign_in(services), [args.project])[0]
+    budget = args.budget or int(services.section("synthesis").get("context_tokens", CONTEXT_TOKENS))
+    prompt = grounded_prompt(services.repository(project["id"]), services.chunks, args.question, k=args.k, budget=budget)
+    stream = SynthesisStream(services.gemini, prompt)
+    for piece in stream:
+        sys.stdout.write(piece)
+        sys.stdout.flush()
+    print()
+    _log(stream.metrics.caption())
+    return 0
+
+
+def build_parser():
+    from scout.export import EXPORT_FILES
+    from scout.snowball import DIRECTIONS
+
+    ap = argparse.ArgumentParser(prog="python -m scout", description="THE FACTORY core services, headless.")
+    ap.add_argument("--settings", help="secrets file (default: $SCOUT_SETTINGS or .streamlit/secrets.toml)")
+    ap.add_argument("--queue", default=CLI_QUEUE, help="job queue file for ingest and snowball")
+    ap.add_argument("--timings", action="store_true", help="print per-operation latency and cache hit rates at the end")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("projects", help="list workspaces and their paper counts")
+    p.set_defaults(func=cmd_projects)
+
+    p = sub.add_parser("search", help="search Semantic Scholar (and grey literature); prints JSON lines")
+    p.add_argument("term")
+    p.add_argument("--grey-lit", action="store_true")
+    p.add_argument("--save", metavar="WORKSPACE", help="archive the results into this workspace")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("ingest", help="ingest PDFs (or zips of PDFs) into a workspace")
+    p.add_argument("project", metavar="WORKSPACE")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--workers", type=int, help="parallel ingest jobs")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser("snowball", help="mine citations from each workspace's most-cited unmined papers")
+    p.add_argument("projects", nargs="*", metavar="WORKSPACE")
+    p.add_argument("--all", action="store_true", help="every workspace")
+    p.add_argument("--seeds", type=int, default=10, help="new seed papers per workspace")
+    p.add_argument("--depth", type=int, default=1)
+    p.add_argument("--directions", nargs="+", choices=list(DIRECTIONS), default=["references"])
+    p.add_argument("--min-citations", type=int, default=0)
+    p.add_argument("--workers", type=int, help="parallel mining jobs")
+    p.set_defaults(func=cmd_snowball)
+
+    p = sub.add_parser("backfill-chunks", help="move legacy content_body transcripts into paper_chunks")
+    p.add_argument("projects", nargs="*", metavar="WORKSPACE")
+    p.add_argument("--all", action="store_true", help="every workspace")
+    p.set_defaults(func=cmd_backfill_chunks)
+
+    p = sub.add_parser("rekey", help="recompute natural keys (after migration_natural_key.sql or a key rule change)")
+    p.add_argument("projects", nargs="*", metavar="WORKSPACE")
+    p.add_argument("--all", action="store_true", help="every workspace")
+    p.set_defaults(func=cmd_rekey)
+
+    p = sub.add_parser("export", help="write Handover exports for workspaces")
+    p.add_argument("projects", nargs="*", metavar="WORKSPACE")
+    p.add_argument("--all", action="store_true", help="every workspace")
+    p.add_argument("--out", default="exports")
+    p.add_argument("--formats", nargs="+", choices=list(EXPORT_FILES), default=list(EXPORT_FILES))
+    p.add_argument("--processes", type=int, default=os.cpu_count())
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("ask", help="grounded synthesis over a workspace; streams the answer")
+    p.add_argument("project", metavar="WORKSPACE")
+    p.add_argument("question")
+    p.add_argument("-k", type=int, default=24, help="most passages of context")
+    p.add_argument("--budget", type=int, help="context tokens (default: [synthesis] context_tokens or 6000)")
+    p.set_defaults(func=cmd_ask)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if hasattr(args, "all") and not (args.all or args.projects):
+        raise SystemExit(f"{args.command}: name at least one workspace or pass --all")
+    try:
+        return args.func(args)
+    finally:
+        if args.timings:
+            _print_timings()
+
+
+def _print_timings():
+    from scout.telemetry import telemetry
+
+    _log(f"{'operation':<32} {'calls':>6} {'p50':>8} {'p95':>8} {'max':>8} {'rows':>7} {'tokens':>8}")
+    for r in telemetry.summary():
+        _log(f"{r['operation'][:32]:<32} {r['calls']:>6} {r['p50_ms']:>6.0f}ms {r['p95_ms']:>6.0f}ms {r['max_ms']:>6.0f}ms "
+             f"{r['rows']:>7} {r['tokens_in'] + r['tokens_out']:>8}")
+    for name, c in sorted(telemetry.cache_stats().items()):
+        _log(f"cache {name:<26} {c['hits']:>6} hits {c['misses']:>6} misses  {c['hit_rate']:.0%}")
@@ -0,0 +1,167 @@
+"""Handover exports: the research matrix and the bibliographies.
+
+Every matrix format renders the same rows from :func:`matrix_rows`. The Excel
+export uses openpyxl's write-only mode, so cells are streamed to disk instead
+of held as objects, and column widths are measured in the same pass that
+builds the rows rather than by re-reading every cell afterwards.
+
+Exports are built on demand: :func:`lazy_export` hands the download button a
+callable and memoizes the bytes per (project, library version, format).
+"""
+import csv
+import io
+import threading
+from functools import partial
+
+from scout.bibliography import SERIALIZERS, render_bibliography
+from scout.telemetry import cache_event, span
+
+MATRIX_HEADERS = ["Title", "Authors", "Year", "Status", "Impact Score", "Source", "Abstract/Summary"]
+ABSTRACT_CHARS = 1000  # Truncate massive abstracts for Excel readability
+MAX_WIDTH = 50
+
+
+def matrix_rows(papers):
+    for p in papers:
+        authors = ", ".join(p.get('authors', [])) if isinstance(p.get('authors'), list) else "Anon"
+        yield [
+            p.get('title', 'Untitled'),
+            authors,
+            p.get('year', 'n.d.'),
+            p.get('reading_status', 'Unread'),
+            p.get('impact_score', 0.0),
+            p.get('source_type', 'Unknown'),
+            (p.get('abstract') or '')[:ABSTRACT_CHARS],
+        ]
+
+
+def excel_matrix(papers):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    # One pass: keep plain row lists (not cells) and track the widest value per column
+    widths = [len(h) for h in MATRIX_HEADERS]
+    rows = []
+    for row in matrix_rows(papers):
+        for i, v in enumerate(row):
+            n = len(str(v))
+            if n > widths[i]:
+                widths[i] = n
+        rows.append(row)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Research Matrix")
+    # Write-only sheets need their dimensions before the first row
+    for i, w in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(i)].width = min(w + 2, MAX_WIDTH)
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="121212", end_color="121212", fill_type="solid")
+    header_align = Alignment(horizontal="center", vertical="center")
+    header = []
+    for h in MATRIX_HEADERS:
+        cell = WriteOnlyCell(ws, value=h)
+        cell.font, cell.fill, cell.alignment = header_font, header_fill, header_align
+        header.append(cell)
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def csv_matrix(papers):
+    buf = io.BytesIO()
+    # Encode as rows are written; BOM so Excel opens UTF-8 author names correctly
+    text = io.TextIOWrapper(buf, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(MATRIX_HEADERS)
+    writer.writerows(matrix_rows(papers))
+    text.flush()
+    return buf.getvalue()
+
+
+def parquet_matrix(papers, row_group=5000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (h, pa.int32() if i == 2 else pa.float64() if i == 4 else pa.string())
+        for i, h in enumerate(MATRIX_HEADERS)
+    ])
+
+    def table(rows):
+        columns = [list(c) for c in zip(*rows)]
+        # Typed columns; stray placeholders such as 'n.d.' become nulls
+        columns[2] = [v if isinstance(v, int) else None for v in columns[2]]
+        columns[4] = [float(v) if isinstance(v, (int, float)) else None for v in columns[4]]
+        return pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(columns, schema)], schema=schema)
+
+    # Row groups bound memory to one slice of the matrix at a time
+    buf = io.BytesIO()
+    with pq.ParquetWriter(buf, schema, compression="zstd") as writer:
+        rows = []
+        for row in matrix_rows(papers):
+            rows.append(row)
+            if len(rows) == row_group:
+                writer.write_table(table(rows))
+                rows = []
+        if rows:
+            writer.write_table(table(rows))
+    return buf.getvalue()
+
+
+# File names the Handover tab offers, reused by batch exports
+EXPORT_FILES = {
+    "bib-xml": "bib.xml", "bibtex": "library.bib", "ris": "library.ris", "csl-json": "library.json",
+    "xlsx": "matrix.xlsx", "csv": "matrix.csv", "parquet": "matrix.parquet",
+}
+
+EXPORTERS = {
+    "xlsx": excel_matrix,
+    "csv": csv_matrix,
+    "parquet": parquet_matrix,
+    **{fmt: partial(render_bibliography, fmt=fmt) for fmt in SERIALIZERS},
+}
+
+
+def render_export(fmt, papers):
+    """``EXPORTERS[fmt]`` timed as an ``export.<fmt>`` span with its size."""
+    with span(f"export.{fmt}", rows=len(papers)) as s:
+        data = EXPORTERS[fmt](papers)
+        s.set(bytes=len(data))
+        return data
+
+
+def project_exports(repo):
+    """The project's memo of rendered exports, kept in the repository cache."""
+    return repo.cache.setdefault(f"exports::{repo.project_id}", {"version": -1, "files": {}, "lock": threading.Lock()})
+
+
+def lazy_export(repo, fmt, papers):
+    """Zero-argument callable for ``st.download_button(data=...)``.
+
+    The rows and library version are captured at render time; the export is
+    only built when the callable runs (Streamlit calls it on click, off the
+    script thread) and is then served from the memo until the version moves.
+    """
+    state = project_exports(repo)
+    version = repo.version
+
+    def build():
+        with state["lock"]:
+            if version > state["version"]:
+                state["version"], state["files"] = version, {}
+            elif version < state["version"]:
+                # A button rendered before the latest write; don't cache stale bytes
+                return render_export(fmt, papers)
+            cache_event("exports", hits=fmt in state["files"], misses=fmt not in state["files"])
+            if fmt not in state["files"]:
+                state["files"][fmt] = render_export(fmt, papers)
+            return state["files"][fmt]
+
+    return build
@@ -0,0 +1,287 @@
+"""Network Graph construction and citation metrics.
+
+``ProjectGraph`` keeps an author -> papers inverted index plus the project's
+citation edges and is maintained incrementally: adding or removing a paper
+touches only the pairs in its neighbourhood. Shared-author and citation
+edges are persisted to ``paper_edges``; PageRank and connected components
+are computed with sparse matrices and feed ``impact_score``.
+"""
+from collections import Counter, defaultdict
+
+from scout.repository import PAGE_SIZE
+from scout.telemetry import span, traced
+
+# Placeholder author names that would otherwise link every web/grey source
+PLACEHOLDER_AUTHORS = frozenset({"", "anon", "unknown", "web source"})
+
+EDGE_BATCH = 500
+
+
+def real_authors(paper):
+    return {a for a in paper.get("authors") or [] if a and a.strip().lower() not in PLACEHOLDER_AUTHORS}
+
+
+def _pair(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+class ProjectGraph:
+    def __init__(self):
+        self.papers = {}
+        self.by_author = defaultdict(set)
+        self.shared = defaultdict(set)    # (id_a, id_b) -> shared author names
+        self.cites = set()                # (citing_id, cited_id)
+        self.cite_adj = defaultdict(set)  # id -> citation edges touching it
+        self.pending = defaultdict(set)   # id not loaded yet -> citation edges waiting for it
+        self.version = -1
+        self.edges_cursor = None          # (created_at, id) of the last edge read
+        self._view = (None, None)
+
+    # --- INCREMENTAL MAINTENANCE ---
+    def add_paper(self, paper):
+        pid = paper["id"]
+        old = self.papers.get(pid)
+        if old is not None and real_authors(old) == real_authors(paper):
+            self.papers[pid] = paper  # metadata-only change
+            return
+        if old is not None:
+            self._unlink_authors(pid)
+        self.papers[pid] = paper
+        for author in real_authors(paper):
+            for other in self.by_author[author]:
+                self.shared[_pair(pid, other)].add(author)
+            self.by_author[author].add(pid)
+        for citing, cited in self.pending.pop(pid, ()):
+            self.link_citation(citing, cited)
+
+    def remove_paper(self, pid):
+        if pid not in self.papers:
+            return
+        self._unlink_authors(pid)
+        for edge in self.cite_adj.pop(pid, set()):
+            self.cites.discard(edge)
+            other = edge[1] if edge[0] == pid else edge[0]
+            self.cite_adj[other].discard(edge)
+        del self.papers[pid]
+
+    def _unlink_authors(self, pid):
+        for author in real_authors(self.papers[pid]):
+            ids = self.by_author[author]
+            ids.discard(pid)
+            for other in ids:
+                pair = _pair(pid, other)
+                self.shared[pair].discard(author)
+                if not self.shared[pair]:
+                    del self.shared[pair]
+            if not ids:
+                del self.by_author[author]
+
+    def link_citation(self, citing, cited):
+        """``add_citation`` once both papers are loaded; until then the edge waits."""
+        missing = [pid for pid in (citing, cited) if pid not in self.papers]
+        for pid in missing:
+            self.pending[pid].add((citing, cited))
+        if not missing:
+            self.add_citation(citing, cited)
+
+    def add_citation(self, citing, cited):
+        if citing == cited:
+            return
+        edge = (citing, cited)
+        self.cites.add(edge)
+        self.cite_adj[citing].add(edge)
+        self.cite_adj[cited].add(edge)
+
+    def shared_neighbours(self, pid):
+        """{other_id: shared_count} for one paper, from the inverted index."""
+        counts = Counter()
+        for author in real_authors(self.papers.get(pid, {})):
+            for other in self.by_author[author]:
+                if other != pid:
+                    counts[other] += 1
+        return counts
+
+    def sync(self, repo):
+        """Catch up with the repository snapshot and any new persisted edges."""
+        if self.version == repo.version:
+            return
+        with span("graph.sync"):
+            self._sync(repo)
+
+    def _sync(self, repo):
+        current = {p["id"]: p for p in repo.view("graph")}
+        for pid in [pid for pid in self.papers if pid not in current]:
+            self.remove_paper(pid)
+        for p in current.values():
+            self.add_paper(p)
+        for e in self._new_edges(repo):
+            self.link_citation(e["source_id"], e["target_id"])
+            self.edges_cursor = (e["created_at"], e["id"])
+        self.version = repo.version
+
+    def _new_edges(self, repo):
+        # Keyset on (created_at, id): resume at the cursor's timestamp and skip
+        # what was already read there, so a batch sharing one created_at is
+        # never cut off. Paged to stay under PostgREST's max-rows.
+        after = self.edges_cursor
+        start = 0
+        while True:
+            q = (
+                repo.db.table("paper_edges").select("id,source_id,target_id,created_at")
+                .eq("project_id", repo.project_id).eq("relation", "cites")
+            )
+            if after:
+                q = q.gte("created_at", after[0])
+            page = q.order("created_at").order("id").range(start, start + PAGE_SIZE - 1).execute().data or []
+            for e in page:
+                if not after or e["created_at"] != after[0] or e["id"] > after[1]:
+                    yield e
+            if len(page) < PAGE_SIZE:
+                return
+            start += PAGE_SIZE
+
+    # --- VIEW ---
+    def view(self, min_shared=1, top_n=None, show_citations=True):
+        """Nodes and weighted edges, optionally pruned to the top-N connected papers.
+
+        Memoized until the graph changes, so reruns with the same options are free.
+        """
+        key = (self.version, len(self.papers), len(self.cites), min_shared, top_n, show_citations)
+        if self._view[0] == key:
+            return self._view[1]
+        edges = {}
+        for pair, authors in self.shared.items():
+            if len(authors) >= min_shared:
+                edges[pair] = (len(authors), "shared-author", min(authors))
+        if show_citations:
+            for citing, cited in self.cites:
+                edges[(citing, cited)] = (1, "cites", "cites")
+
+        keep = None
+        if top_n:
+            degree = Counter()
+            for (a, b), (w, _, _) in edges.items():
+                degree[a] += w
+                degree[b] += w
+            keep = {pid for pid, _ in degree.most_common(top_n)}
+            edges = {pair: v for pair, v in edges.items() if pair[0] in keep and pair[1] in keep}
+
+        nodes = [
+            {
+                "id": pid,
+                "label": (p.get("title") or "Untitled")[:20] + "...",
+                # Size based on citation count (logarithmic scale approx)
+                "size": min(15 + (p.get("citation_count") or 0) / 10, 40),
+            }
+            for pid, p in self.papers.items()
+            if keep is None or pid in keep
+        ]
+        edge_list = [
+            {"source": a, "target": b, "weight": w, "relation": rel, "label": label if w == 1 or rel == "cites" else f"{label} +{w - 1}"}
+            for (a, b), (w, rel, label) in edges.items()
+        ]
+        self._view = (key, (nodes, edge_list))
+        return nodes, edge_list
+
+
+def build_graph(papers, min_shared=1, top_n=None):
+    """One-off ``ProjectGraph`` view over a list of papers."""
+    g = ProjectGraph()
+    for p in papers:
+        g.add_paper(p)
+    return g.view(min_shared, top_n)
+
+
+def project_graph(repo):
+    """The project's incrementally maintained graph, synced to the snapshot."""
+    g = repo.cache.setdefault(f"graph::{repo.project_id}", ProjectGraph())
+    g.sync(repo)
+    return g
+
+
+# --- PERSISTENCE ---
+def edge_rows(repo, graph, papers=(), s2_edges=(), s2_ids=None):
+    """``paper_edges`` rows for newly saved papers and crawled citations.
+
+    ``s2_edges`` are ``(src, dst, direction)`` triples from Snowball Mining,
+    keyed by Semantic Scholar id; ``s2_ids`` maps those to library ids.
+    Citations are stored once as ``cites`` (citing -> cited); cited-by is the
+    same edge read in reverse.
+    """
+    rows = {}
+    for p in papers:
+        for other, w in graph.shared_neighbours(p["id"]).items():
+            a, b = _pair(p["id"], other)
+            rows[(a, b, "shared-author")] = w
+    s2_ids = s2_ids or {}
+    for src, dst, direction in s2_edges:
+        citing, cited = (src, dst) if direction == "references" else (dst, src)
+        if citing in s2_ids and cited in s2_ids and s2_ids[citing] != s2_ids[cited]:
+            rows[(s2_ids[citing], s2_ids[cited], "cites")] = 1
+    return [
+        {"project_id": repo.project_id, "source_id": a, "target_id": b, "relation": rel, "weight": w}
+        for (a, b, rel), w in rows.items()
+    ]
+
+
+def save_edges(repo, rows):
+    for i in range(0, len(rows), EDGE_BATCH):
+        repo.db.table("paper_edges").upsert(rows[i:i + EDGE_BATCH], on_conflict="source_id,target_id,relation").execute()
+
+
+def link_papers(repo, papers=(), s2_edges=(), s2_ids=None):
+    """Persist the edges a write introduced and fold them into the live graph."""
+    graph = project_graph(repo)
+    rows = edge_rows(repo, graph, papers, s2_edges, s2_ids)
+    if rows:
+        save_edges(repo, rows)
+        for r in rows:
+            if r["relation"] == "cites":
+                graph.link_citation(r["source_id"], r["target_id"])
+    return len(rows)
+
+
+# --- METRICS ---
+@traced("graph.metrics")
+def graph_metrics(graph, damping=0.85, tol=1e-9, max_iter=100):
+    """PageRank over citations and connected components over all edges.
+
+    Returns ``({paper_id: {"pagerank", "impact", "component"}}, summary)``
+    where ``impact`` is PageRank scaled so the library average is 1.0.
+    """
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    ids = list(graph.papers)
+    n = len(ids)
+    if not n:
+        return {}, {"components": 0, "largest": 0}
+    idx = {pid: i for i, pid in enumerate(ids)}
+
+    cites = np.array([(idx[a], idx[b]) for a, b in graph.cites if a in idx and b in idx], dtype=np.int64).reshape(-1, 2)
+    citing, cited = cites[:, 0], cites[:, 1]
+    out_deg = np.bincount(citing, minlength=n).astype(float)
+    # Column-stochastic transition: rank flows from citing to cited paper
+    m = csr_matrix((1.0 / out_deg[citing], (cited, citing)), shape=(n, n))
+    dangling = out_deg == 0
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new = damping * (m @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+        done = np.abs(new - rank).sum() < tol
+        rank = new
+        if done:
+            break
+
+    shared = np.array([(idx[a], idx[b]) for a, b in graph.shared if a in idx and b in idx], dtype=np.int64).reshape(-1, 2)
+    links = np.vstack([cites, shared])
+    adj = csr_matrix((np.ones(len(links)), (links[:, 0], links[:, 1])), shape=(n, n))
+    n_comp, labels = connected_components(adj, directed=False)
+    sizes = np.bincount(labels)
+
+    metrics = {
+        pid: {"pagerank": float(rank[i]), "impact": round(float(rank[i] * n), 4), "component": int(labels[i])}
+        for pid, i in idx.items()
+    }
+    return metrics, {"components": int(n_comp), "largest": int(sizes.max()), "citations": len(cites)}
@@ -0,0 +1,75 @@
+"""Shared HTTP plumbing: pooled sessions, rate limiting and polite retries."""
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scout.telemetry import span
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def pooled_session(pool_size=8, headers=None):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class RateLimiter:
+    """Spaces calls at most ``rate`` per second across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def defer(self, seconds):
+        """Push every caller back, e.g. after a Retry-After header."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+def retry_after(res, default):
+    try:
+        return max(float(res.headers.get("Retry-After", default)), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+def request(session, method, url, limiter=None, retries=4, backoff=1.0, **kwargs):
+    """Send a request through ``limiter``, retrying 429/5xx with backoff.
+
+    Retry-After is honoured when present and applied to the shared limiter so
+    concurrent workers back off together. Timed as one ``http.<host>`` span
+    covering rate-limit waits and retries.
+    """
+    with span(f"http.{urlsplit(url).netloc}", method=method) as s:
+        for attempt in range(retries + 1):
+            if limiter:
+                limiter.wait()
+            res = session.request(method, url, **kwargs)
+            if res.status_code not in RETRY_STATUSES or attempt == retries:
+                s.set(status=res.status_code, attempts=attempt + 1, bytes=len(res.content))
+                res.raise_for_status()
+                return res
+            delay = retry_after(res, backoff * 2 ** attempt)
+            if limiter:
+                limiter.defer(delay)
+            else:
+                time.sleep(delay)
@@ -0,0 +1,304 @@
+"""Tiered PDF ingest.
+
+Born-digital PDFs already carry a text layer, so pages are first extracted
+locally with pypdf, one at a time, and scored for quality. Only scanned or
+garbled pages are sent to the Gemini vision engine, as one sub-PDF per run of
+consecutive pages, and each page's transcript goes back in its own place;
+the metadata pass runs on the extracted text when there is enough of it.
+Documents that are mostly scans fall back to the full vision path.
+"""
+import pathlib
+import re
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from io import BytesIO
+
+from scout.chunks import chunk_counts, chunk_transcript, write_chunks
+from scout.http import RateLimiter
+from scout.jobs import PermanentError
+from scout.llm_cache import content_hash
+from scout.models import ScrapedContent
+from scout.repository import PaperRepository
+from scout.store import PaperStore
+from scout.telemetry import traced
+
+META_PROMPT = "Extract strict academic metadata."
+BODY_PROMPT = "Transcribe this full document into clean Markdown. Describe all charts/images."
+TEXT_META_PROMPT = "Analyze this academic document and extract strict metadata: {text}"
+PAGES_PROMPT = (
+    "Transcribe each of the {n} pages of this document into clean Markdown. Describe all charts/images. "
+    "Start every page with a line reading exactly `=== PAGE k ===`, counting k from 1."
+)
+
+MIN_PAGE_QUALITY = 0.6
+MIN_LOCAL_SHARE = 0.5     # below this share of good pages, vision does the whole file
+META_TEXT_CHARS = 8000
+MAX_RUN_PAGES = 10        # pages per vision request, to stay well inside the output limit
+
+_CID = re.compile(r"\(cid:\d+\)")
+_PAGE_MARK = re.compile(r"^=== PAGE (\d+) ===[ \t]*$", re.MULTILINE)
+_WORD = re.compile(r"^[^\W\d_]{2,20}[.,;:)]?$")
+
+
+def page_quality(text):
+    """Score 0..1 for how usable a page's text layer is."""
+    t = (text or "").strip()
+    if not t:
+        return 0.0
+    # Scans, figures and title pages carry little or no text
+    volume = min(len(t) / 400, 1.0)
+    alpha = sum(c.isalpha() for c in t) / len(t)
+    words = t.split()
+    wordlike = sum(bool(_WORD.match(w)) for w in words) / len(words)
+    garbage = (t.count("�") + len(_CID.findall(t))) / max(len(words), 1)
+    score = volume * (0.5 * min(alpha / 0.6, 1.0) + 0.5 * wordlike) - 2 * garbage
+    return max(0.0, min(score, 1.0))
+
+
+def iter_pages(reader):
+    """Yield ``(index, text)`` one page at a time."""
+    for i, page in enumerate(reader.pages):
+        try:
+            yield i, page.extract_text() or ""
+        except Exception:
+            yield i, ""
+
+
+def subset_pdf(reader, indices):
+    """Bytes of a PDF containing only the given pages."""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for i in indices:
+        writer.add_page(reader.pages[i])
+    buf = BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def page_runs(indices, limit=MAX_RUN_PAGES):
+    """Split sorted page indices into runs of consecutive pages, at most ``limit`` long."""
+    runs = []
+    for i in indices:
+        if runs and i == runs[-1][-1] + 1 and len(runs[-1]) < limit:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    return runs
+
+
+def split_pages(transcript, n):
+    """The ``n`` page transcripts of a PAGES_PROMPT reply; ValueError unless every page is marked once, in order."""
+    parts = _PAGE_MARK.split(transcript)
+    if [int(k) for k in parts[1::2]] != list(range(1, n + 1)):
+        raise ValueError(f"expected page markers 1..{n}")
+    return [t.strip() for t in parts[2::2]]
+
+
+def transcribe_pages(reader, run, model, cache, upload, pdf_hash):
+    """``[text]`` for each page in ``run``, one vision request for the run when possible."""
+    if len(run) > 1:
+        try:
+            return cache.generate(
+                model, lambda: [upload(subset_pdf(reader, run)), PAGES_PROMPT.format(n=len(run))],
+                parts_key=[pdf_hash, "pages", run, PAGES_PROMPT], parse=lambda t: split_pages(t, len(run)),
+            )
+        except ValueError:
+            pass  # Markers missing or merged; go page by page
+    return [
+        cache.generate(model, lambda i=i: [upload(subset_pdf(reader, [i])), BODY_PROMPT], parts_key=[pdf_hash, "pages", [i], BODY_PROMPT])
+        for i in run
+    ]
+
+
+def rich_abstract(meta):
+    return f"""{meta.summary}
+
+KEY FINDINGS:
+{chr(10).join(['- ' + k for k in meta.key_findings])}
+
+METHODOLOGY: {meta.methodology}
+"""
+
+
+def paper_row(meta, **extra):
+    """Map a validated ``ScrapedContent`` onto a ``papers`` row."""
+    return {
+        "title": meta.title,
+        "authors": [meta.author],  # Schema expects list
+        "year": int(meta.publication_date[:4]) if meta.publication_date[:1].isdigit() else datetime.now().year,
+        "abstract": rich_abstract(meta),
+        **extra,
+    }
+
+
+@dataclass
+class IngestResult:
+    meta: ScrapedContent
+    content: str
+    pages: int = 0
+    vision_pages: list = field(default_factory=list)
+    mode: str = "local"
+
+    @property
+    def local_pages(self):
+        return self.pages - len(self.vision_pages)
+
+
+def extract_text_layer(pdf_bytes, min_quality=MIN_PAGE_QUALITY):
+    """Return ``(reader, texts, bad_page_indices)`` from the local pass."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(BytesIO(pdf_bytes))
+    texts, bad = [], []
+    for i, text in iter_pages(reader):
+        if page_quality(text) < min_quality:
+            bad.append(i)
+            text = ""
+        texts.append(text)
+    return reader, texts, bad
+
+
+@traced("ingest.pdf")
+def ingest_pdf(pdf_bytes, model, cache, upload, min_quality=MIN_PAGE_QUALITY):
+    """Run the tiered pipeline for one PDF.
+
+    ``upload(data: bytes)`` must return a Gemini file handle; it is only
+    called for the pages (or whole file) that need the vision engine, and
+    only on cache misses.
+    """
+    pdf_hash = content_hash(pdf_bytes)
+    try:
+        reader, texts, bad = extract_text_layer(pdf_bytes, min_quality)
+    except Exception:
+        reader, texts, bad = None, [], []
+    n = len(texts)
+    json_config = {"response_mime_type": "application/json"}
+
+    # Mostly scanned (or unreadable): the original two-pass vision route
+    if not n or (n - len(bad)) / n < MIN_LOCAL_SHARE:
+        handle = {}
+
+        def whole_file():
+            if "file" not in handle:
+                handle["file"] = upload(pdf_bytes)
+            return handle["file"]
+
+        meta = cache.generate(
+            model, lambda: [whole_file(), META_PROMPT], schema=ScrapedContent,
+            generation_config=json_config, parts_key=[pdf_hash, META_PROMPT], parse=ScrapedContent.model_validate_json,
+        )
+        content = cache.generate(model, lambda: [whole_file(), BODY_PROMPT], parts_key=[pdf_hash, BODY_PROMPT])
+        return IngestResult(meta, content, pages=n, vision_pages=list(range(n)), mode="vision")
+
+    # Vision pass only for the pages the text layer could not cover
+    for run in page_runs(bad):
+        for i, text in zip(run, transcribe_pages(reader, run, model, cache, upload, pdf_hash)):
+            texts[i] = text
+
+    content = "\n\n".join(
+        f"<!-- page {i + 1} -->\n\n{t}" for i, t in enumerate(texts) if t
+    )
+    excerpt = content[:META_TEXT_CHARS]
+    meta = cache.generate(
+        model, TEXT_META_PROMPT.format(text=excerpt), schema=ScrapedContent, generation_config=json_config,
+        parse=ScrapedContent.model_validate_json,
+    )
+    return IngestResult(meta, content, pages=n, vision_pages=bad, mode="tiered" if bad else "local")
+
+
+# --- BATCH INGEST ---
+STAGING_DIR = ".cache/ingest"
+
+
+def gemini_upload(data):
+    """Upload PDF bytes to Gemini via a temp file and return the file handle."""
+    import google.generativeai as genai
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        tmp.write(data)
+        tmp_path = tmp.name
+    try:
+        return genai.upload_file(tmp_path, mime_type="application/pdf")
+    finally:
+        pathlib.Path(tmp_path).unlink(missing_ok=True)
+
+
+class RateLimitedModel:
+    """Spaces ``generate_content`` calls so parallel workers share one API budget."""
+
+    def __init__(self, model, per_minute):
+        self.model = model
+        self.model_name = getattr(model, "model_name", str(model))
+        self.limiter = RateLimiter(per_minute / 60.0)
+
+    def generate_content(self, *args, **kwargs):
+        self.limiter.wait()
+        return self.model.generate_content(*args, **kwargs)
+
+
+def stage_uploads(files, staging_dir=STAGING_DIR):
+    """Persist uploaded PDFs (or PDFs inside zips) to disk as queue items.
+
+    ``files`` are ``(name, bytes)`` pairs. Each PDF is stored under its
+    content hash, which doubles as the job's dedup key, so a refresh or a
+    repeated upload never loses or duplicates work.
+    """
+    root = pathlib.Path(staging_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    items = []
+
+    def stage(name, data):
+        digest = content_hash(data)
+        path = root / f"{digest}.pdf"
+        if not path.exists():
+            path.write_bytes(data)
+        items.append((name, {"path": str(path), "dedup_key": digest, "size": len(data)}))
+
+    for name, data in files:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(BytesIO(data)) as zf:
+                for info in zf.infolist():
+                    if info.filename.lower().endswith(".pdf") and not info.is_dir():
+                        stage(pathlib.PurePosixPath(info.filename).name, zf.read(info))
+        elif name.lower().endswith(".pdf"):
+            stage(name, data)
+    return items
+
+
+def make_ingest_handler(model, cache, upload=gemini_upload, dedup=None):
+    """Job handler for ``ingest_pdf`` queue items."""
+
+    def handle(job, ctx):
+        path = pathlib.Path(job["payload"]["path"])
+        if not path.exists():
+            raise PermanentError(f"Staged file {path.name} is gone; upload it again.")
+        data = path.read_bytes()
+        db = ctx.db
+        result = ingest_pdf(data, model, cache.bind(db), upload)
+        store = PaperStore(PaperRepository(db, job["project_id"], {}), dedup)
+        store.add(paper_row(result.meta, source_type="pdf"))
+        report = store.flush()
+        if not report.ok:
+            raise RuntimeError(report.failed[0][1])
+        # The transcript goes to paper_chunks, not the paper row; a duplicate
+        # merged into a paper that already has one keeps the existing chunks
+        paper_id = report.ids[0] if report.ids else None
+        chunks = 0
+        if paper_id and not (report.merged and chunk_counts(db, [paper_id])):
+            chunks = write_chunks(db, paper_id, chunk_transcript(result.content))
+        # Dedup on the content hash makes the staged copy redundant now
+        path.unlink(missing_ok=True)
+        return {
+            "paper_id": paper_id,
+            "merged": bool(report.merged),
+            "chunks": chunks,
+            "title": result.meta.title,
+            "pages": result.pages,
+            "vision_pages": len(result.vision_pages),
+            "mode": result.mode,
+        }
+
+    return handle
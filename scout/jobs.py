@@ -0,0 +1,298 @@
+"""Local job queue for work that outlives a Streamlit rerun.
+
+Jobs are rows in a SQLite file and run on a bounded thread pool owned by the
+process rather than by any script run, so a rerun or browser refresh only
+re-reads their state. On start-up, jobs left ``queued`` or ``running`` by a
+previous process are picked up again.
+
+Handlers are called as ``handler(job, ctx)``. They report progress through
+``ctx.progress`` and save resumable state with ``ctx.checkpoint``; a resumed
+or retried job sees its last checkpoint in ``job["checkpoint"]``. Failures
+are retried with exponential backoff unless the handler raises
+:class:`PermanentError`.
+
+Each job records who submitted it (``owner_id``) and their access token,
+and ``ctx.db`` is the database client the queue's ``connect(job)`` builds
+from them, so work that runs later, is retried or is resumed by another
+process still acts for its submitter rather than for whoever signed in
+last. Access tokens are short-lived: a signed-in session passes its current
+one to :meth:`JobQueue.reauth` so its unfinished jobs can keep running, and
+a job's token is cleared when it settles.
+"""
+import json
+import pathlib
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from scout.telemetry import span
+
+ACTIVE = ("queued", "running", "cancelling")
+SETTLED = ("done", "failed", "skipped", "cancelled")
+JSON_COLUMNS = ("payload", "result", "progress", "checkpoint")
+
+COLUMNS = {
+    "id": "TEXT PRIMARY KEY", "batch_id": "TEXT", "kind": "TEXT", "project_id": "TEXT", "name": "TEXT",
+    "payload": "TEXT", "status": "TEXT", "message": "TEXT", "result": "TEXT",
+    "created": "REAL", "started": "REAL", "finished": "REAL",
+    "attempts": "INTEGER DEFAULT 0", "max_attempts": "INTEGER DEFAULT 3", "next_run": "REAL",
+    "progress": "TEXT", "checkpoint": "TEXT", "owner_id": "TEXT", "access_token": "TEXT",
+}
+
+
+class PermanentError(Exception):
+    """Raised by a handler to fail a job without retrying it."""
+
+
+class JobContext:
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.job = job
+        self.job_id = job["id"]
+        self._db = None
+
+    @property
+    def db(self):
+        """The submitter's database client, connected on first use."""
+        if self._db is None:
+            if self.queue.connect is None:
+                raise PermanentError("This queue has no database connection.")
+            self._db = self.queue.connect(self.job)
+        return self._db
+
+    def progress(self, done, total=None, note=""):
+        self.queue._exec(
+            "UPDATE jobs SET progress = ? WHERE id = ?",
+            (json.dumps({"done": done, "total": total, "note": note}), self.job_id),
+        )
+
+    def checkpoint(self, state):
+        self.queue._exec("UPDATE jobs SET checkpoint = ? WHERE id = ?", (json.dumps(state, default=str), self.job_id))
+
+    @property
+    def cancelled(self):
+        job = self.queue.job(self.job_id)
+        return job is None or job["status"] == "cancelling"
+
+
+class JobQueue:
+    def __init__(self, path=".cache/jobs.sqlite3", workers=3, max_attempts=3, backoff=5.0, connect=None):
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.connect = connect  # connect(job) -> database client acting for job["owner_id"] with job["access_token"]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS jobs ({', '.join(f'{c} {t}' for c, t in COLUMNS.items())})")
+        # Queue files from before retries/checkpoints gain the new columns in place
+        have = {r["name"] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+        for col, decl in COLUMNS.items():
+            if col not in have:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {col} {decl}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_batch ON jobs(batch_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_project ON jobs(project_id, created)")
+        self._conn.commit()
+        self.handlers = {}
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+
+    def register(self, kind, handler):
+        """``handler(job, ctx)`` receives the job dict and returns a JSON-able result."""
+        self.handlers[kind] = handler
+
+    # --- STATE ---
+    def _exec(self, sql, args=()):
+        with self._lock:
+            cur = self._conn.execute(sql, args)
+            self._conn.commit()
+            return cur
+
+    def _rows(self, sql, args=()):
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        out = []
+        for r in rows:
+            job = dict(r)
+            for col in JSON_COLUMNS:
+                job[col] = json.loads(job[col]) if job[col] else None
+            job["payload"] = job["payload"] or {}
+            out.append(job)
+        return out
+
+    def job(self, job_id):
+        rows = self._rows("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def batch(self, batch_id):
+        return self._rows("SELECT * FROM jobs WHERE batch_id = ? ORDER BY created, name", (batch_id,))
+
+    def recent_batches(self, project_id, limit=5, kind=None):
+        sql = "SELECT batch_id, MIN(created) AS created FROM jobs WHERE project_id = ?"
+        args = [project_id]
+        if kind:
+            sql += " AND kind = ?"
+            args.append(kind)
+        with self._lock:
+            rows = self._conn.execute(sql + " GROUP BY batch_id ORDER BY created DESC LIMIT ?", (*args, limit)).fetchall()
+        return [r["batch_id"] for r in rows]
+
+    def find(self, kind, project_id, dedup_key, statuses):
+        marks = ", ".join("?" * len(statuses))
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT status FROM jobs WHERE kind = ? AND project_id = ? AND status IN ({marks}) AND json_extract(payload, '$.dedup_key') = ? LIMIT 1",
+                (kind, project_id, *statuses, dedup_key),
+            ).fetchone()
+        return row["status"] if row else None
+
+    # --- SCHEDULING ---
+    def submit(self, kind, project_id, items, batch_id=None, max_attempts=None, owner_id=None, access_token=None):
+        """Queue ``(name, payload)`` items as one batch, run for ``owner_id``, and return its id.
+
+        Items whose ``payload["dedup_key"]`` already completed, or is still in
+        flight, for this project are recorded as ``skipped`` instead of
+        running again, which makes resubmitting a batch idempotent.
+        """
+        batch_id = batch_id or uuid.uuid4().hex
+        now = time.time()
+        queued = []
+        for name, payload in items:
+            job_id = uuid.uuid4().hex
+            key = payload.get("dedup_key")
+            prior = key is not None and self.find(kind, project_id, key, ("done", *ACTIVE))
+            message = ("Already done" if prior == "done" else "Already queued") if prior else ""
+            self._exec(
+                "INSERT INTO jobs (id, batch_id, kind, project_id, name, payload, status, message, created, attempts, max_attempts, owner_id, access_token) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, batch_id, kind, project_id, name, json.dumps(payload), "skipped" if prior else "queued",
+                 message, now, max_attempts or self.max_attempts, owner_id, None if prior else access_token),
+            )
+            if not prior:
+                queued.append(job_id)
+        for job_id in queued:
+            self.pool.submit(self._run, job_id)
+        return batch_id
+
+    def reauth(self, owner_id, access_token):
+        """Hand a user's current access token to their unfinished (or retryable) jobs."""
+        return self._exec(
+            "UPDATE jobs SET access_token = ? WHERE owner_id = ? AND status NOT IN ('done', 'skipped') AND access_token IS NOT ?",
+            (access_token, owner_id, access_token),
+        ).rowcount
+
+    def resume(self):
+        """Re-queue work a previous process left unfinished."""
+        self._exec("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'")
+        self._exec("UPDATE jobs SET status = 'cancelled', finished = ? WHERE status = 'cancelling'", (time.time(),))
+        with self._lock:
+            rows = self._conn.execute("SELECT id, next_run FROM jobs WHERE status = 'queued' ORDER BY created").fetchall()
+        for r in rows:
+            self._schedule(r["id"], (r["next_run"] or 0) - time.time())
+        return len(rows)
+
+    def retry(self, batch_id):
+        """Run a batch's failed and cancelled jobs again with a fresh attempt budget."""
+        with self._lock:
+            ids = [r["id"] for r in self._conn.execute(
+                "SELECT id FROM jobs WHERE batch_id = ? AND status IN ('failed', 'cancelled')", (batch_id,)
+            ).fetchall()]
+        for job_id in ids:
+            self._exec("UPDATE jobs SET status = 'queued', attempts = 0, next_run = NULL, message = '' WHERE id = ?", (job_id,))
+            self.pool.submit(self._run, job_id)
+        return len(ids)
+
+    def cancel(self, batch_id):
+        """Drop queued jobs and ask running ones to stop at their next check."""
+        now = time.time()
+        self._exec("UPDATE jobs SET status = 'cancelled', finished = ? WHERE batch_id = ? AND status = 'queued'", (now, batch_id))
+        self._exec("UPDATE jobs SET status = 'cancelling' WHERE batch_id = ? AND status = 'running'", (batch_id,))
+
+    def wait(self, batch_id, poll=1.0, on_update=None):
+        """Block until every job in the batch has settled (for headless callers)."""
+        while True:
+            batch = self.batch(batch_id)
+            if on_update:
+                on_update(batch)
+            if not any(j["status"] in ACTIVE for j in batch):
+                return batch
+            time.sleep(poll)
+
+    def _schedule(self, job_id, delay):
+        if delay > 0:
+            timer = threading.Timer(delay, self.pool.submit, (self._run, job_id))
+            timer.daemon = True
+            timer.start()
+        else:
+            self.pool.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        job = self.job(job_id)
+        if job is None or job["status"] != "queued":
+            return
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self._exec("UPDATE jobs SET status = 'failed', message = ?, finished = ? WHERE id = ? AND status = 'queued'", (f"No handler for {job['kind']}", time.time(), job_id))
+            return
+        attempt = job["attempts"] + 1
+        # The same job can be submitted twice (a backoff timer plus resume or retry); only one claim wins
+        claimed = self._exec(
+            "UPDATE jobs SET status = 'running', attempts = ?, started = COALESCE(started, ?) WHERE id = ? AND status = 'queued' AND attempts = ?",
+            (attempt, time.time(), job_id, job["attempts"]),
+        ).rowcount
+        if claimed != 1:
+            return
+        job["attempts"] = attempt
+        ctx = JobContext(self, job)
+        try:
+            with span(f"job.{job['kind']}", attempt=attempt):
+                result = handler(job, ctx)
+        except Exception as e:
+            if ctx.cancelled:
+                self._finish(job_id, "cancelled", message=str(e))
+                return
+            if isinstance(e, PermanentError) or attempt >= job["max_attempts"]:
+                self._finish(job_id, "failed", message=str(e))
+                return
+            # Jittered exponential backoff; the checkpoint carries over to the next attempt
+            delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+            self._exec(
+                "UPDATE jobs SET status = 'queued', next_run = ?, message = ? WHERE id = ?",
+                (time.time() + delay, f"Attempt {attempt}/{job['max_attempts']} failed, retrying in {delay:.0f}s: {e}", job_id),
+            )
+            self._schedule(job_id, delay)
+            return
+        self._finish(job_id, "cancelled" if ctx.cancelled else "done", result=result)
+
+    def _finish(self, job_id, status, message="", result=None):
+        self._exec(
+            "UPDATE jobs SET status = ?, message = ?, result = ?, finished = ?, access_token = NULL WHERE id = ?",
+            (status, message, json.dumps(result, default=str) if result is not None else None, time.time(), job_id),
+        )
+
+
+def batch_stats(jobs):
+    """Counts plus throughput (items/min) for one batch."""
+    counts = {s: 0 for s in (*ACTIVE, *SETTLED)}
+    for j in jobs:
+        counts[j["status"]] = counts.get(j["status"], 0) + 1
+    started = [j["started"] for j in jobs if j["started"]]
+    finished = [j["finished"] for j in jobs if j["finished"] and j["status"] == "done"]
+    per_min = 0.0
+    if started and finished:
+        span = max(max(finished) - min(started), 1e-6)
+        per_min = len(finished) * 60 / span
+    total = len(jobs)
+    settled = sum(counts[s] for s in SETTLED)
+    return {**counts, "total": total, "settled": settled, "active": total - settled, "per_min": per_min}
+
+
+def batch_fraction(jobs):
+    """0..1 completion, using in-job progress for batches of one long job."""
+    if len(jobs) == 1 and jobs[0]["status"] in ACTIVE:
+        p = jobs[0]["progress"] or {}
+        return min(p["done"] / p["total"], 1.0) if p.get("total") else 0.0
+    stats = batch_stats(jobs)
+    return stats["settled"] / stats["total"] if stats["total"] else 0.0
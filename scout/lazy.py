@@ -0,0 +1,40 @@
+"""Deferred construction for heavy API clients.
+
+SDKs such as ``google.generativeai`` and ``firecrawl`` cost the better part
+of a second to import, and building their clients can touch the network.
+``LazyClient`` stands in for the real object and only runs the factory (and
+therefore the import) the first time an attribute the caller didn't supply
+up front is used, so a process that never scrapes never loads Firecrawl.
+"""
+import threading
+
+
+class LazyClient:
+    """Builds ``factory()`` on first use, once, then delegates to it.
+
+    Keyword arguments are answered without building the client; pass
+    whatever callers read eagerly (e.g. ``model_name`` for cache keys).
+    """
+
+    def __init__(self, factory, **known):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+        self.__dict__.update(known)
+
+    @property
+    def loaded(self):
+        return self._client is not None
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set on the proxy itself
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
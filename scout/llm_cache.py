@@ -0,0 +1,232 @@
+"""Content-addressed cache for Gemini (and Firecrawl) calls.
+
+Keys hash the model name, the prompt parts (raw bytes are reduced to their
+SHA-256, so a re-uploaded PDF maps to the same key), the response schema and
+the generation config. Values live in a pluggable backend: a local SQLite
+file by default, or a Supabase table. Both evict least-recently-used entries
+once a size bound is exceeded.
+
+Only replies that pass the caller's ``parse`` (e.g. a JSON schema's
+validator) are stored, and a stored value that stops parsing is dropped, so
+a truncated reply is retried instead of being served forever.
+"""
+import hashlib
+import itertools
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+
+from scout.telemetry import cache_event
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _utc_iso(ts):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+def _schema_fingerprint(schema):
+    if schema is None:
+        return None
+    if hasattr(schema, "model_json_schema"):
+        return schema.model_json_schema()
+    return schema
+
+
+def cache_key(model, parts, schema=None, config=None):
+    """Stable key for one call. ``parts`` may mix text, bytes and hashes."""
+    if isinstance(parts, (str, bytes)):
+        parts = [parts]
+    payload = {
+        "model": getattr(model, "model_name", model),
+        "parts": [f"sha256:{content_hash(p)}" if isinstance(p, bytes) else p for p in parts],
+        "schema": _schema_fingerprint(schema),
+        "config": {k: v for k, v in (config or {}).items() if k != "response_schema"},
+    }
+    return content_hash(json.dumps(payload, sort_keys=True, default=str))
+
+
+class SQLiteBackend:
+    def __init__(self, path=".cache/llm_cache.sqlite3", max_bytes=256 * 1024 * 1024):
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, size INTEGER, created REAL, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        self._conn.commit()
+
+    def get(self, key, max_age=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (max_age and row[1] < time.time() - max_age):
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if freed >= excess:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            freed += size
+
+    def stats(self):
+        with self._lock:
+            n, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": n, "bytes": size}
+
+
+class SupabaseBackend:
+    """Stores entries in the ``llm_cache`` table (see migration_llm_cache.sql)."""
+
+    def __init__(self, db, max_rows=5000, table="llm_cache"):
+        self.db = db
+        self.table = table
+        self.max_rows = max_rows
+        self._writes = itertools.count(1)
+
+    def bind(self, db):
+        """The same table through another client (a job's), so entries belong to its user."""
+        bound = SupabaseBackend(db, self.max_rows, self.table)
+        bound._writes = self._writes
+        return bound
+
+    def get(self, key, max_age=None):
+        q = self.db.table(self.table).select("value,created_at").eq("key", key)
+        if max_age:
+            q = q.gt("created_at", _utc_iso(time.time() - max_age))
+        rows = q.limit(1).execute().data
+        if not rows:
+            return None
+        self.db.table(self.table).update({"accessed_at": _utc_iso(time.time())}).eq("key", key).execute()
+        return rows[0]["value"]
+
+    def set(self, key, value):
+        self.db.table(self.table).upsert({"key": key, "value": value, "size": len(value)}, on_conflict="owner_id,key").execute()
+        # Trim occasionally rather than on every write
+        if next(self._writes) % 50 == 0:
+            stale = (
+                self.db.table(self.table).select("key").order("accessed_at", desc=True)
+                .range(self.max_rows, self.max_rows + 999).execute().data or []
+            )
+            if stale:
+                self.db.table(self.table).delete().in_("key", [r["key"] for r in stale]).execute()
+
+    def delete(self, key):
+        self.db.table(self.table).delete().eq("key", key).execute()
+
+    def stats(self):
+        res = self.db.table(self.table).select("key", count="exact").limit(1).execute()
+        return {"entries": res.count or 0}
+
+
+class LLMCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.parent = None  # the cache this one was bound from; its counts include ours
+
+    def bind(self, db):
+        """This cache as ``db``'s user sees it.
+
+        A Supabase backend is rebuilt on ``db`` (a background job's client,
+        see ``Services.job_client``) so reads and writes stay within that
+        user's rows; local backends are shared as they are.
+        """
+        rebind = getattr(self.backend, "bind", None)
+        if rebind is None:
+            return self
+        bound = LLMCache(rebind(db))
+        bound.parent = self
+        return bound
+
+    def _tally(self, hit):
+        cache = self
+        while cache is not None:
+            if hit:
+                cache.hits += 1
+            else:
+                cache.misses += 1
+            cache = cache.parent
+
+    def get_or_call(self, key, fn, max_age=None, parse=None):
+        """Return the cached text for ``key`` or compute, store and return it.
+
+        With ``parse``, its result is returned instead, and text it rejects
+        is neither stored nor served: the error reaches the caller (and the
+        job queue's retries make a fresh call).
+        """
+        cached = self.backend.get(key, max_age)
+        if cached is not None and parse is not None:
+            try:
+                parsed = parse(cached)
+            except Exception:
+                # Stored before it was checked; drop it and call again
+                self.backend.delete(key)
+                cached = None
+        cache_event("llm", hits=cached is not None, misses=cached is None)
+        self._tally(cached is not None)
+        if cached is not None:
+            return parsed if parse is not None else cached
+        value = fn()
+        parsed = parse(value) if parse is not None else value
+        if value:
+            self.backend.set(key, value)
+        return parsed
+
+    def generate(self, model, prompt, schema=None, generation_config=None, parts_key=None, parse=None):
+        """Cached ``model.generate_content(...).text``, or ``parse`` of it.
+
+        ``prompt`` may be a callable building the contents, so expensive
+        steps such as uploading a file only run on a miss; ``parts_key`` then
+        says what to hash instead (e.g. the PDF's content hash).
+        """
+        config = dict(generation_config or {})
+        if schema is not None:
+            config["response_schema"] = schema
+        key = cache_key(model, parts_key if parts_key is not None else prompt, schema, config)
+
+        def call():
+            contents = prompt() if callable(prompt) else prompt
+            return model.generate_content(contents, generation_config=config or None).text
+
+        return self.get_or_call(key, call, parse=parse)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate, **self.backend.stats()}
@@ -0,0 +1,110 @@
+"""Server-side queries for the Research Archive.
+
+The Citation Matrix only ever holds one page: filters, full-text search,
+sorting and ``range`` run in PostgREST, and only the columns the editor shows
+are selected. Search uses ``websearch_to_tsquery`` against the stored
+``search_tsv`` column (title, abstract and any unchunked transcript;
+GIN-indexed); passages inside chunked transcripts are matched separately by
+the ``match_chunks`` RPC. Status counts and top-cited papers come from the
+RPC functions in migration_performance_pack.sql. Results are memoized in the repository cache
+per library version, so reruns that don't touch the archive cost no round
+trip.
+"""
+from dataclasses import astuple, dataclass
+
+from scout.telemetry import cache_event
+
+MATRIX_COLUMNS = ["id", "title", "reading_status", "tags", "year", "citation_count", "source_type"]
+STATUSES = ["Unread", "Reading", "Synthesized"]
+SOURCES = ["scout", "pdf", "web", "snowball-mining"]
+SORTS = {
+    "Newest": ("created_at", True),
+    "Oldest": ("created_at", False),
+    "Year (newest)": ("year", True),
+    "Year (oldest)": ("year", False),
+    "Most cited": ("citation_count", True),
+    "Title": ("title", False),
+}
+PAGE_MEMO = 16
+
+
+@dataclass(frozen=True)
+class MatrixQuery:
+    page: int = 0
+    page_size: int = 50
+    sort: str = "Newest"
+    statuses: tuple = ()
+    sources: tuple = ()
+    tags: tuple = ()
+    year_min: int = None
+    year_max: int = None
+    search: str = ""
+
+
+def build_request(db, project_id, q):
+    req = db.table("papers").select(",".join(MATRIX_COLUMNS), count="exact").eq("project_id", project_id)
+    if q.statuses:
+        req = req.in_("reading_status", list(q.statuses))
+    if q.sources:
+        req = req.in_("source_type", list(q.sources))
+    if q.tags:
+        req = req.overlaps("tags", list(q.tags))
+    if q.year_min is not None:
+        req = req.gte("year", q.year_min)
+    if q.year_max is not None:
+        req = req.lte("year", q.year_max)
+    if q.search.strip():
+        req = req.filter("search_tsv", "wfts(english)", q.search.strip())
+    col, desc = SORTS[q.sort]
+    # Tie-break on id so pages don't shuffle rows between requests
+    req = req.order(col, desc=desc, nullsfirst=False).order("id")
+    start = q.page * q.page_size
+    return req.range(start, start + q.page_size - 1)
+
+
+def _memo(repo):
+    state = repo.cache.setdefault(f"matrix::{repo.project_id}", {"version": -1, "pages": {}})
+    if state["version"] != repo.version:
+        state["version"], state["pages"] = repo.version, {}
+    return state["pages"]
+
+
+def _remember(memo, key, fn):
+    cache_event("matrix", hits=key in memo, misses=key not in memo)
+    if key not in memo:
+        if len(memo) >= PAGE_MEMO:
+            memo.pop(next(iter(memo)))
+        memo[key] = fn()
+    return memo[key]
+
+
+def fetch_page(repo, q):
+    """Return ``(rows, total)`` for one page of the matrix."""
+    def fetch():
+        res = build_request(repo.db, repo.project_id, q).execute()
+        return res.data or [], res.count or 0
+
+    return _remember(_memo(repo), astuple(q), fetch)
+
+
+def status_counts(repo):
+    """``{reading_status: papers}`` via the ``paper_status_counts`` RPC."""
+    def fetch():
+        rows = repo.db.rpc("paper_status_counts", {"p_project_id": repo.project_id}).execute().data or []
+        return {r["reading_status"]: r["papers"] for r in rows}
+
+    return _remember(_memo(repo), ("status_counts",), fetch)
+
+
+def top_cited(repo, limit=10):
+    def fetch():
+        return repo.db.rpc("top_cited_papers", {"p_project_id": repo.project_id, "p_limit": limit}).execute().data or []
+
+    return _remember(_memo(repo), ("top_cited", limit), fetch)
+
+
+def passage_hits(repo, reader, search, limit=10):
+    """Transcript chunks matching ``search``, best first, with a highlighted snippet."""
+    if not search.strip():
+        return []
+    return _remember(_memo(repo), ("passages", search, limit), lambda: reader.search(repo.project_id, search, limit))
@@ -0,0 +1,28 @@
+"""Pydantic schemas for structured Gemini extraction."""
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class PaperAnalysis(BaseModel):
+    relevant: bool = Field(description="Is this paper highly relevant to the research query?")
+    summary: str = Field(description="2-sentence academic summary focusing on findings.")
+    methodology: str = Field(description="Primary research methodology used (e.g. Qualitative, Meta-analysis, Empirical).")
+
+class Metadata(BaseModel):
+    title: str = Field(description="Full academic title of the paper.")
+    authors: List[str] = Field(description="List of all contributing authors.")
+    year: Optional[int] = Field(description="Year of publication.")
+    abstract: str = Field(description="Concise abstract or summary.")
+
+class ScrapedContent(BaseModel):
+    title: str = Field(description="The clear title of the article or paper.")
+    author: str = Field(description="Name of the primary author or organization.")
+    publication_date: str = Field(description="Date of publication (YYYY-MM-DD) or 'n.d.'")
+    key_findings: List[str] = Field(description="List of 3-5 main takeaways or results.")
+    methodology: str = Field(description="Brief description of how the information was gathered (e.g., 'Opinion', 'Case Study', 'Review').")
+    summary: str = Field(description="A coherent paragraph summarizing the full content.")
+
+class SynthesisResponse(BaseModel):
+    answer: str
+    citations: List[str]
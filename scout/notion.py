@@ -0,0 +1,169 @@
+"""Incremental, rate-limited sync of the archive into a Notion database.
+
+Each paper remembers the page it was pushed to (``notion_page_id``) and a
+hash of the properties last sent (``notion_hash``), so a sync only creates
+pages for new papers and patches pages whose properties changed. Requests go
+through one pooled session and a shared limiter at Notion's ~3 requests per
+second, retrying 429s after their Retry-After. ``base_url`` may point at a
+local mock of the API.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import requests
+
+from scout.http import RateLimiter, pooled_session, request
+from scout.jobs import PermanentError
+from scout.llm_cache import content_hash
+from scout.repository import PaperRepository
+from scout.store import PaperStore
+
+NOTION_API = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+NOTION_RATE = 3.0
+WRITE_BATCH = 50
+
+
+def page_properties(p):
+    props = {
+        "Title": {"title": [{"text": {"content": p['title'][:2000]}}]},  # Limit title length
+        "Year": {"number": p['year']} if p.get('year') else None,
+        "Authors": {"rich_text": [{"text": {"content": ", ".join(p.get('authors') or [])[:2000]}}]},
+        "URL": {"url": p['url']} if p.get('url') else None,
+        "Status": {"select": {"name": p.get('reading_status') or 'Unread'}},  # Sync Status
+    }
+    # Clean None values
+    return {k: v for k, v in props.items() if v is not None}
+
+
+def properties_hash(database_id, props):
+    return content_hash(json.dumps({"database": database_id, "properties": props}, sort_keys=True))
+
+
+@dataclass
+class SyncPlan:
+    # (paper, properties, hash) triples
+    creates: list = field(default_factory=list)
+    updates: list = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def work(self):
+        return self.creates + self.updates
+
+
+def plan_sync(papers, database_id):
+    plan = SyncPlan()
+    for p in papers:
+        props = page_properties(p)
+        digest = properties_hash(database_id, props)
+        if not p.get("notion_page_id"):
+            plan.creates.append((p, props, digest))
+        elif p.get("notion_hash") != digest:
+            plan.updates.append((p, props, digest))
+        else:
+            plan.unchanged += 1
+    return plan
+
+
+def _gone(err):
+    """Deleted or archived pages are recreated rather than patched."""
+    res = err.response
+    return res is not None and (res.status_code == 404 or (res.status_code == 400 and "archived" in res.text))
+
+
+class NotionClient:
+    def __init__(self, token, base_url=NOTION_API, rate=NOTION_RATE, max_workers=3, timeout=30, session=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate)
+        self.session = session or pooled_session(max_workers, headers={
+            "Authorization": f"Bearer {token}", "Content-Type": "application/json", "Notion-Version": NOTION_VERSION,
+        })
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="notion")
+
+    def create_page(self, database_id, props):
+        res = request(
+            self.session, "POST", f"{self.base_url}/pages", limiter=self.limiter, timeout=self.timeout,
+            json={"parent": {"database_id": database_id}, "properties": props},
+        )
+        return res.json()["id"]
+
+    def update_page(self, page_id, props):
+        request(
+            self.session, "PATCH", f"{self.base_url}/pages/{page_id}", limiter=self.limiter, timeout=self.timeout,
+            json={"properties": props},
+        )
+        return page_id
+
+    def push(self, database_id, paper, props):
+        """Patch the paper's page, or create one; returns the page id."""
+        if paper.get("notion_page_id"):
+            try:
+                return self.update_page(paper["notion_page_id"], props)
+            except requests.HTTPError as e:
+                if not _gone(e):
+                    raise
+        return self.create_page(database_id, props)
+
+    def sync(self, database_id, plan, on_result, cancelled=None):
+        """Push a :func:`plan_sync` plan's new and changed papers.
+
+        ``on_result(paper, page_id, digest, error)`` is called on the calling
+        thread as each push settles.
+        """
+        futures = {self.pool.submit(self.push, database_id, p, props): (p, digest) for p, props, digest in plan.work}
+        for fut in as_completed(futures):
+            p, digest = futures[fut]
+            try:
+                page_id, error = fut.result(), None
+            except Exception as e:
+                page_id, error = None, e
+            on_result(p, page_id, digest, error)
+            if cancelled and cancelled():
+                for f in futures:
+                    f.cancel()
+
+
+def make_notion_handler(client, database_id):
+    """Job handler for ``notion_sync``.
+
+    Page ids and hashes are written back in batches as pushes settle, so a
+    retried or resumed sync neither duplicates pages nor resends them.
+    """
+
+    def handle(job, ctx):
+        if not (client and database_id):
+            raise PermanentError("Notion credentials missing in secrets.")
+        store = PaperStore(PaperRepository(ctx.db, job["project_id"], {}))
+        papers = store.repo.view("notion")
+        plan = plan_sync(papers, database_id)
+        total = len(plan.work)
+        counts = {"synced": 0, "failed": 0}
+        errors, unsaved = [], []
+
+        def on_result(paper, page_id, digest, error):
+            if error is not None:
+                counts["failed"] += 1
+                errors.append(f"{paper['title'][:20]}...: {error}")
+            else:
+                counts["synced"] += 1
+                store.update(paper["id"], {"notion_page_id": page_id, "notion_hash": digest})
+                if store.pending >= WRITE_BATCH:
+                    unsaved.extend(store.flush().failed)
+            ctx.progress(counts["synced"] + counts["failed"], total, f"{counts['synced']} synced, {counts['failed']} failed")
+
+        ctx.progress(0, total, f"{plan.unchanged} unchanged")
+        client.sync(database_id, plan, on_result, cancelled=lambda: ctx.cancelled)
+        unsaved.extend(store.flush().failed)
+        if unsaved:
+            raise RuntimeError(f"Synced pages not recorded: {unsaved[0][1]}")
+        if errors and not counts["synced"]:
+            raise RuntimeError(errors[0])
+        return {
+            "created": len(plan.creates), "updated": len(plan.updates), "unchanged": plan.unchanged,
+            **counts, "errors": errors[:5],
+        }
+
+    return handle
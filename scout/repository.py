@@ -0,0 +1,127 @@
+"""Project-scoped paper repository.
+
+One lightweight snapshot of a project's papers is loaded per rerun and kept in
+a caller-supplied cache (``st.session_state`` in the app) until a write
+invalidates it. Writes that return the rows they touched (``PaperStore``)
+fold them into the snapshot with :meth:`PaperRepository.apply` instead, so a
+long job flushing in batches never re-downloads the library. Each view asks
+for its own column projection, and heavy columns such as ``content_body`` are
+fetched lazily and only for the ids that need them.
+"""
+from scout.telemetry import cache_event
+
+# Columns each view actually renders or exports
+VIEW_COLUMNS = {
+    "archive": ["id", "title", "authors", "year", "abstract", "reading_status", "tags", "citation_count", "source_type", "created_at"],
+    "graph": ["id", "title", "authors", "citation_count"],
+    "handover": ["id", "title", "authors", "year", "abstract", "url", "doi", "reading_status", "impact_score", "source_type"],
+    "synthesis": ["id", "title", "authors", "year", "abstract", "revised_at"],
+    "identity": ["id", "title", "s2_paper_id", "doi", "year", "duplicate_of", "natural_key"],
+    "notion": ["id", "title", "authors", "year", "url", "reading_status", "notion_page_id", "notion_hash"],
+}
+
+# Snapshot columns: the union of every view, never the heavy transcripts
+LIGHT_COLUMNS = sorted({c for cols in VIEW_COLUMNS.values() for c in cols})
+HEAVY_COLUMNS = ("content_body",)
+
+# PostgREST puts `in.(...)` filters in the URL, so keep id batches modest
+ID_BATCH = 200
+# Under PostgREST's default max-rows (1000), which silently truncates larger replies
+PAGE_SIZE = 1000
+
+
+class PaperRepository:
+    def __init__(self, db, project_id, cache):
+        self.db = db
+        self.project_id = project_id
+        self.cache = cache
+        self._key = f"papers::{project_id}"
+        self._version_key = f"papers_version::{project_id}"
+
+    # --- READS ---
+    @property
+    def version(self):
+        """Monotonic library version, bumped on every write."""
+        return self.cache.get(self._version_key, 0)
+
+    def snapshot(self):
+        """Return the cached light rows, loading them once if missing."""
+        snap = self.cache.get(self._key)
+        cache_event("snapshot", hits=snap is not None, misses=snap is None)
+        if snap is None:
+            rows = self._load_rows()
+            snap = {"rows": rows, "by_id": {r["id"]: r for r in rows}, "bodies": {}}
+            self.cache[self._key] = snap
+        return snap["rows"]
+
+    def _load_rows(self):
+        # Page until a short page; ``id`` breaks created_at ties so pages can't overlap
+        rows = []
+        while True:
+            page = (
+                self.db.table("papers")
+                .select(",".join(LIGHT_COLUMNS))
+                .eq("project_id", self.project_id)
+                .order("created_at", desc=True)
+                .order("id")
+                .range(len(rows), len(rows) + PAGE_SIZE - 1)
+                .execute()
+                .data
+                or []
+            )
+            rows += page
+            if len(page) < PAGE_SIZE:
+                return rows
+
+    def rows_by_id(self):
+        """``{id: row}`` over the snapshot; kept current by :meth:`apply`."""
+        self.snapshot()
+        return self.cache[self._key]["by_id"]
+
+    def view(self, name):
+        """Project the snapshot down to the columns a view needs."""
+        cols = VIEW_COLUMNS[name]
+        return [{c: p.get(c) for c in cols} for p in self.snapshot()]
+
+    def content_bodies(self, paper_ids):
+        """Lazily fetch ``content_body`` for the given ids, caching the text."""
+        self.snapshot()
+        bodies = self.cache[self._key]["bodies"]
+        missing = [pid for pid in paper_ids if pid not in bodies]
+        for i in range(0, len(missing), ID_BATCH):
+            batch = missing[i:i + ID_BATCH]
+            res = self.db.table("papers").select("id,content_body").in_("id", batch).execute().data or []
+            for row in res:
+                bodies[row["id"]] = row.get("content_body") or ""
+            # Rows without a transcript still count as fetched
+            for pid in batch:
+                bodies.setdefault(pid, "")
+        return {pid: bodies[pid] for pid in paper_ids}
+
+    # --- WRITES ---
+    def apply(self, rows):
+        """Fold rows a write returned into the cached snapshot and bump the version."""
+        snap = self.cache.get(self._key)
+        if snap is not None:
+            new = []
+            for row in rows:
+                light = {c: row[c] for c in LIGHT_COLUMNS if c in row}
+                current = snap["by_id"].get(row["id"])
+                if current is None:
+                    snap["by_id"][row["id"]] = light
+                    new.append(light)
+                else:
+                    current.update(light)
+                if "content_body" in row:
+                    snap["bodies"][row["id"]] = row["content_body"] or ""
+            # Newest first, like the loaded snapshot
+            snap["rows"][:0] = new[::-1]
+        self.cache[self._version_key] = self.version + 1
+
+    def invalidate(self):
+        self.cache.pop(self._key, None)
+        self.cache[self._version_key] = self.version + 1
+
+    def delete_all(self):
+        self.db.table("papers").delete().eq("project_id", self.project_id).execute()
+        self.invalidate()
@@ -0,0 +1,298 @@
+"""Lexical retrieval for the synthesis pane.
+
+Papers enter the index as their stored transcript chunks (scout/chunks.py,
+labelled with section and page) plus their abstract in overlapping word
+windows, and are ranked with Okapi BM25. A chat turn then gets only the
+top-k passages, each still tagged with its ``[Author, Year]`` REF_CODE,
+instead of a dump of the whole project.
+
+:func:`plan_context` packs those passages into a token budget. Each
+passage's rendered size is counted once, with the local approximate
+tokenizer, when it enters the index, so a turn only touches its candidates.
+The budget is shared between papers in proportion to their relevance, and
+passages that repeat one already chosen (the same abstract stored twice,
+boilerplate) are dropped. When the next passage doesn't fit, it is cut at a
+sentence boundary rather than at a fixed character count.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from scout.chunks import NOISE_SECTIONS, approx_tokens
+from scout.telemetry import span
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were which with".split()
+)
+
+CHUNK_WORDS = 180
+CHUNK_OVERLAP = 30
+
+CONTEXT_TOKENS = 6000  # default synthesis context budget
+MAX_PASSAGES = 24
+CANDIDATES = 3  # passages ranked per passage packed, to leave room for dedup and quotas
+MIN_TRIM = 80  # leftover budget worth filling with a cut-down passage
+DUP_OVERLAP = 0.6  # share of a passage's 5-word shingles already among better-ranked ones
+SHINGLE = 5
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Split text into overlapping windows of ``size`` words."""
+    words = (text or "").split()
+    if not words:
+        return []
+    step = max(size - overlap, 1)
+    return [" ".join(words[i:i + size]) for i in range(0, max(len(words) - overlap, 1), step)]
+
+
+def ref_code(paper):
+    authors = paper.get("authors") or []
+    auth_str = authors[0] if authors else "Anon"
+    year = paper.get("year")
+    return f"[{auth_str}, {year if year else 'n.d.'}]"
+
+
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages = []               # (paper_id, ref_code, title, text, location) or None once removed
+        self.lengths = []
+        self.postings = defaultdict(dict)  # term -> {passage_idx: tf}
+        self.by_paper = defaultdict(list)
+        self.total_len = 0
+        self.live = 0
+        self.tokens = []                 # rendered size of each passage, counted once
+        self.total_tokens = 0            # what dumping the whole library would cost
+
+    def __contains__(self, paper_id):
+        return paper_id in self.by_paper
+
+    def add_paper(self, paper, body=None, chunks=()):
+        """Index a paper's abstract plus its transcript.
+
+        ``chunks`` are stored ``(text, location)`` pairs; a raw ``body`` is
+        windowed here instead.
+        """
+        pid = paper["id"]
+        if pid in self.by_paper:
+            self.remove_paper(pid)
+        code, title = ref_code(paper), paper.get("title") or "Untitled"
+        passages = [(t, "Abstract") for t in chunk_text(paper.get("abstract"))]
+        passages += [(t, "") for t in chunk_text(body)] + list(chunks)
+        for text, location in passages or [(title, "")]:
+            self._add_passage((pid, code, title, text, location))
+
+    def _add_passage(self, passage):
+        pid, code, title, text, location = passage
+        terms = Counter(tokenize(title + " " + text))
+        idx = len(self.passages)
+        self.passages.append(passage)
+        self.lengths.append(sum(terms.values()))
+        for term, tf in terms.items():
+            self.postings[term][idx] = tf
+        self.by_paper[pid].append(idx)
+        self.total_len += self.lengths[idx]
+        self.live += 1
+        self.tokens.append(block_tokens(code, title, location) + approx_tokens(text))
+        self.total_tokens += self.tokens[idx]
+
+    def remove_paper(self, paper_id):
+        for idx in self.by_paper.pop(paper_id, []):
+            self.passages[idx] = None
+            self.total_len -= self.lengths[idx]
+            self.live -= 1
+            self.total_tokens -= self.tokens[idx]
+        # Dead passages are skipped at query time; rebuild once they dominate
+        if len(self.passages) > 2 * self.live:
+            survivors = [p for p in self.passages if p is not None]
+            self.__init__(self.k1, self.b)
+            for passage in survivors:
+                self._add_passage(passage)
+
+    def search(self, query, k=12):
+        """Return the top-k (score, passage) pairs for a query."""
+        return [(score, self.passages[idx]) for idx, score in self.rank(query, k)]
+
+    def rank(self, query, k=12):
+        """Top-k ``(passage_idx, score)`` pairs, best first."""
+        if not self.live:
+            return []
+        avg_len = self.total_len / self.live
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (self.live - len(posting) + 0.5) / (len(posting) + 0.5))
+            for idx, tf in posting.items():
+                if self.passages[idx] is None:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[idx] / avg_len)
+                scores[idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+
+
+# --- CONTEXT PLANNING ---
+def block_tokens(code, title, location=""):
+    """Tokens ``format_context`` spends on a passage besides its text."""
+    return approx_tokens(_block(code, title, "", location)) + 1  # + the joining newline
+
+
+def trim_to_tokens(text, budget):
+    """Longest prefix of ``text`` within ``budget`` tokens, cut after a sentence where possible."""
+    out, used = [], 0
+    for sentence in _SENTENCE_END.split(text):
+        cost = approx_tokens(sentence)
+        if used + cost > budget:
+            if not out:
+                # A single oversized sentence: fall back to whole words
+                for word in sentence.split():
+                    cost = approx_tokens(word)
+                    if used + cost > budget:
+                        break
+                    out.append(word)
+                    used += cost
+            break
+        out.append(sentence)
+        used += cost
+    return " ".join(out) + " …" if out else ""
+
+
+def _shingles(text):
+    words = tokenize(text)
+    return {hash(tuple(words[i:i + SHINGLE])) for i in range(max(len(words) - SHINGLE + 1, 1))}
+
+
+@dataclass
+class ContextPlan:
+    budget: int
+    passages: list = field(default_factory=list)  # (score, passage), best first
+    tokens: int = 0
+    candidates: int = 0
+    duplicates: int = 0
+    trimmed: int = 0
+    papers: int = 0
+    library_tokens: int = 0
+
+
+def plan_context(index, query, budget=CONTEXT_TOKENS, max_passages=MAX_PASSAGES):
+    """Choose and size the passages for one turn within ``budget`` tokens.
+
+    Each candidate paper's share of the budget is proportional to its summed
+    BM25 score. A first pass fills every paper up to its share in rank
+    order, and a second pass spends what short papers left unused on the
+    next-best passages. Only the ranked candidates are examined.
+    """
+    plan = ContextPlan(budget=budget, library_tokens=index.total_tokens)
+    ranked = index.rank(query, k=max_passages * CANDIDATES)
+    plan.candidates = len(ranked)
+
+    kept, seen = [], set()
+    for idx, score in ranked:
+        shingles = _shingles(index.passages[idx][3])
+        if len(shingles & seen) >= DUP_OVERLAP * len(shingles):
+            plan.duplicates += 1
+            continue
+        seen |= shingles
+        kept.append((idx, score))
+
+    relevance = Counter()
+    for idx, score in kept:
+        relevance[index.passages[idx][0]] += score
+    total = sum(relevance.values()) or 1.0
+    share = {pid: budget * r / total for pid, r in relevance.items()}
+
+    chosen, spent = {}, Counter()
+    for first_pass in (True, False):
+        for idx, score in kept:
+            if idx in chosen or len(chosen) >= max_passages:
+                continue
+            pid, cost = index.passages[idx][0], index.tokens[idx]
+            if plan.tokens + cost > budget or (first_pass and spent[pid] + cost > share[pid]):
+                continue
+            chosen[idx] = (score, index.passages[idx])
+            spent[pid] += cost
+            plan.tokens += cost
+
+    # Fill a worthwhile remainder with the best passage that didn't fit, cut to size
+    left = budget - plan.tokens
+    if left >= MIN_TRIM and len(chosen) < max_passages:
+        for idx, score in kept:
+            if idx in chosen:
+                continue
+            pid, code, title, text, where = index.passages[idx]
+            cut = trim_to_tokens(text, left - block_tokens(code, title, where) - 1)  # - the ellipsis
+            if cut:
+                chosen[idx] = (score, (pid, code, title, cut, where))
+                plan.tokens += block_tokens(code, title, where) + approx_tokens(cut)
+                plan.trimmed += 1
+            break
+
+    plan.passages = sorted(chosen.values(), key=lambda sp: sp[0], reverse=True)
+    plan.papers = len({p[0] for _, p in plan.passages})
+    return plan
+
+
+def format_context(passages):
+    """Render passages in the CONTEXT LIBRARY layout the synthesis prompt expects."""
+    return "\n".join(_block(code, title, text, where) for _, (_, code, title, text, where) in passages)
+
+
+def _block(code, title, text, location):
+    where = f"\nSECTION: {location}" if location else ""
+    return f"---\nREF_CODE: {code}\nTITLE: {title}{where}\nCONTENT: {text}\n---"
+
+
+def location(chunk):
+    """``Methods, p. 4`` for a chunk manifest row."""
+    page = f"p. {chunk['page']}" if chunk.get("page") else ""
+    return ", ".join(x for x in (chunk.get("section") or "", page) if x)
+
+
+def project_index(repo, chunks):
+    """Return the project's BM25 index, synced with the current snapshot.
+
+    The index lives in the repository cache and survives invalidation; only
+    papers added since the last sync, or whose ``revised_at`` moved (an edit,
+    a merge, re-written chunks), are (re)indexed, and deleted papers are
+    dropped. ``chunks`` is a ``ChunkReader``: their manifests come first,
+    then only the text of the chunks worth indexing (reference lists are
+    skipped), mostly from the local chunk cache. A legacy paper whose
+    transcript is still in ``content_body`` (not yet converted by
+    ``backfill-chunks``) is indexed from that text; nothing is written.
+    """
+    state = repo.cache.setdefault(f"rag_index::{repo.project_id}", {"index": BM25Index(), "version": -1, "revisions": {}})
+    index, revisions = state["index"], state["revisions"]
+    if state["version"] != repo.version:
+        with span("retrieval.sync") as sp:
+            papers = {p["id"]: p for p in repo.view("synthesis")}
+            for pid in [pid for pid in index.by_paper if pid not in papers]:
+                index.remove_paper(pid)
+                revisions.pop(pid, None)
+            stale = [pid for pid, p in papers.items() if pid not in index or revisions.get(pid) != p.get("revised_at")]
+            manifest = chunks.manifest(stale) if stale else {}
+            legacy = [pid for pid, rows in manifest.items() if not rows]
+            bodies = repo.content_bodies(legacy) if legacy else {}
+            wanted = {
+                c["id"]: c for pid in stale for c in manifest.get(pid) or []
+                if (c.get("section") or "").lower() not in NOISE_SECTIONS
+            }
+            texts = chunks.texts(list(wanted)) if wanted else {}
+            for pid in stale:
+                index.add_paper(papers[pid], body=bodies.get(pid), chunks=[
+                    (texts[c["id"]], location(c)) for c in manifest.get(pid) or [] if c["id"] in wanted and c["id"] in texts
+                ])
+                revisions[pid] = papers[pid].get("revised_at")
+            sp.set(rows=len(stale))
+        state["version"] = repo.version
+    return index
+
@@ -0,0 +1,52 @@
+"""Scrape URL: Firecrawl markdown plus a validated Gemini extraction.
+
+Scrapes are cached for a week (pages change), the extraction by content hash
+like every other model call.
+"""
+from scout.ingest import paper_row
+from scout.jobs import PermanentError
+from scout.llm_cache import cache_key
+from scout.models import ScrapedContent
+from scout.repository import PaperRepository
+from scout.store import PaperStore
+
+SCRAPE_MAX_AGE = 7 * 86400
+EXTRACT_PROMPT = "Analyze this web content and extract strict metadata: {text}"
+EXTRACT_CHARS = 8000
+
+
+def scrape_markdown(firecrawl, url, cache):
+    def scrape():
+        md = firecrawl.scrape_url(url, params={'formats': ['markdown']}).get('markdown', '')
+        if not md:
+            raise PermanentError("No markdown content returned.")
+        return md
+
+    return cache.get_or_call(cache_key("firecrawl", ["scrape", url]), scrape, max_age=SCRAPE_MAX_AGE)
+
+
+def extract(md, model, cache):
+    return cache.generate(
+        model, EXTRACT_PROMPT.format(text=md[:EXTRACT_CHARS]), schema=ScrapedContent,
+        generation_config={"response_mime_type": "application/json"}, parse=ScrapedContent.model_validate_json,
+    )
+
+
+def make_scrape_handler(firecrawl, model, cache, dedup=None):
+    """Job handler for ``scrape_url`` items (payload ``{"url"}``)."""
+
+    def handle(job, ctx):
+        url = job["payload"]["url"]
+        scoped = cache.bind(ctx.db)
+        ctx.progress(0, 2, "Scraping")
+        md = scrape_markdown(firecrawl, url, scoped)
+        ctx.progress(1, 2, "Extracting metadata")
+        meta = extract(md, model, scoped)
+        store = PaperStore(PaperRepository(ctx.db, job["project_id"], {}), dedup)
+        store.add(paper_row(meta, url=url, source_type="web"))
+        report = store.flush()
+        if not report.ok:
+            raise RuntimeError(report.failed[0][1])
+        return {"paper_id": report.ids[0] if report.ids else None, "title": meta.title, "merged": bool(report.merged)}
+
+    return handle
@@ -0,0 +1,163 @@
+"""Scholarly search client.
+
+A single pooled ``requests.Session`` is shared by every search; the academic
+(Semantic Scholar) and grey-literature (DuckDuckGo) sources fan out on a
+thread pool, and whole responses are kept in a TTL+LRU cache keyed on the
+normalized query. Point ``base_url`` at a local stub server to test it.
+Source calls run in the caller's context, so their spans count toward the
+rerun that asked.
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from scout.http import pooled_session
+from scout.telemetry import cache_event, span
+
+S2_API = "https://api.semanticscholar.org/graph/v1"
+SEARCH_FIELDS = "title,authors,year,abstract,url,externalIds,citationCount"
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=256, ttl=900):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def normalize_query(term):
+    return " ".join(term.lower().split())
+
+
+def ddg_pdf_search(term, max_results=5):
+    """Grey-literature source: PDF hits from DuckDuckGo."""
+    from duckduckgo_search import DDGS
+
+    with span("ddg.search") as s, DDGS() as ddgs:
+        results = [
+            {"title": dr['title'], "url": dr['href'], "abstract": dr['body'], "authors": [{"name": "Web Source"}], "year": datetime.now().year, "source_type": "grey"}
+            for dr in ddgs.text(f"{term} filetype:pdf", max_results=max_results)
+        ]
+        s.set(rows=len(results))
+        return results
+
+
+def merge_results(*result_lists):
+    """Concatenate result lists, dropping repeats of the same paper."""
+    seen, merged = set(), []
+    for results in result_lists:
+        for r in results:
+            key = r.get("paperId") or normalize_query(r.get("title") or "")
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(r)
+    return merged
+
+
+class ScholarClient:
+    def __init__(self, base_url=S2_API, grey_source=ddg_pdf_search, max_workers=6, timeout=10, cache_size=256, cache_ttl=900, session=None):
+        self.base_url = base_url.rstrip("/")
+        self.grey_source = grey_source
+        self.timeout = timeout
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.session = session or pooled_session(max_workers)
+        # Sources and whole queries get separate pools so a query waiting on
+        # its sources can never starve them of workers
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scholar-source")
+        self.query_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="scholar-query")
+
+    # --- SOURCES ---
+    def academic(self, term, limit=10):
+        with span("s2.search") as s:
+            res = self.session.get(
+                f"{self.base_url}/paper/search",
+                params={"query": term, "limit": limit, "fields": SEARCH_FIELDS},
+                timeout=self.timeout,
+            )
+            s.set(status=res.status_code, bytes=len(res.content))
+            res.raise_for_status()
+            return res.json().get("data", [])
+
+    # --- SEARCH ---
+    def search(self, term, grey_lit=False, on_warning=None):
+        """Search both sources in parallel; repeated queries come from cache.
+
+        ``on_warning`` is called on the caller's thread, so it may touch the UI.
+        """
+        key = (normalize_query(term), grey_lit)
+        cached = self.cache.get(key)
+        cache_event("search", hits=cached is not None, misses=cached is None)
+        if cached is not None:
+            return list(cached)
+
+        academic = self.pool.submit(contextvars.copy_context().run, self.academic, term)
+        grey = self.pool.submit(contextvars.copy_context().run, self.grey_source, term) if grey_lit and self.grey_source else None
+
+        warnings, complete = [], True
+        try:
+            results = academic.result()
+        except Exception:
+            results, complete = [], False
+        if grey is not None:
+            try:
+                results = results + grey.result()
+            except Exception as e:
+                complete = False
+                warnings.append(f"Grey Lit Warning: {e}")
+
+        # Only cache full answers so a transient failure is retried next time
+        if complete:
+            self.cache.set(key, results)
+        if on_warning:
+            for w in warnings:
+                on_warning(w)
+        return list(results)
+
+    def search_many(self, terms, grey_lit=False, on_warning=None):
+        """Run several searches concurrently, returning results in input order."""
+        futures = [self.query_pool.submit(contextvars.copy_context().run, self.search, t, grey_lit) for t in terms]
+        out = []
+        for f in futures:
+            try:
+                out.append(f.result())
+            except Exception as e:
+                out.append([])
+                if on_warning:
+                    on_warning(f"Search Warning: {e}")
+        return out
+
+    def prefetch(self, terms, grey_lit=False):
+        """Warm the cache in the background without waiting for results."""
+        for t in terms:
+            self.query_pool.submit(contextvars.copy_context().run, self.search, t, grey_lit)
@@ -0,0 +1,314 @@
+"""Service wiring shared by the Streamlit app and the command line.
+
+:class:`Services` builds every client from a settings mapping shaped like
+``.streamlit/secrets.toml`` (``st.secrets`` works as-is). Each client is
+built on first use and imported inside its property, so an export run never
+loads Gemini or Firecrawl, and the app's login screen pays only for Supabase.
+
+Background jobs don't use the shared client: its auth header belongs to
+whichever user last signed in. Each job gets its own client on its
+submitter's access token, so row-level security applies exactly as in the
+app. If that token has expired before the job runs and ``[supabase]
+service_key`` is set, an :class:`OwnedClient` on the service role stands in:
+it checks that the submitter owns the job's workspace and confines every
+query, write and RPC to their rows in it.
+"""
+import base64
+import json
+import os
+import pathlib
+import time
+from functools import cached_property
+
+from scout.lazy import LazyClient
+
+GEMINI_MODEL = "gemini-2.0-flash"
+SETTINGS_PATH = ".streamlit/secrets.toml"
+# Tables whose rows carry owner_id (DEFAULT auth.uid(), which is NULL for the service role)
+OWNED_TABLES = frozenset({"projects", "papers", "paper_chunks", "paper_edges", "llm_cache"})
+# A job token this close to expiry isn't worth starting a job on
+TOKEN_MARGIN = 60
+
+
+def load_settings(path=None):
+    """Read the secrets file (``$SCOUT_SETTINGS`` or ``.streamlit/secrets.toml``)."""
+    import tomllib
+
+    path = pathlib.Path(path or os.environ.get("SCOUT_SETTINGS", SETTINGS_PATH))
+    with path.open("rb") as f:
+        return tomllib.load(f)
+
+
+def token_expiry(access_token):
+    """The ``exp`` claim of a Supabase access token (unverified; only used to skip stale ones)."""
+    try:
+        payload = access_token.split(".")[1]
+        return float(json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return 0.0
+
+
+class _OwnedTable:
+    """One table as a single user's row-level security would show it: reads,
+    updates and deletes are filtered to their rows, and writes are stamped
+    with their ``owner_id`` and may only target the job's workspace."""
+
+    def __init__(self, builder, owner_id, project_id):
+        self._builder = builder
+        self._owner_id = owner_id
+        self._project_id = project_id
+
+    def _own(self, rows):
+        from scout.jobs import PermanentError
+
+        many = rows if isinstance(rows, list) else [rows]
+        if any(r.get("project_id") not in (None, self._project_id) for r in many):
+            raise PermanentError("A job tried to write outside its workspace.")
+        owned = [{**r, "owner_id": self._owner_id} for r in many]
+        return owned if isinstance(rows, list) else owned[0]
+
+    def select(self, *args, **kwargs):
+        return self._builder.select(*args, **kwargs).eq("owner_id", self._owner_id)
+
+    def update(self, *args, **kwargs):
+        return self._builder.update(*args, **kwargs).eq("owner_id", self._owner_id)
+
+    def delete(self, *args, **kwargs):
+        return self._builder.delete(*args, **kwargs).eq("owner_id", self._owner_id)
+
+    def insert(self, rows, *args, **kwargs):
+        return self._builder.insert(self._own(rows), *args, **kwargs)
+
+    def upsert(self, rows, *args, **kwargs):
+        return self._builder.upsert(self._own(rows), *args, **kwargs)
+
+
+class OwnedClient:
+    """A service-role client confined to one user's rows in one workspace.
+
+    Only tables that carry ``owner_id`` are reachable, and RPCs only with a
+    ``p_project_id`` of that workspace or a ``p_paper_id`` the user owns.
+    """
+
+    def __init__(self, client, owner_id, project_id):
+        self._client = client
+        self.owner_id = owner_id
+        self.project_id = project_id
+
+    def table(self, name):
+        from scout.jobs import PermanentError
+
+        if name not in OWNED_TABLES:
+            raise PermanentError(f"Background jobs can't reach the {name} table.")
+        return _OwnedTable(self._client.table(name), self.owner_id, self.project_id)
+
+    def rpc(self, fn, params=None, *args, **kwargs):
+        from scout.jobs import PermanentError
+
+        params = params or {}
+        if "p_project_id" in params and params["p_project_id"] != self.project_id:
+            raise PermanentError(f"A job called {fn} outside its workspace.")
+        if "p_paper_id" in params and not self.table("papers").select("id").eq("id", params["p_paper_id"]).execute().data:
+            raise PermanentError(f"A job called {fn} on a paper its submitter doesn't own.")
+        return self._client.rpc(fn, params, *args, **kwargs)
+
+
+class Services:
+    def __init__(self, settings, jobs_path=None):
+        self.settings = settings
+        self.jobs_path = jobs_path
+
+    def section(self, name):
+        return self.settings.get(name, {}) or {}
+
+    def start_telemetry(self):
+        """Apply ``[telemetry]``: with ``export_path`` set, every span is also written to that JSON-lines file."""
+        from scout.telemetry import telemetry
+
+        telemetry.configure(self.section("telemetry").get("export_path") or None)
+
+    # --- CLIENTS ---
+    @cached_property
+    def db(self):
+        from supabase import create_client
+
+        from scout.telemetry import TracedClient
+
+        conf = self.section("supabase")
+        return TracedClient(create_client(conf["url"], conf["key"]))
+
+    def user_client(self, access_token):
+        """A new client acting as the user ``access_token`` belongs to."""
+        from supabase import create_client
+
+        from scout.telemetry import TracedClient
+
+        conf = self.section("supabase")
+        client = create_client(conf["url"], conf["key"])
+        client.postgrest.auth(access_token)
+        return TracedClient(client)
+
+    @cached_property
+    def service_db(self):
+        """Service-role client; bypasses RLS, so only ever used through an ``OwnedClient`` in ``job_client``."""
+        from supabase import create_client
+
+        from scout.telemetry import TracedClient
+
+        conf = self.section("supabase")
+        return TracedClient(create_client(conf["url"], conf["service_key"])) if conf.get("service_key") else None
+
+    def job_client(self, job):
+        """The client a job runs with, acting for the user who queued it.
+
+        Their own access token while it is valid; after that the service role
+        through an :class:`OwnedClient`, if ``[supabase] service_key`` is set.
+        """
+        from scout.jobs import PermanentError
+
+        token = job.get("access_token")
+        if token and token_expiry(token) > time.time() + TOKEN_MARGIN:
+            return self.user_client(token)
+        if not job.get("owner_id"):
+            raise PermanentError("This job was queued without its submitter; submit it again.")
+        if self.service_db is None:
+            raise PermanentError("Your sign-in expired before this job ran; sign in again and retry it.")
+        rows = self.service_db.table("projects").select("owner_id").eq("id", job["project_id"]).execute().data
+        if not rows or rows[0]["owner_id"] != job["owner_id"]:
+            raise PermanentError("The workspace no longer belongs to the user who queued this job.")
+        return OwnedClient(self.service_db, job["owner_id"], job["project_id"])
+
+    @cached_property
+    def gemini(self):
+        key = self.section("google").get("api_key")
+
+        def connect():
+            import google.generativeai as genai
+
+            genai.configure(api_key=key)
+            return genai.GenerativeModel(GEMINI_MODEL)
+
+        from scout.telemetry import TracedModel
+
+        # The SDK loads on the first generate call; the name is all cache keys need
+        return TracedModel(LazyClient(connect, model_name=f"models/{GEMINI_MODEL}"))
+
+    @cached_property
+    def model(self):
+        """Gemini behind the shared rate limit, for background work."""
+        from scout.ingest import RateLimitedModel
+
+        return RateLimitedModel(self.gemini, per_minute=float(self.section("jobs").get("gemini_rpm", 15)))
+
+    @cached_property
+    def firecrawl(self):
+        key = self.section("firecrawl").get("api_key")
+        if not key:
+            return None
+
+        def connect():
+            from firecrawl import FirecrawlApp
+
+            return FirecrawlApp(api_key=key)
+
+        return LazyClient(connect)
+
+    @cached_property
+    def scholar(self):
+        from scout.search import ScholarClient
+
+        # Pooled session + response cache shared by every caller
+        return ScholarClient()
+
+    @cached_property
+    def s2_graph(self):
+        from scout.snowball import SemanticScholarGraph
+
+        # One rate limiter: every mission draws from the same budget
+        return SemanticScholarGraph(api_key=self.section("semantic_scholar").get("api_key"))
+
+    @cached_property
+    def notion(self):
+        from scout.notion import NotionClient
+
+        token = self.section("notion").get("api_token")
+        return NotionClient(token) if token else None
+
+    @cached_property
+    def llm_cache(self):
+        from scout.llm_cache import LLMCache, SQLiteBackend, SupabaseBackend
+
+        conf = self.section("llm_cache")
+        if conf.get("backend") == "supabase":
+            backend = SupabaseBackend(self.db, max_rows=int(conf.get("max_rows", 5000)))
+        else:
+            backend = SQLiteBackend(conf.get("path", ".cache/llm_cache.sqlite3"), int(conf.get("max_mb", 256)) * 1024 * 1024)
+        return LLMCache(backend)
+
+    @cached_property
+    def chunks(self):
+        from scout.chunks import ChunkCache, ChunkReader
+
+        # Chunk text is immutable, so one local cache serves every caller
+        conf = self.section("chunks")
+        cache = ChunkCache(conf.get("path", ".cache/chunks.sqlite3"), int(conf.get("max_mb", 128)) * 1024 * 1024)
+        return ChunkReader(self.db, cache)
+
+    @cached_property
+    def dedup(self):
+        from scout.dedup import DedupPolicy
+
+        conf = self.section("dedup")
+        return DedupPolicy(on_insert=conf.get("on_insert", "merge"), threshold=float(conf.get("threshold", 0.8)))
+
+    @cached_property
+    def jobs(self):
+        """The job queue with every handler registered; resumes unfinished work."""
+        from scout.ingest import make_ingest_handler
+        from scout.jobs import JobQueue
+        from scout.notion import make_notion_handler
+        from scout.scrape import make_scrape_handler
+        from scout.snowball import make_snowball_handler
+
+        conf = self.section("jobs")
+        queue = JobQueue(
+            self.jobs_path or conf.get("path", ".cache/jobs.sqlite3"),
+            workers=int(conf.get("workers", 3)), max_attempts=int(conf.get("max_attempts", 3)),
+            connect=self.job_client,
+        )
+        cache = self.llm_cache
+        queue.register("ingest_pdf", make_ingest_handler(self.model, cache, dedup=self.dedup))
+        queue.register("snowball", make_snowball_handler(self.s2_graph, dedup=self.dedup))
+        queue.register("notion_sync", make_notion_handler(self.notion, self.section("notion").get("database_id")))
+        if self.firecrawl:
+            queue.register("scrape_url", make_scrape_handler(self.firecrawl, self.model, cache, dedup=self.dedup))
+        queue.resume()
+        return queue
+
+    # --- SESSION ---
+    def sign_in(self, email, password):
+        """Act as an operator, so row-level security and ``owner_id`` defaults apply."""
+        res = self.db.auth.sign_in_with_password({"email": email, "password": password})
+        self.db.postgrest.auth(res.session.access_token)
+        return res.user
+
+    def fresh_session(self, session):
+        """``session``, refreshed first if its access token is about to expire.
+
+        Jobs only ever get the access token; the refresh token stays with
+        the session that signed in, so rotating it can't sign anyone out.
+        """
+        if token_expiry(session.access_token) > time.time() + 5 * TOKEN_MARGIN:
+            return session
+        return self.db.auth.refresh_session(session.refresh_token).session
+
+    def projects(self, owner_id=None):
+        q = self.db.table("projects").select("*")
+        if owner_id:
+            q = q.eq("owner_id", owner_id)
+        return q.order("created_at").execute().data or []
+
+    def repository(self, project_id, cache=None):
+        from scout.repository import PaperRepository
+
+        return PaperRepository(self.db, project_id, {} if cache is None else cache)
@@ -0,0 +1,221 @@
+"""Snowball Mining as a breadth-first crawl of the Semantic Scholar graph.
+
+Each hop costs a constant number of requests: one batch call for the
+frontier's references/citations, one batch call for the new papers'
+metadata (both chunked at the API's 500-id limit and run concurrently under
+a shared rate limiter), and a single bulk insert. Deduplication is a set
+lookup against keys built from the already-loaded project snapshot.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from scout.graph import link_papers
+from scout.http import RateLimiter, pooled_session, request
+from scout.jobs import PermanentError
+from scout.repository import PaperRepository
+from scout.search import S2_API
+from scout.store import PaperStore, natural_key, title_key
+
+BATCH_LIMIT = 500
+PAPER_FIELDS = "paperId,externalIds,title,authors,year,abstract,url,citationCount"
+DIRECTIONS = ("references", "citations")
+
+
+def paper_keys(paper):
+    """Every identity a paper row can be matched on."""
+    keys = set()
+    if paper.get("s2_paper_id"):
+        keys.add(("s2", paper["s2_paper_id"]))
+    if paper.get("doi"):
+        keys.add(("doi", paper["doi"].lower()))
+    if title_key(paper.get("title")):
+        keys.add(("title", title_key(paper["title"])))
+    return keys
+
+
+def known_keys(papers):
+    keys = set()
+    for p in papers:
+        keys |= paper_keys(p)
+    return keys
+
+
+def to_row(meta):
+    """Map a Semantic Scholar paper onto a ``papers`` row."""
+    return {
+        "title": meta["title"],
+        "authors": [a.get("name", "Unknown") for a in meta.get("authors") or []],
+        "year": meta.get("year"),
+        "abstract": meta.get("abstract"),
+        "url": meta.get("url"),
+        "citation_count": meta.get("citationCount") or 0,
+        "s2_paper_id": meta.get("paperId"),
+        "doi": (meta.get("externalIds") or {}).get("DOI"),
+        "source_type": "snowball-mining",
+    }
+
+
+class SemanticScholarGraph:
+    def __init__(self, base_url=S2_API, api_key=None, rate=1.0, max_workers=4, timeout=20, session=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or pooled_session(max_workers, {"x-api-key": api_key} if api_key else None)
+        self.limiter = RateLimiter(rate)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="snowball")
+
+    def match(self, title):
+        """Resolve a library title to its Semantic Scholar paperId, or None."""
+        try:
+            res = request(
+                self.session, "GET", f"{self.base_url}/paper/search/match",
+                limiter=self.limiter, timeout=self.timeout,
+                params={"query": title, "fields": "paperId"},
+            )
+        except Exception:
+            return None
+        data = res.json().get("data") or []
+        return data[0]["paperId"] if data else None
+
+    def batch(self, ids, fields):
+        """POST /paper/batch over ``ids`` in concurrent 500-id chunks."""
+        chunks = [ids[i:i + BATCH_LIMIT] for i in range(0, len(ids), BATCH_LIMIT)]
+        futures = [
+            self.pool.submit(
+                request, self.session, "POST", f"{self.base_url}/paper/batch",
+                limiter=self.limiter, timeout=self.timeout,
+                params={"fields": fields}, json={"ids": chunk},
+            )
+            for chunk in chunks
+        ]
+        out = []
+        for f in futures:
+            # Unknown ids come back as null entries
+            out.extend(p for p in f.result().json() if p)
+        return out
+
+    def neighbours(self, ids, directions=DIRECTIONS):
+        """Map each paperId to its (neighbour_id, relation) pairs."""
+        fields = ",".join(f"{d}.paperId" for d in directions)
+        out = {}
+        for p in self.batch(ids, fields):
+            out[p["paperId"]] = [
+                (n["paperId"], d) for d in directions for n in p.get(d) or [] if n.get("paperId")
+            ]
+        return out
+
+
+def crawl(graph, seed_title, known, insert, depth=1, directions=("references",), max_per_hop=50, min_citations=0, state=None):
+    """Expand the library from ``seed_title`` for ``depth`` hops.
+
+    ``known`` is a set from :func:`known_keys` and is updated in place;
+    ``insert`` receives one list of rows per hop. Yields a progress dict after
+    resolving the seed and after every hop. Each hop event carries a
+    ``state`` that, passed back in, resumes the crawl after that hop.
+    """
+    if state:
+        seed, start, total = state["seed"], state["hop"] + 1, state["total"]
+        visited, frontier = set(state["visited"]), state["frontier"]
+    else:
+        seed = graph.match(seed_title)
+        if not seed:
+            yield {"stage": "missing", "hop": 0, "inserted": 0}
+            return
+        start, total, visited, frontier = 1, 0, {seed}, [seed]
+    yield {"stage": "seed", "hop": start - 1, "paper_id": seed, "inserted": 0}
+
+    for hop in range(start, depth + 1):
+        if not frontier:
+            break
+        adjacency = graph.neighbours(frontier, directions)
+        edges = [(src, dst, rel) for src, pairs in adjacency.items() for dst, rel in pairs]
+        candidates = list(dict.fromkeys(dst for _, dst, _ in edges if dst not in visited))
+        visited.update(candidates)
+
+        rows, next_frontier = [], []
+        for meta in graph.batch(candidates, PAPER_FIELDS) if candidates else []:
+            if not meta.get("title") or (meta.get("citationCount") or 0) < min_citations:
+                continue
+            row = to_row(meta)
+            keys = paper_keys(row)
+            next_frontier.append(meta["paperId"])
+            if keys & known:
+                continue
+            known.update(keys)
+            rows.append(row)
+            if len(rows) >= max_per_hop:
+                break
+
+        if rows:
+            insert(rows)
+        total += len(rows)
+        size, frontier = len(frontier), next_frontier[:max_per_hop]
+        yield {
+            "stage": "hop", "hop": hop, "frontier": size, "candidates": len(candidates), "inserted": len(rows),
+            "total": total, "edges": edges,
+            "state": {"seed": seed, "hop": hop, "total": total, "visited": sorted(visited), "frontier": frontier},
+        }
+
+
+def make_snowball_handler(s2, dedup=None):
+    """Job handler for ``snowball`` missions; checkpoints after every hop."""
+
+    def handle(job, ctx):
+        p = job["payload"]
+        repo = PaperRepository(ctx.db, job["project_id"], {})
+        store = PaperStore(repo, dedup)
+        identity = repo.view("identity")
+        # Re-read on every attempt, so hops that already landed are known
+        known = known_keys(identity)
+        library = {r["id"] for r in identity}
+        s2_ids = {r["s2_paper_id"]: r["id"] for r in identity if r.get("s2_paper_id")}
+        hop_written = []
+        state = job["checkpoint"]
+        # What actually landed, not what was attempted; carried across attempts in the checkpoint
+        saved = {"inserted": 0, "merged": 0, **((state or {}).get("saved") or {})}
+
+        def flush():
+            report = store.flush()
+            if not report.ok:
+                # Nothing is checkpointed past this point, so a retry redoes the hop
+                raise RuntimeError(f"{len(report.failed)} papers not saved: {report.failed[0][1]}")
+            new = [r for r in report.written if r["id"] not in library]
+            library.update(r["id"] for r in new)
+            saved["inserted"] += len(new)
+            saved["merged"] += len(report.merged)
+            return report
+
+        def insert_hop(rows):
+            store.add_many(rows)
+            report = flush()
+            hop_written[:] = report.written
+            s2_ids.update({r["s2_paper_id"]: r["id"] for r in report.written if r.get("s2_paper_id")})
+
+        def resolve_seed(s2_id):
+            s2_ids[s2_id] = p["seed_id"]
+            seed = next((r for r in identity if r["id"] == p["seed_id"]), None)
+            if seed is None or seed.get("s2_paper_id"):
+                return
+            # The S2 id can move the seed onto a natural key another paper already holds; leave it unrekeyed
+            key = natural_key({**seed, "s2_paper_id": s2_id})
+            if key != seed.get("natural_key") and any(r.get("natural_key") == key for r in identity):
+                return
+            store.update(p["seed_id"], {"s2_paper_id": s2_id})
+
+        ctx.progress(state["hop"] if state else 0, p["depth"], "Resolving seed")
+        for ev in crawl(
+            s2, p["seed_title"], known, insert_hop, depth=p["depth"], directions=p["directions"],
+            min_citations=p.get("min_citations", 0), state=state,
+        ):
+            if ev["stage"] == "missing":
+                raise PermanentError("Paper not found in Graph.")
+            if ev["stage"] == "seed":
+                resolve_seed(ev["paper_id"])
+            elif ev["stage"] == "hop":
+                link_papers(repo, hop_written if ev["inserted"] else [], ev["edges"], s2_ids)
+                ctx.checkpoint({**ev["state"], "saved": saved})
+                ctx.progress(ev["hop"], p["depth"], f"Hop {ev['hop']}: {ev['candidates']} linked papers, {ev['inserted']} new")
+            if ctx.cancelled:
+                break
+        flush()
+        return saved
+
+    return handle
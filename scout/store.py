@@ -0,0 +1,294 @@
+"""Write-behind paper store.
+
+Every code path that writes papers queues rows here and calls ``flush()``
+once. Inserts become batched ``upsert`` calls on the ``(project_id,
+natural_key)`` unique index, so bulk inserts cost a constant number of round
+trips. Titles are keyed in any script; one too short to identify a paper
+gets no key, so its row is always inserted. Updates are ``PATCH`` requests by
+id, one per distinct diff, so a bulk edit is a handful of calls and an update
+can never create a row or blank a column it didn't name. Per-row diffs (a
+Notion page id for each paper) are sent a few at a time in parallel. An
+update that changes a paper's DOI, Semantic Scholar id or title also moves
+its natural key. A failing batch is bisected to pin the error on individual
+rows.
+
+Given a ``DedupPolicy`` (scout/dedup.py), every insert is first looked up in
+the project's near-duplicate index and merged into, or flagged against, the
+paper it matches.
+"""
+import itertools
+import json
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from scout.repository import ID_BATCH
+from scout.telemetry import traced
+
+UPSERT_BATCH = 500
+PATCH_WORKERS = 8
+NATURAL_CONFLICT = "project_id,natural_key"
+# Fields a duplicate may contribute to the paper it is merged into
+MERGE_FIELDS = ("doi", "s2_paper_id", "authors", "year", "abstract", "url", "content_body")
+# Fields natural_key() is derived from
+KEY_FIELDS = frozenset({"doi", "s2_paper_id", "title"})
+# Shorter normalized titles ("", "AI", a lone symbol) would lump unrelated papers under one key
+MIN_TITLE_KEY = 4
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def _fold_accents(text):
+    # Only accents on Latin letters go: й, ё and ド are letters in their own right
+    out, base = [], ""
+    for c in unicodedata.normalize("NFKD", text):
+        if not unicodedata.combining(c):
+            base = c
+        elif base.isascii():
+            continue
+        out.append(c)
+    return unicodedata.normalize("NFC", "".join(out))
+
+
+def normalize_title(title):
+    """Casefolded words in any script, with Latin accents and punctuation dropped."""
+    return _NON_WORD.sub(" ", _fold_accents(title or "").casefold()).strip()
+
+
+def title_key(title):
+    """``normalize_title``, or None when too little is left to identify a paper."""
+    norm = normalize_title(title)
+    return norm if len(norm.replace(" ", "")) >= MIN_TITLE_KEY else None
+
+
+def natural_key(row):
+    """DOI, then Semantic Scholar id, then normalized title; None if none identifies the paper.
+
+    Unkeyed rows are always inserted: the unique index ignores NULLs.
+    """
+    if row.get("doi"):
+        return f"doi:{row['doi'].lower()}"
+    if row.get("s2_paper_id"):
+        return f"s2:{row['s2_paper_id']}"
+    title = title_key(row.get("title"))
+    return f"title:{title}" if title else None
+
+
+def fill_missing(existing, incoming):
+    """The fields ``incoming`` can add to ``existing`` without overwriting anything."""
+    diff = {f: incoming[f] for f in MERGE_FIELDS if incoming.get(f) not in (None, "", []) and existing.get(f) in (None, "", [])}
+    if (incoming.get("citation_count") or 0) > (existing.get("citation_count") or 0):
+        diff["citation_count"] = incoming["citation_count"]
+    return diff
+
+
+@dataclass
+class FlushReport:
+    written: list = field(default_factory=list)
+    failed: list = field(default_factory=list)  # (row, error message)
+    merged: list = field(default_factory=list)  # (row, id of the paper it was merged into)
+    flagged: int = 0
+    calls: int = 0
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    @property
+    def ids(self):
+        """Ids of every paper the flush wrote or merged into, in order."""
+        return list(dict.fromkeys([r["id"] for r in self.written] + [pid for _, pid in self.merged]))
+
+
+class PaperStore:
+    def __init__(self, repo, dedup=None):
+        self.repo = repo
+        self.dedup = dedup  # DedupPolicy, or None to insert blindly
+        self._inserts = {}
+        self._updates = {}
+        self._merged = []
+        self._index = None
+        self._unkeyed = itertools.count()
+
+    @property
+    def pending(self):
+        return len(self._inserts) + len(self._updates)
+
+    def add(self, row):
+        """Queue a new paper; repeats of the same natural key merge."""
+        row = dict(row, project_id=self.repo.project_id)
+        key = row["natural_key"] = natural_key(row)
+        if key is None:
+            key = f"unkeyed:{next(self._unkeyed)}"
+        if self.dedup is not None and self.dedup.on_insert != "off" and key not in self._inserts:
+            if self._dedup(row, key):
+                return
+        prior = self._inserts.get(key, {})
+        self._inserts[key] = {**prior, **row}
+
+    def add_many(self, rows):
+        for r in rows:
+            self.add(r)
+
+    def update(self, paper_id, diff):
+        self._updates.setdefault(paper_id, {}).update(diff)
+
+    @traced("store.flush")
+    def flush(self):
+        report = FlushReport(merged=self._merged)
+        report.flagged = sum(1 for r in self._inserts.values() if r.get("duplicate_of"))
+        if self._inserts:
+            for group in _by_columns(self._inserts.values()):
+                self._upsert(group, NATURAL_CONFLICT, report)
+        if self._updates:
+            self._patch_all(report)
+        pending = [f"new:{k}" for k in self._inserts]
+        self._inserts, self._updates, self._merged = {}, {}, []
+        if self._index is not None:
+            for key in pending:
+                self._index.remove(key)
+            self._index.add_many(report.written)
+        if report.calls:
+            in_sync = self._index is not None and self._index.version == self.repo.version
+            self.repo.apply(report.written)
+            if in_sync:
+                # The index already holds everything just written; don't rebuild it
+                self._index.version = self.repo.version
+        return report
+
+    # --- INTERNALS ---
+    def _dedup(self, row, slot):
+        """Merge or flag ``row`` (queued under ``slot``) against a near-duplicate; True if it was absorbed."""
+        if self._index is None:
+            self._index = self.dedup.index(self.repo)
+        hit = self._index.match(row)
+        if hit is None:
+            # Pending inserts are indexed too, so a batch can't duplicate itself
+            self._index.add(f"new:{slot}", row)
+            return False
+        target = hit[0]
+        if target.startswith("new:"):
+            pending = self._inserts[target[4:]]
+            pending.update(fill_missing(pending, row))
+            return True
+        existing = self._current_rows().get(target, {})
+        # An exact repeat can't be a second row (the natural key is unique), so it always merges
+        if self.dedup.on_insert == "flag" and (row["natural_key"] is None or natural_key(existing) != row["natural_key"]):
+            row["duplicate_of"] = target
+            self._index.add(f"new:{slot}", row)
+            return False
+        diff = fill_missing({**existing, **self._updates.get(target, {})}, row)
+        if "content_body" in diff and self.repo.content_bodies([target])[target]:
+            del diff["content_body"]
+        if diff:
+            self.update(target, diff)
+        self._merged.append((row, target))
+        return True
+
+    def _current_rows(self):
+        return self.repo.rows_by_id()
+
+    def _patches(self):
+        """``[(diff, ids)]``: queued updates grouped by identical diff."""
+        groups = {}
+        for pid, diff in self._updates.items():
+            diff = self._rekeyed(pid, diff)
+            key = json.dumps(diff, sort_keys=True, default=str)
+            groups.setdefault(key, (diff, []))[1].append(pid)
+        return list(groups.values())
+
+    def _rekeyed(self, pid, diff):
+        # A changed DOI, S2 id or title can change the key later upserts look the paper up by
+        if KEY_FIELDS.isdisjoint(diff):
+            return diff
+        base = self._current_rows().get(pid)
+        if base is None:
+            return diff
+        key = natural_key({**base, **diff})
+        return {**diff, "natural_key": key} if key != natural_key(base) else diff
+
+    def _upsert(self, rows, on_conflict, report):
+        for i in range(0, len(rows), UPSERT_BATCH):
+            self._write(rows[i:i + UPSERT_BATCH], on_conflict, report)
+
+    def _write(self, rows, on_conflict, report):
+        def send(batch):
+            return self.repo.db.table("papers").upsert(batch, on_conflict=on_conflict).execute().data
+
+        self._bisect(rows, send, lambda row: row, report)
+
+    def _patch_all(self, report):
+        work = [(diff, ids[i:i + ID_BATCH]) for diff, ids in self._patches() for i in range(0, len(ids), ID_BATCH)]
+        if len(work) == 1:
+            return self._patch(*work[0], report)
+        # Each PATCH gets its own report so the threads never share a list
+        parts = [FlushReport() for _ in work]
+        with ThreadPoolExecutor(max_workers=PATCH_WORKERS, thread_name_prefix="store-patch") as pool:
+            list(pool.map(lambda job, part: self._patch(*job, part), work, parts))
+        for part in parts:
+            report.written.extend(part.written)
+            report.failed.extend(part.failed)
+            report.calls += part.calls
+
+    def _patch(self, diff, ids, report):
+        def send(batch):
+            res = (
+                self.repo.db.table("papers").update(diff)
+                .eq("project_id", self.repo.project_id).in_("id", batch).execute().data or []
+            )
+            # A PATCH matching nothing succeeds silently; the paper is gone (or in another project)
+            found = {r["id"] for r in res}
+            report.failed.extend(({"id": pid, **diff}, "paper not found") for pid in batch if pid not in found)
+            return res
+
+        self._bisect(ids, send, lambda pid: {"id": pid, **diff}, report)
+
+    def _bisect(self, items, send, describe, report):
+        report.calls += 1
+        try:
+            report.written.extend(send(items) or [])
+        except Exception as e:
+            if len(items) == 1:
+                report.failed.append((describe(items[0]), str(e)))
+                return
+            mid = len(items) // 2
+            self._bisect(items[:mid], send, describe, report)
+            self._bisect(items[mid:], send, describe, report)
+
+
+def _by_columns(rows):
+    groups = {}
+    for r in rows:
+        groups.setdefault(frozenset(r), []).append(r)
+    return list(groups.values())
+
+
+def rekey_papers(repo):
+    """Recompute every paper's natural key with the current rule.
+
+    Papers that would share a key leave it to the oldest and take an
+    ``:id`` suffix, as migration_natural_key.sql does for legacy duplicates.
+    Changed keys are cleared first so two papers can trade keys without
+    tripping the unique index; an interrupted run can simply be repeated.
+    Returns ``(number of papers rekeyed, failed (row, error) pairs)``.
+    """
+    rows = sorted(repo.snapshot(), key=lambda r: r.get("created_at") or "")
+    wanted, taken = {}, set()
+    for r in rows:
+        key = natural_key(r)
+        if key is not None and key in taken:
+            key = f"{key}:{r['id']}"
+        taken.add(key)
+        if key != r.get("natural_key"):
+            wanted[r["id"]] = key
+    store = PaperStore(repo)
+    for pid in wanted:
+        store.update(pid, {"natural_key": None})
+    failed = store.flush().failed
+    cleared = {row["id"] for row, _ in failed}
+    for pid, key in wanted.items():
+        if key is not None and pid not in cleared:
+            store.update(pid, {"natural_key": key})
+    failed += store.flush().failed
+    return len(wanted), failed
@@ -0,0 +1,119 @@
+"""Streaming synthesis turns.
+
+``SynthesisStream`` wraps ``model.generate_content(prompt, stream=True)`` and
+yields text as chunks arrive, so the UI can render token by token. It records
+time-to-first-token, total latency and output size for the turn, and stops
+cleanly when cancelled or when the consumer abandons it mid-stream (a
+Streamlit rerun). Any object whose ``generate_content`` returns an iterable of
+chunks with a ``.text`` attribute works, which makes local fakes trivial.
+:func:`grounded_prompt` assembles a turn's prompt from the project's best
+passages, packed into a token budget, so the app and the command line ask
+the same question.
+"""
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from scout.retrieval import CONTEXT_TOKENS, MAX_PASSAGES, format_context, plan_context, project_index
+from scout.telemetry import record, span
+
+SYSTEM_PROMPT = """
+You are an Elite Research Assistant. Your goal is to synthesize answers using ONLY the provided Context Library.
+
+RULES:
+1. CITATIONS MANDATORY: Every single claim or fact must be immediately followed by its source in [Author, Year] format.
+2. NO HALLUCINATION: If the answer is not in the Context Library, state clearly: "This information is not present in the current archives."
+3. ACADEMIC TONE: Maintain a professional, objective, and analytical tone.
+4. SYNTHESIS: Do not just list summaries. Connect the dots between papers. Compare and contrast findings.
+"""
+
+
+def build_prompt(kb_context, prompt):
+    return f"{SYSTEM_PROMPT}\n\nCONTEXT LIBRARY:\n{kb_context}\n\nUSER PROMPT: {prompt}"
+
+
+def grounded_prompt(repo, chunks, prompt, k=MAX_PASSAGES, budget=CONTEXT_TOKENS):
+    """``build_prompt`` over the passages most relevant to this turn: at most ``k``, within ``budget`` tokens."""
+    index = project_index(repo, chunks)
+    with span("retrieval.plan", k=k, budget=budget) as s:
+        plan = plan_context(index, prompt, budget=budget, max_passages=k)
+        s.set(rows=len(plan.passages), tokens_in=plan.tokens, papers=plan.papers,
+              library_tokens=plan.library_tokens, duplicates=plan.duplicates, trimmed=plan.trimmed)
+    return build_prompt(format_context(plan.passages), prompt)
+
+
+@dataclass
+class TurnMetrics:
+    prompt_chars: int = 0
+    ttft_s: float = None
+    total_s: float = None
+    chunks: int = 0
+    output_chars: int = 0
+    output_tokens: int = None
+    cancelled: bool = False
+
+    def as_dict(self):
+        return asdict(self)
+
+    def caption(self):
+        parts = []
+        if self.ttft_s is not None:
+            parts.append(f"first token {self.ttft_s:.1f}s")
+        if self.total_s is not None:
+            parts.append(f"{self.total_s:.1f}s total")
+        parts.append(f"{self.output_tokens or self.chunks} {'tokens' if self.output_tokens else 'chunks'}")
+        if self.cancelled:
+            parts.append("stopped")
+        return " · ".join(parts)
+
+
+class SynthesisStream:
+    def __init__(self, model, prompt, on_finish=None):
+        self.model = model
+        self.prompt = prompt
+        self.on_finish = on_finish
+        self.metrics = TurnMetrics(prompt_chars=len(prompt))
+        self.text = ""
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def __iter__(self):
+        start = time.perf_counter()
+        stream = self.model.generate_content(self.prompt, stream=True)
+        finished = False
+        try:
+            for chunk in stream:
+                if self._cancel.is_set():
+                    break
+                try:
+                    piece = chunk.text
+                except ValueError:
+                    # Safety-blocked or empty chunks carry no text parts
+                    continue
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage is not None and getattr(usage, "candidates_token_count", None):
+                    self.metrics.output_tokens = usage.candidates_token_count
+                if not piece:
+                    continue
+                if self.metrics.ttft_s is None:
+                    self.metrics.ttft_s = time.perf_counter() - start
+                self.metrics.chunks += 1
+                self.text += piece
+                yield piece
+            finished = not self._cancel.is_set()
+        finally:
+            # Also reached via GeneratorExit when a rerun abandons the stream
+            self.metrics.cancelled = not finished
+            self.metrics.total_s = time.perf_counter() - start
+            self.metrics.output_chars = len(self.text)
+            record(
+                "gemini.stream", self.metrics.total_s * 1000, tokens_out=self.metrics.output_tokens or 0,
+                ttft_ms=(self.metrics.ttft_s or 0) * 1000, cancelled=self.metrics.cancelled,
+            )
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            if self.on_finish:
+                self.on_finish(self.text, self.metrics)
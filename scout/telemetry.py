@@ -0,0 +1,366 @@
+"""Timing and counting for external calls and heavy functions.
+
+Supabase queries, Semantic Scholar/DuckDuckGo/Notion requests, Gemini calls,
+exports and the heavy library passes each run inside :func:`span`. A span
+records latency into a per-operation histogram with log-spaced buckets, plus
+whatever sizes the call reports (``bytes``, ``rows``, ``tokens_in``,
+``tokens_out``). :func:`cache_event` counts hits and misses per cache.
+
+The app calls :func:`begin_run` at the top of every rerun. Spans recorded on
+that thread, or on a pool thread started with ``contextvars.copy_context``,
+carry the run id, which is how a single rerun is broken down. Background job
+threads record under no run.
+
+:func:`configure` can also append every finished span to a local JSON-lines
+file in the OpenTelemetry span shape (traceId, spanId, name, start/end nanos,
+attributes, status). That file can be read with ``jq`` or loaded into any
+OTLP-JSON tool.
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import math
+import os
+import pathlib
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Upper bounds (ms) of the latency buckets; the last one catches everything
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, math.inf)
+SUMMED = ("bytes", "rows", "tokens_in", "tokens_out")
+RECENT_SPANS = 5000
+RECENT_RUNS = 200
+
+_RUN = contextvars.ContextVar("scout_run", default=None)
+
+
+class OpStats:
+    __slots__ = ("calls", "errors", "total_ms", "max_ms", "buckets", "bytes", "rows", "tokens_in", "tokens_out")
+
+    def __init__(self):
+        self.calls = self.errors = 0
+        self.total_ms = self.max_ms = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.bytes = self.rows = self.tokens_in = self.tokens_out = 0
+
+    def add(self, ms, attrs, error):
+        self.calls += 1
+        self.errors += bool(error)
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.buckets[next(i for i, bound in enumerate(BUCKETS_MS) if ms <= bound)] += 1
+        for key in SUMMED:
+            value = attrs.get(key)
+            if isinstance(value, (int, float)):
+                setattr(self, key, getattr(self, key) + int(value))
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile, capped at the max seen."""
+        if not self.calls:
+            return 0.0
+        rank, seen = q * self.calls, 0
+        for bound, n in zip(BUCKETS_MS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self, name):
+        return {
+            "operation": name, "calls": self.calls, "errors": self.errors,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "p50_ms": self.percentile(0.5), "p95_ms": self.percentile(0.95), "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms, "total_ms": self.total_ms,
+            "bytes": self.bytes, "rows": self.rows, "tokens_in": self.tokens_in, "tokens_out": self.tokens_out,
+        }
+
+
+class Span:
+    __slots__ = ("name", "attrs", "run", "thread", "start_ns", "end_ns", "ms", "error", "span_id")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.run = _RUN.get()
+        self.thread = threading.current_thread().name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.ms = 0.0
+        self.error = None
+        self.span_id = uuid.uuid4().hex[:16]
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class FileExporter:
+    """Appends finished spans to ``path`` as OpenTelemetry-style JSON lines, in batches."""
+
+    def __init__(self, path, flush_every=200, interval=5.0):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self.interval = interval
+        self._buffer = []
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self._resource = {"service.name": "scout", "process.pid": os.getpid()}
+        atexit.register(self.flush)
+
+    def export(self, span):
+        with self._lock:
+            self._buffer.append(self._encode(span))
+            due = len(self._buffer) >= self.flush_every or time.monotonic() - self._last > self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer, self._last = self._buffer, [], time.monotonic()
+        if lines:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write("".join(lines))
+
+    def _encode(self, span):
+        attrs = {**span.attrs, "thread.name": span.thread}
+        return json.dumps({
+            "resource": self._resource,
+            "traceId": (span.run or "0").ljust(32, "0")[:32],
+            "spanId": span.span_id,
+            "name": span.name,
+            "startTimeUnixNano": span.start_ns,
+            "endTimeUnixNano": span.end_ns,
+            "attributes": [{"key": k, "value": _otel_value(v)} for k, v in attrs.items() if v is not None],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }, default=str) + "\n"
+
+
+def _otel_value(v):
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+class Telemetry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ops = {}
+        self.caches = {}
+        self.recent = deque(maxlen=RECENT_SPANS)
+        self.runs = OrderedDict()
+        self.exporter = None
+        self._run_ids = itertools.count(1)
+
+    # --- RECORDING ---
+    @contextmanager
+    def span(self, name, **attrs):
+        s = Span(name, attrs)
+        start = time.perf_counter()
+        try:
+            yield s
+        except BaseException as e:
+            s.error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            s.ms = (time.perf_counter() - start) * 1000
+            s.end_ns = s.start_ns + int(s.ms * 1e6)
+            self._finish(s)
+
+    def record(self, name, ms, error=None, **attrs):
+        """Record a span measured elsewhere (e.g. a stream consumed by the UI)."""
+        s = Span(name, attrs)
+        s.ms, s.error = ms, error
+        s.start_ns -= int(ms * 1e6)
+        s.end_ns = s.start_ns + int(ms * 1e6)
+        self._finish(s)
+
+    def _finish(self, s):
+        with self._lock:
+            stats = self.ops.get(s.name)
+            if stats is None:
+                stats = self.ops[s.name] = OpStats()
+            stats.add(s.ms, s.attrs, s.error)
+            self.recent.append(s)
+        if self.exporter:
+            self.exporter.export(s)
+
+    def traced(self, name):
+        """Decorator form of :meth:`span`."""
+        def wrap(fn):
+            @wraps(fn)
+            def inner(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def cache_event(self, name, hits=0, misses=0):
+        with self._lock:
+            counts = self.caches.setdefault(name, [0, 0])
+            counts[0] += hits
+            counts[1] += misses
+
+    # --- RUNS ---
+    def begin_run(self):
+        """Tag everything this thread records from now on with a fresh run id."""
+        run = f"{os.getpid():x}{next(self._run_ids):08x}"
+        _RUN.set(run)
+        with self._lock:
+            self.runs[run] = [time.time_ns(), None]
+            while len(self.runs) > RECENT_RUNS:
+                self.runs.popitem(last=False)
+        return run
+
+    def end_run(self, run):
+        with self._lock:
+            if run in self.runs:
+                self.runs[run][1] = time.time_ns()
+
+    def run_breakdown(self, run):
+        """``(wall_ms, rows)`` for one run: per-operation calls and time, slowest first."""
+        with self._lock:
+            spans = [s for s in self.recent if s.run == run]
+            start, end = self.runs.get(run, (None, None))
+        if not spans:
+            return 0.0, []
+        start = start or min(s.start_ns for s in spans)
+        end = end or max(s.end_ns for s in spans)
+        by_op = {}
+        for s in spans:
+            row = by_op.setdefault(s.name, {"operation": s.name, "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "bytes": 0, "errors": 0})
+            row["calls"] += 1
+            row["total_ms"] += s.ms
+            row["max_ms"] = max(row["max_ms"], s.ms)
+            row["errors"] += bool(s.error)
+            for key in ("rows", "bytes"):
+                if isinstance(s.attrs.get(key), (int, float)):
+                    row[key] += int(s.attrs[key])
+        return (end - start) / 1e6, sorted(by_op.values(), key=lambda r: r["total_ms"], reverse=True)
+
+    # --- READING ---
+    def summary(self):
+        """Process-wide per-operation stats, slowest p95 first."""
+        with self._lock:
+            rows = [stats.as_dict(name) for name, stats in self.ops.items()]
+        return sorted(rows, key=lambda r: r["p95_ms"], reverse=True)
+
+    def slowest(self, n=10):
+        with self._lock:
+            spans = list(self.recent)
+        return sorted(spans, key=lambda s: s.ms, reverse=True)[:n]
+
+    def cache_stats(self):
+        with self._lock:
+            return {
+                name: {"hits": h, "misses": m, "hit_rate": h / (h + m) if h + m else 0.0}
+                for name, (h, m) in self.caches.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self.ops.clear()
+            self.caches.clear()
+            self.recent.clear()
+
+    def configure(self, export_path=None):
+        """Start (or stop, with no path) the JSON-lines span exporter."""
+        if self.exporter:
+            self.exporter.flush()
+        self.exporter = FileExporter(export_path) if export_path else None
+        return self
+
+
+telemetry = Telemetry()
+span = telemetry.span
+record = telemetry.record
+traced = telemetry.traced
+cache_event = telemetry.cache_event
+
+
+def current_run():
+    return _RUN.get()
+
+
+# --- CLIENT WRAPPERS ---
+VERBS = ("select", "insert", "upsert", "update", "delete")
+
+
+class _TracedQuery:
+    """A PostgREST request builder whose ``execute`` is a span."""
+
+    def __init__(self, builder, name):
+        self._builder = builder
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(self._builder, attr)
+        if attr == "execute":
+            return self._execute
+        if not callable(value):
+            return value
+        name = f"{self._name}.{attr}" if attr in VERBS else self._name
+
+        def chain(*args, **kwargs):
+            out = value(*args, **kwargs)
+            return _TracedQuery(out, name) if hasattr(out, "execute") else out
+
+        return chain
+
+    def _execute(self):
+        with telemetry.span(self._name) as s:
+            res = self._builder.execute()
+            if isinstance(res.data, list):
+                s.set(rows=len(res.data))
+            return res
+
+
+class TracedClient:
+    """Supabase client whose table and RPC calls are timed as ``db.<table>.<verb>`` and ``db.rpc.<fn>``."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _TracedQuery(self._client.table(name), f"db.{name}")
+
+    def rpc(self, fn, params=None, *args, **kwargs):
+        return _TracedQuery(self._client.rpc(fn, params or {}, *args, **kwargs), f"db.rpc.{fn}")
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
+
+
+class TracedModel:
+    """Gemini model whose non-streaming ``generate_content`` calls are spans with token counts.
+
+    Streams are timed by their consumer (``SynthesisStream``), which sees
+    the last chunk.
+    """
+
+    def __init__(self, model, name="gemini"):
+        self._model = model
+        self._name = name
+        self.model_name = getattr(model, "model_name", str(model))
+
+    def generate_content(self, *args, **kwargs):
+        if kwargs.get("stream"):
+            return self._model.generate_content(*args, **kwargs)
+        with telemetry.span(f"{self._name}.generate") as s:
+            res = self._model.generate_content(*args, **kwargs)
+            usage = getattr(res, "usage_metadata", None)
+            if usage is not None:
+                s.set(tokens_in=getattr(usage, "prompt_token_count", 0) or 0,
+                      tokens_out=getattr(usage, "candidates_token_count", 0) or 0)
+            return res
+
+    def __getattr__(self, attr):
+        return getattr(self._model, attr)
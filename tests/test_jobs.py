@@ -0,0 +1,15 @@
+from scout.jobs import JobQueue
+
+
+def test_settled_jobs_drop_their_token_until_reauthed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), workers=1, max_attempts=1, backoff=0)
+    queue.register("boom", lambda job, ctx: 1 / 0)
+    batch_id = queue.submit("boom", "p", [("one", {})], owner_id="u", access_token="old")
+
+    [job] = queue.wait(batch_id, poll=0.01)
+    assert job["status"] == "failed" and job["access_token"] is None
+
+    # A signed-in session hands its current token to the user's retryable jobs
+    assert queue.reauth("u", "new") == 1
+    assert queue.reauth("u", "new") == 0
+    assert queue.batch(batch_id)[0]["access_token"] == "new"
@@ -0,0 +1,80 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from scout.llm_cache import LLMCache, SQLiteBackend, cache_key
+
+
+class ScriptedModel:
+    """Returns the queued replies in order and counts the calls."""
+
+    model_name = "models/test"
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def generate_content(self, contents, generation_config=None):
+        self.calls += 1
+        return SimpleNamespace(text=self.replies.pop(0))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(SQLiteBackend(str(tmp_path / "llm.sqlite3")))
+
+
+def test_invalid_reply_is_not_cached(cache):
+    model = ScriptedModel('{"queries": ["a", "b"', '{"queries": ["a", "b"]}')
+
+    with pytest.raises(json.JSONDecodeError):
+        cache.generate(model, "prompt", parse=json.loads)
+    # The retry makes a fresh call instead of replaying the truncated reply
+    assert cache.generate(model, "prompt", parse=json.loads) == {"queries": ["a", "b"]}
+    assert cache.generate(model, "prompt", parse=json.loads) == {"queries": ["a", "b"]}
+    assert model.calls == 2
+
+
+def test_poisoned_entry_is_dropped(cache):
+    key = cache_key(ScriptedModel.model_name, "prompt", None, {})
+    cache.backend.set(key, "{truncated")
+    model = ScriptedModel('{"ok": true}')
+
+    assert cache.generate(model, "prompt", parse=json.loads) == {"ok": True}
+    assert cache.backend.get(key) == '{"ok": true}'
+    assert model.calls == 1
+
+
+class ClientBackend:
+    """Stands in for SupabaseBackend: a dict per client, rebuilt by ``bind``."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def bind(self, db):
+        return ClientBackend(db)
+
+    def get(self, key, max_age=None):
+        return self.db.get(key)
+
+    def set(self, key, value):
+        self.db[key] = value
+
+    def delete(self, key):
+        self.db.pop(key, None)
+
+
+def test_bound_cache_uses_the_job_client_and_counts_on_the_shared_cache():
+    shared, job_db = {}, {}
+    cache = LLMCache(ClientBackend(shared))
+    bound = cache.bind(job_db)
+
+    assert bound.generate(ScriptedModel("reply"), "prompt") == "reply"
+    assert bound.generate(ScriptedModel(), "prompt") == "reply"
+    assert list(job_db.values()) == ["reply"] and shared == {}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_local_backend_is_shared_as_is(cache):
+    assert cache.bind(object()) is cache
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from scout.store import PaperStore, natural_key, normalize_title
+
+
+def test_non_latin_titles_keep_distinct_keys():
+    a = natural_key({"title": "城市热岛效应研究"})
+    b = natural_key({"title": "Городской остров тепла"})
+
+    assert a == "title:城市热岛效应研究"
+    assert b == "title:городской остров тепла"
+    assert normalize_title("Étude: l'îlot de chaleur") == "etude l ilot de chaleur"
+    assert normalize_title("都市ヒートアイランド") == "都市ヒートアイランド"
+
+
+def test_titles_too_short_to_identify_a_paper_are_unkeyed():
+    assert natural_key({"title": ""}) is None
+    assert natural_key({"title": "AI?"}) is None
+    assert natural_key({"title": "AI?", "doi": "10.1/X"}) == "doi:10.1/x"
+
+
+def test_store_queues_every_non_latin_and_unkeyed_paper():
+    store = PaperStore(SimpleNamespace(project_id="p"))
+    store.add_many([{"title": "城市热岛效应研究"}, {"title": "都市ヒートアイランド"}, {"title": "AI"}, {"title": "AI"}])
+
+    assert store.pending == 4